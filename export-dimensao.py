@@ -51,9 +51,10 @@ def main():
     combo_to_mc = {}
     mn_to_mc = {}
 
-    for filepath in table_dir.glob("*.json"):
+    columns = ("MC", "MN", "D2C", "D4C", "D5C", "D6C", "D7C", "D8C", "D9C")
+    for filepath in storage.list_data_files(table_dir):
         try:
-            rows = storage.read_data(filepath)
+            rows = list(storage.iter_rows(filepath, columns))
         except Exception as e:
             print(f"Warning: Failed to read {filepath.name}: {e}")
             continue
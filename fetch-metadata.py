@@ -1,6 +1,6 @@
 import argparse
 
-from sidra_sql import database, models
+from sidra_sql import database
 from sidra_sql.config import Config
 from sidra_sql.sidra import Fetcher
 from sidra_sql.storage import Storage
@@ -18,7 +18,7 @@ def main():
     args = get_args()
     config = Config()
     engine = database.get_engine(config)
-    models.Base.metadata.create_all(engine)
+    database.create_tables(engine, partition=config.db_partition_dados)
 
     storage = Storage.default(config)
     metadata_filepath = storage.get_metadata_filepath(int(args.table))
@@ -1,5 +1,10 @@
 """Run all pipelines found under a given directory.
 
+Thin wrapper around `sidra_sql.runner.run_all`, the same in-process
+executor as ``sidra-sql run-path <dir> --all``: every pipeline runs in
+this interpreter, sharing one database engine, one fetcher and the table
+metadata, and a failing pipeline does not stop the others.
+
 Usage::
 
     python run-all.py
@@ -7,20 +12,20 @@ Usage::
 """
 
 import argparse
-import subprocess
+import logging
 import sys
 from pathlib import Path
 
-
-def find_pipelines(root: Path) -> list[Path]:
-    dirs = set()
-    for name in ("fetch.toml", "transform.toml"):
-        for p in root.rglob(name):
-            dirs.add(p.parent)
-    return sorted(dirs)
+from sidra_sql.config import Config
+from sidra_sql.runner import find_pipelines, run_all
 
 
 def main():
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s %(levelname)s %(name)s %(message)s",
+    )
+
     parser = argparse.ArgumentParser(
         description="Run all pipelines under a directory",
     )
@@ -43,33 +48,20 @@ def main():
         print(f"Error: Directory '{pipelines_dir}' does not exist.")
         sys.exit(1)
 
-    pipelines = find_pipelines(pipelines_dir)
-    if not pipelines:
+    if not find_pipelines(pipelines_dir):
         print(f"No pipelines found in '{pipelines_dir}'.")
         sys.exit(0)
 
     print(f"Starting execution of all pipelines in '{pipelines_dir}/'...")
-
-    failed = []
-    for pipeline in pipelines:
-        print("=" * 40)
-        print(f"Running: {pipeline}")
-        print("=" * 40)
-        cmd = [sys.executable, "scripts/run.py", str(pipeline)]
-        if args.force_metadata:
-            cmd.append("--force-metadata")
-        result = subprocess.run(cmd)
-        if result.returncode != 0:
-            print(
-                f"Warning: '{pipeline}' exited with code {result.returncode}"
-            )
-            failed.append(pipeline)
+    failed = run_all(
+        Config(), pipelines_dir, force_metadata=args.force_metadata
+    )
 
     print("All pipelines finished.")
     if failed:
         print(f"{len(failed)} pipeline(s) failed:")
-        for p in failed:
-            print(f"  {p}")
+        for pipeline, error in failed:
+            print(f"  {pipeline}: {error}")
         sys.exit(1)
 
 
@@ -0,0 +1,116 @@
+"""Benchmark text and binary COPY into the dados staging table.
+
+Streams synthetic resolved rows into ``_staging_dados`` (see
+`sidra_sql.database._STAGING_DDL`) and reports rows/second for:
+
+* ``text``   — the previous encoding: one tuple per row, every value sent
+  as text and parsed by the server;
+* ``binary`` — the current encoding: binary COPY with the declared column
+  types and one reused row buffer.
+
+Nothing is written to the configured schema: the staging table is
+temporary and dropped at the end of every run.
+
+Usage::
+
+    python scripts/benchmark_copy.py
+    python scripts/benchmark_copy.py --rows 5000000 --repeat 5
+"""
+
+import argparse
+import datetime as dt
+import statistics
+import time
+
+from sidra_sql import database
+from sidra_sql.config import Config
+
+_TEXT_COPY = database._STAGING_COPY.replace(" (FORMAT BINARY)", "")
+
+
+def get_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Compare text and binary COPY into the staging table",
+    )
+    parser.add_argument(
+        "--rows",
+        type=int,
+        default=1_000_000,
+        help="Rows copied per run (default: 1000000)",
+    )
+    parser.add_argument(
+        "--repeat",
+        type=int,
+        default=3,
+        help="Timed runs per encoding (default: 3)",
+    )
+    return parser.parse_args()
+
+
+def copy_text(cur, n_rows: int):
+    modificacao = "2024-01-01"
+    with cur.copy(_TEXT_COPY) as copy:
+        for i in range(n_rows):
+            copy.write_row(
+                (
+                    "1737",
+                    i % 5570,
+                    i % 997,
+                    i % 400,
+                    modificacao,
+                    True,
+                    str(i),
+                    i,
+                    None,
+                )
+            )
+
+
+def copy_binary(cur, n_rows: int):
+    buf = ["1737", None, None, None, dt.date(2024, 1, 1), True] + [None] * 3
+    with cur.copy(database._STAGING_COPY) as copy:
+        copy.set_types(database._STAGING_TYPES)
+        for i in range(n_rows):
+            buf[1] = i % 5570
+            buf[2] = i % 997
+            buf[3] = i % 400
+            buf[6] = str(i)
+            buf[7] = float(i)
+            copy.write_row(buf)
+
+
+ENCODINGS = {"text": copy_text, "binary": copy_binary}
+
+
+def main():
+    args = get_args()
+    engine = database.get_engine(Config())
+
+    timings: dict[str, list[float]] = {name: [] for name in ENCODINGS}
+    for i in range(args.repeat):
+        names = list(ENCODINGS) if i % 2 == 0 else list(reversed(ENCODINGS))
+        for name in names:
+            with engine.connect() as conn:
+                raw_conn = conn.connection.dbapi_connection
+                with raw_conn.cursor() as cur:
+                    cur.execute(database._STAGING_DDL)
+                    t0 = time.perf_counter()
+                    ENCODINGS[name](cur, args.rows)
+                    timings[name].append(time.perf_counter() - t0)
+                conn.rollback()
+            print(f"  run {i + 1} {name:<7} {timings[name][-1]:8.2f}s")
+
+    print(f"\nRows per run: {args.rows}")
+    print(f"{'encoding':<8} {'min':>8} {'median':>8} {'rows/s':>10}")
+    for name, values in timings.items():
+        best = min(values)
+        print(
+            f"{name:<8} {best:7.2f}s {statistics.median(values):7.2f}s"
+            f" {args.rows / best:10.0f}"
+        )
+    speedup = min(timings["text"]) / min(timings["binary"])
+    print(f"binary speedup: {speedup:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,255 @@
+"""Benchmark the deactivation of revised rows in dados.
+
+Fills a scratch schema with a synthetic SIDRA table whose rows went
+through several revisions (only the last one active), stages a new
+revision of some of its periods and reports how long the deactivation
+``UPDATE`` takes with:
+
+* ``before``  — the previous statement and indexes: every active row of
+  the staged periods older than the newest staged revision;
+* ``period``  — the previous statement with the partial index
+  ``ix_dados_ativo`` in place;
+* ``key-uq``  — the current `sidra_sql.database._STAGING_DEACTIVATE`
+  without ``ix_dados_ativo``, so the keys are looked up in ``uq_dados``
+  (which holds every revision);
+* ``key``     — the current statement and indexes: only the keys present
+  in the staging table, looked up in ``ix_dados_ativo``.
+
+Every run happens in a transaction that is rolled back (and dados is
+vacuumed after it), so the table is filled once.
+
+Usage::
+
+    python scripts/benchmark_deactivate.py
+    python scripts/benchmark_deactivate.py --localidades 5570 --revisions 6
+
+The scratch schema must differ from the configured ``[database] schema``:
+its dados, dimensao, localidade, periodo and tabela_sidra are truncated.
+"""
+
+import argparse
+import logging
+import statistics
+import time
+
+import sqlalchemy as sa
+
+from sidra_sql import database
+from sidra_sql.config import Config
+
+TABELA = "0"
+
+_PERIOD_DEACTIVATE = (
+    "UPDATE dados d"
+    " SET ativo = FALSE"
+    " FROM ("
+    "  SELECT tabela_sidra_id, periodo_id, MAX(modificacao) AS max_mod"
+    "  FROM _staging_dados"
+    "  GROUP BY tabela_sidra_id, periodo_id"
+    " ) latest"
+    " WHERE d.tabela_sidra_id = %(tabela)s::text"
+    "  AND d.tabela_sidra_id = latest.tabela_sidra_id"
+    "  AND d.periodo_id = latest.periodo_id"
+    "  AND d.modificacao < latest.max_mod"
+    "  AND d.ativo = TRUE"
+)
+
+# name -> (statement, whether ix_dados_ativo is dropped for the run)
+VARIANTS = {
+    "before": (_PERIOD_DEACTIVATE, True),
+    "period": (_PERIOD_DEACTIVATE, False),
+    "key-uq": (database._STAGING_DEACTIVATE, True),
+    "key": (database._STAGING_DEACTIVATE, False),
+}
+
+
+def get_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Compare per-period and per-key deactivation of dados",
+    )
+    parser.add_argument(
+        "--schema",
+        default="sidra_bench",
+        help="Scratch schema, truncated before filling (default: sidra_bench)",
+    )
+    parser.add_argument(
+        "--localidades",
+        type=int,
+        default=5570,
+        help="Localidades of the table (default: 5570)",
+    )
+    parser.add_argument(
+        "--dimensoes",
+        type=int,
+        default=10,
+        help="Dimensoes of the table (default: 10)",
+    )
+    parser.add_argument(
+        "--periodos",
+        type=int,
+        default=60,
+        help="Periodos of the table (default: 60)",
+    )
+    parser.add_argument(
+        "--revisions",
+        type=int,
+        default=3,
+        help="Revisions already loaded for every periodo (default: 3)",
+    )
+    parser.add_argument(
+        "--revised",
+        type=int,
+        default=1,
+        help="Periodos staged again as a new revision (default: 1)",
+    )
+    parser.add_argument(
+        "--repeat",
+        type=int,
+        default=3,
+        help="Timed runs per variant (default: 3)",
+    )
+    return parser.parse_args()
+
+
+def fill(engine: sa.Engine, args: argparse.Namespace) -> int:
+    with engine.begin() as conn:
+        conn.execute(
+            sa.text(
+                "TRUNCATE dados, dimensao, localidade, periodo, tabela_sidra"
+                " RESTART IDENTITY CASCADE"
+            )
+        )
+        conn.execute(
+            sa.text(
+                "INSERT INTO tabela_sidra"
+                " (id, nome, periodicidade, ultima_atualizacao)"
+                " VALUES (:t, 'benchmark', 'mensal', current_date)"
+            ),
+            {"t": TABELA},
+        )
+        database.ensure_dados_partition(conn, TABELA)
+        conn.execute(
+            sa.text(
+                "INSERT INTO localidade (nc, nn, d1c, d1n)"
+                " SELECT '6', 'Município', i::text, 'M' || i"
+                " FROM generate_series(1, :n) i"
+            ),
+            {"n": args.localidades},
+        )
+        conn.execute(
+            sa.text(
+                "INSERT INTO dimensao (mc, mn, d2c, d2n, d4c, d4n)"
+                " SELECT '2', '%', '63', 'V', i::text, 'C' || i"
+                " FROM generate_series(1, :n) i"
+            ),
+            {"n": args.dimensoes},
+        )
+        conn.execute(
+            sa.text(
+                "INSERT INTO periodo (codigo)"
+                " SELECT (200000 + i)::text FROM generate_series(1, :n) i"
+            ),
+            {"n": args.periodos},
+        )
+        for revision in range(args.revisions):
+            conn.execute(
+                sa.text(
+                    "INSERT INTO dados (tabela_sidra_id, localidade_id,"
+                    "  dimensao_id, periodo_id, modificacao, ativo, v, valor)"
+                    " SELECT :t, l.id, dm.id, p.id,"
+                    "  date '2020-01-01' + :r, :ativo, '1', 1"
+                    " FROM periodo p, localidade l, dimensao dm"
+                ),
+                {
+                    "t": TABELA,
+                    "r": revision,
+                    "ativo": revision == args.revisions - 1,
+                },
+            )
+    with engine.connect() as conn:
+        conn.execution_options(isolation_level="AUTOCOMMIT").execute(
+            sa.text("VACUUM ANALYZE dados")
+        )
+        return conn.execute(sa.text("SELECT count(*) FROM dados")).scalar()
+
+
+def run_variant(
+    engine: sa.Engine, statement: str, drop_index: bool, revised: int
+) -> tuple[float, int]:
+    with engine.connect() as conn:
+        raw_conn = conn.connection.dbapi_connection
+        with raw_conn.cursor() as cur:
+            if drop_index:
+                cur.execute("DROP INDEX ix_dados_ativo")
+            cur.execute(database._STAGING_DDL)
+            cur.execute(
+                "INSERT INTO _staging_dados"
+                " SELECT %(t)s, l.id, dm.id, p.id, date '2030-01-01',"
+                "  TRUE, '2', 2, NULL"
+                " FROM periodo p, localidade l, dimensao dm"
+                " WHERE p.id <= %(revised)s",
+                {"t": TABELA, "revised": revised},
+            )
+            cur.execute(database._STAGING_INSERT)
+            t0 = time.perf_counter()
+            cur.execute(statement, {"tabela": TABELA})
+            elapsed = time.perf_counter() - t0
+            n_deactivated = cur.rowcount
+        raw_conn.rollback()
+    # Clear the index entries left by the rolled-back rows.
+    with engine.connect() as conn:
+        conn.execution_options(isolation_level="AUTOCOMMIT").execute(
+            sa.text("VACUUM dados")
+        )
+    return elapsed, n_deactivated
+
+
+def main():
+    logging.basicConfig(level=logging.WARNING)
+    args = get_args()
+    config = Config()
+    if args.schema == config.db_schema:
+        raise SystemExit(
+            f"Refusing to benchmark in the configured schema {args.schema!r}"
+        )
+    config.db_schema = args.schema
+
+    engine = database.get_engine(config)
+    with engine.connect() as conn:
+        conn.execute(sa.text(f'CREATE SCHEMA IF NOT EXISTS "{args.schema}"'))
+        conn.commit()
+    database.create_tables(engine, partition=config.db_partition_dados)
+    database.upgrade_dados(engine)
+
+    n_rows = fill(engine, args)
+    n_staged = args.localidades * args.dimensoes * args.revised
+    print(
+        f"dados: {n_rows} rows ({args.revisions} revisions);"
+        f" staged: {n_staged} rows of {args.revised} periodos"
+    )
+
+    timings: dict[str, list[float]] = {name: [] for name in VARIANTS}
+    for i in range(args.repeat):
+        # Alternate the order so no variant always runs on a warm cache.
+        names = list(VARIANTS) if i % 2 == 0 else list(reversed(VARIANTS))
+        for name in names:
+            elapsed, n_deactivated = run_variant(
+                engine, *VARIANTS[name], args.revised
+            )
+            timings[name].append(elapsed)
+            print(
+                f"  run {i + 1} {name:<7} {elapsed:8.2f}s"
+                f" ({n_deactivated} deactivated)"
+            )
+
+    print(f"\n{'variant':<8} {'min':>8} {'median':>8}")
+    for name, values in timings.items():
+        print(
+            f"{name:<8} {min(values):7.2f}s {statistics.median(values):7.2f}s"
+        )
+    speedup = min(timings["before"]) / min(timings["key"])
+    print(f"key speedup: {speedup:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
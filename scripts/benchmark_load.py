@@ -0,0 +1,132 @@
+"""Benchmark the two-pass and single-pass `load_dados` paths.
+
+Loads the already-downloaded files of one SIDRA table into a scratch
+schema, truncating it before every run, and reports wall-clock times for
+each mode. The table's metadata and data files must already be in the
+configured data directory (run the pipeline, or ``sidra-sql run-path``,
+once beforehand).
+
+Usage::
+
+    python scripts/benchmark_load.py 5938
+    python scripts/benchmark_load.py 5938 --repeat 5 --schema bench
+
+The scratch schema must differ from the configured ``[database] schema``:
+it is truncated on every run.
+"""
+
+import argparse
+import logging
+import statistics
+import time
+
+import sqlalchemy as sa
+
+from sidra_sql import database, models
+from sidra_sql.config import Config
+from sidra_sql.storage import Storage, codec_for_path
+
+MODES = {"two-pass": False, "single-pass": True}
+
+
+def get_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Compare two-pass and single-pass load_dados timings",
+    )
+    parser.add_argument("table", type=str, help="SIDRA table ID")
+    parser.add_argument(
+        "--schema",
+        default="sidra_bench",
+        help="Scratch schema, truncated before each run "
+        "(default: sidra_bench)",
+    )
+    parser.add_argument(
+        "--repeat",
+        type=int,
+        default=3,
+        help="Timed runs per mode (default: 3)",
+    )
+    return parser.parse_args()
+
+
+def find_data_files(storage: Storage, table: str) -> list[dict]:
+    table_dir = storage.data_dir / f"t-{table}"
+    data_files = []
+    for filepath in storage.list_data_files(table_dir):
+        stem = filepath.name.removesuffix(codec_for_path(filepath).suffix)
+        data_files.append(
+            {
+                "tabela_sidra": table,
+                "filepath": filepath,
+                "modificacao": stem.rsplit("@", 1)[1],
+            }
+        )
+    return data_files
+
+
+def reset_schema(engine: sa.Engine, storage: Storage, table: str):
+    with engine.connect() as conn:
+        conn.execute(
+            sa.text(
+                "TRUNCATE dados, dimensao, localidade, periodo, tabela_sidra"
+                " RESTART IDENTITY CASCADE"
+            )
+        )
+        conn.commit()
+    database.save_agregado(engine, storage.read_metadata(table))
+
+
+def main():
+    logging.basicConfig(level=logging.WARNING)
+    args = get_args()
+    config = Config()
+    if args.schema == config.db_schema:
+        raise SystemExit(
+            f"Refusing to benchmark in the configured schema {args.schema!r}"
+        )
+    config.db_schema = args.schema
+
+    engine = database.get_engine(config)
+    with engine.connect() as conn:
+        conn.execute(sa.text(f'CREATE SCHEMA IF NOT EXISTS "{args.schema}"'))
+        conn.commit()
+    database.create_tables(engine, partition=config.db_partition_dados)
+
+    storage = Storage.default(config)
+    data_files = find_data_files(storage, args.table)
+    if not data_files:
+        raise SystemExit(f"No data files found for table {args.table}")
+    print(f"Table {args.table}: {len(data_files)} files")
+
+    timings: dict[str, list[float]] = {mode: [] for mode in MODES}
+    n_rows = 0
+    for i in range(args.repeat):
+        # Alternate the order so neither mode always runs on a warm cache.
+        modes = list(MODES) if i % 2 == 0 else list(reversed(MODES))
+        for mode in modes:
+            reset_schema(engine, storage, args.table)
+            t0 = time.perf_counter()
+            database.load_dados(
+                engine, storage, data_files, single_pass=MODES[mode]
+            )
+            timings[mode].append(time.perf_counter() - t0)
+            with engine.connect() as conn:
+                n_rows = conn.execute(
+                    sa.select(sa.func.count()).select_from(models.Dados)
+                ).scalar_one()
+            print(f"  run {i + 1} {mode:<12} {timings[mode][-1]:8.2f}s")
+
+    print(f"\nRows loaded: {n_rows}")
+    print(f"{'mode':<12} {'min':>8} {'median':>8} {'rows/s':>10}")
+    for mode, values in timings.items():
+        best = min(values)
+        print(
+            f"{mode:<12} {best:7.2f}s {statistics.median(values):7.2f}s"
+            f" {n_rows / best:10.0f}"
+        )
+    speedup = min(timings["two-pass"]) / min(timings["single-pass"])
+    print(f"single-pass speedup: {speedup:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -2,7 +2,7 @@ import logging
 from pathlib import Path
 from typing import Optional
 
-from sidra_sql import __version__
+from sidra_sql import __version__, database
 
 import typer
 from rich.align import Align
@@ -20,7 +20,7 @@ from sidra_sql.config import (
     LOCAL_CONFIG_PATH,
 )
 from sidra_sql.plugin_manager import PluginManager
-from sidra_sql.runner import run_subtree
+from sidra_sql.runner import run_all, run_subtree
 from sidra_sql.scaffold import PipelineAdder, PluginScaffolder
 from sidra_sql.validator import PluginValidator, Severity
 from sidra_sql.transform_runner import TransformRunner
@@ -30,8 +30,10 @@ app = typer.Typer(
 )
 plugin_app = typer.Typer(help="Manage pipeline plugins")
 config_app = typer.Typer(help="Manage sidra-sql configuration")
+db_app = typer.Typer(help="Manage the sidra-sql database schema")
 app.add_typer(plugin_app, name="plugin")
 app.add_typer(config_app, name="config")
+app.add_typer(db_app, name="db")
 
 console = Console()
 manager = PluginManager()
@@ -163,6 +165,70 @@ def config_list(
     console.print(table)
 
 
+@db_app.command("upgrade")
+def db_upgrade():
+    """Build the constraints and indexes an older dados is missing.
+
+    Rebuilds uq_dados with modificacao and creates ix_dados_ativo; the
+    indexes are built concurrently, so loads may keep running.
+    """
+    try:
+        config = Config()
+        engine = database.get_engine(config)
+        database.create_tables(engine)
+        with console.status("Upgrading dados…"):
+            built = database.upgrade_dados(engine)
+        if not built:
+            console.print("[yellow]dados is up to date.[/yellow]")
+        else:
+            console.print(f"[green]dados upgraded:[/green] {', '.join(built)}")
+    except ConfigError as e:
+        console.print(f"[bold yellow]{e}[/bold yellow]")
+        raise typer.Exit(1) from e
+
+
+@db_app.command("partition")
+def db_partition():
+    """Convert dados into a table partitioned by SIDRA table.
+
+    Existing rows are copied into one partition per tabela_sidra_id in a
+    single transaction; set database.partition_dados = true so new tables
+    get their partition when their metadata is saved.
+    """
+    try:
+        config = Config()
+        engine = database.get_engine(config)
+        database.create_tables(engine)
+        with console.status("Partitioning dados…"):
+            n = database.partition_dados(engine)
+        if n is None:
+            console.print("[yellow]dados is already partitioned.[/yellow]")
+        else:
+            console.print(f"[green]dados partitioned:[/green] {n} partitions")
+    except ConfigError as e:
+        console.print(f"[bold yellow]{e}[/bold yellow]")
+        raise typer.Exit(1) from e
+
+
+@db_app.command("backfill-valor")
+def db_backfill_valor():
+    """Fill the numeric valor and simbolo columns of rows already in dados.
+
+    Rows loaded from now on get them while staging; this converts rows
+    loaded before those columns existed, one SIDRA table at a time.
+    """
+    try:
+        config = Config()
+        engine = database.get_engine(config)
+        database.create_tables(engine, partition=config.db_partition_dados)
+        with console.status("Converting V into valor/simbolo…"):
+            n = database.backfill_valor(engine)
+        console.print(f"[green]valor filled:[/green] {n} rows")
+    except ConfigError as e:
+        console.print(f"[bold yellow]{e}[/bold yellow]")
+        raise typer.Exit(1) from e
+
+
 def _version_callback(value: bool):
     if value:
         console.print(f"sidra-sql {__version__}")
@@ -417,8 +483,164 @@ def run_pipeline(
     force_metadata: bool = typer.Option(
         False, "--force-metadata", help="Force refresh metadata"
     ),
+    async_fetch: bool = typer.Option(
+        False,
+        "--async-fetch",
+        help="Download with the asyncio fetcher instead of the thread pool",
+    ),
+    adaptive_concurrency: bool = typer.Option(
+        False,
+        "--adaptive-concurrency",
+        help="Adjust download concurrency from API latency and errors (AIMD)",
+    ),
+    stream_downloads: bool = typer.Option(
+        False,
+        "--stream",
+        help="Stream responses straight to disk without parsing them",
+    ),
+    single_pass: bool = typer.Option(
+        False,
+        "--single-pass",
+        help="Load each data file once, resolving IDs inside PostgreSQL",
+    ),
+    load_workers: int = typer.Option(
+        1,
+        "--load-workers",
+        min=1,
+        help="Number of SIDRA tables loaded into the database concurrently",
+    ),
+    pipelined: bool = typer.Option(
+        False,
+        "--pipelined",
+        help="Load each table as soon as its downloads finish",
+    ),
+    reload: bool = typer.Option(
+        False,
+        "--reload",
+        help="Reload data files even if the carga ledger lists them",
+    ),
+    bulk: bool = typer.Option(
+        False,
+        "--bulk",
+        help="Load an empty dados without secondary indexes, "
+        "rebuilding them afterwards (a partitioned dados must be empty in "
+        "every partition; not with --parallel)",
+    ),
+    parallel: int = typer.Option(
+        1,
+        "--parallel",
+        min=1,
+        help="Number of pipelines run at once; sibling subtrees run "
+        "concurrently, parents after their children",
+    ),
+    force_transform: bool = typer.Option(
+        False,
+        "--force",
+        help="Rerun transforms even if their SQL and input tables "
+        "did not change",
+    ),
 ):
     """Run pipeline(s) from an installed plugin. Omit pipeline_id to run all."""
+    _reject_bulk_parallel(bulk, parallel)
+    _run_plugin(
+        alias,
+        pipeline_id,
+        force_metadata=force_metadata,
+        async_fetch=async_fetch,
+        adaptive_concurrency=adaptive_concurrency,
+        stream_downloads=stream_downloads,
+        single_pass=single_pass,
+        load_workers=load_workers,
+        pipelined=pipelined,
+        reload=reload,
+        bulk=bulk,
+        max_parallel=parallel,
+        force_transform=force_transform,
+    )
+
+
+@app.command("update")
+def update_pipeline(
+    alias: str = typer.Argument(..., help="Plugin alias"),
+    pipeline_id: str | None = typer.Argument(
+        None, help="Pipeline ID to update (omit to update all)"
+    ),
+    async_fetch: bool = typer.Option(
+        False,
+        "--async-fetch",
+        help="Download with the asyncio fetcher instead of the thread pool",
+    ),
+    adaptive_concurrency: bool = typer.Option(
+        False,
+        "--adaptive-concurrency",
+        help="Adjust download concurrency from API latency and errors (AIMD)",
+    ),
+    stream_downloads: bool = typer.Option(
+        False,
+        "--stream",
+        help="Stream responses straight to disk without parsing them",
+    ),
+    single_pass: bool = typer.Option(
+        False,
+        "--single-pass",
+        help="Load each data file once, resolving IDs inside PostgreSQL",
+    ),
+    load_workers: int = typer.Option(
+        1,
+        "--load-workers",
+        min=1,
+        help="Number of SIDRA tables loaded into the database concurrently",
+    ),
+    pipelined: bool = typer.Option(
+        False,
+        "--pipelined",
+        help="Load each table as soon as its downloads finish",
+    ),
+    parallel: int = typer.Option(
+        1,
+        "--parallel",
+        min=1,
+        help="Number of pipelines run at once; sibling subtrees run "
+        "concurrently, parents after their children",
+    ),
+    force_transform: bool = typer.Option(
+        False,
+        "--force",
+        help="Rerun transforms even if their SQL and input tables "
+        "did not change",
+    ),
+):
+    """Download and load only new or revised periods of installed pipeline(s).
+
+    Refreshes just the period list of each table and skips every period
+    whose data file is already in the carga ledger.
+    """
+    _run_plugin(
+        alias,
+        pipeline_id,
+        async_fetch=async_fetch,
+        adaptive_concurrency=adaptive_concurrency,
+        stream_downloads=stream_downloads,
+        single_pass=single_pass,
+        load_workers=load_workers,
+        pipelined=pipelined,
+        update=True,
+        max_parallel=parallel,
+        force_transform=force_transform,
+    )
+
+
+def _reject_bulk_parallel(bulk: bool, parallel: int) -> None:
+    if bulk and parallel > 1:
+        console.print(
+            "[bold red]Error:[/bold red] --bulk cannot be combined with "
+            "--parallel: concurrent pipelines share dados, and the first to "
+            "finish would rebuild its indexes while the others still load"
+        )
+        raise typer.Exit(1)
+
+
+def _run_plugin(alias: str, pipeline_id: str | None, **options) -> None:
     try:
         config = Config()
 
@@ -433,25 +655,16 @@ def run_pipeline(
             _print_header()
             for p in pipelines:
                 console.print(f"\n[cyan]→ {p.id}[/cyan]")
-                run_subtree(
-                    config,
-                    p.path,
-                    force_metadata=force_metadata,
-                    console=console,
-                )
+                run_subtree(config, p.path, console=console, **options)
             console.print(
-                "\n[bold green]All pipelines completed successfully![/bold green]"
+                "\n[bold green]All pipelines completed successfully!"
+                "[/bold green]"
             )
         else:
             pipeline = manager.get_pipeline(alias, pipeline_id)
 
             _print_header()
-            run_subtree(
-                config,
-                pipeline.path,
-                force_metadata=force_metadata,
-                console=console,
-            )
+            run_subtree(config, pipeline.path, console=console, **options)
 
             console.print(
                 "[bold green]Pipeline completed successfully![/bold green]"
@@ -459,7 +672,7 @@ def run_pipeline(
 
     except ConfigError as e:
         console.print(f"[bold yellow]{e}[/bold yellow]")
-        raise typer.Exit(1)
+        raise typer.Exit(1) from e
     except Exception as e:
         console.print(f"[bold red]Pipeline failed:[/bold red] {e}")
         import traceback
@@ -473,8 +686,74 @@ def run_pipeline_path(
     force_metadata: bool = typer.Option(
         False, "--force-metadata", help="Force refresh metadata"
     ),
+    async_fetch: bool = typer.Option(
+        False,
+        "--async-fetch",
+        help="Download with the asyncio fetcher instead of the thread pool",
+    ),
+    adaptive_concurrency: bool = typer.Option(
+        False,
+        "--adaptive-concurrency",
+        help="Adjust download concurrency from API latency and errors (AIMD)",
+    ),
+    stream_downloads: bool = typer.Option(
+        False,
+        "--stream",
+        help="Stream responses straight to disk without parsing them",
+    ),
+    single_pass: bool = typer.Option(
+        False,
+        "--single-pass",
+        help="Load each data file once, resolving IDs inside PostgreSQL",
+    ),
+    load_workers: int = typer.Option(
+        1,
+        "--load-workers",
+        min=1,
+        help="Number of SIDRA tables loaded into the database concurrently",
+    ),
+    pipelined: bool = typer.Option(
+        False,
+        "--pipelined",
+        help="Load each table as soon as its downloads finish",
+    ),
+    reload: bool = typer.Option(
+        False,
+        "--reload",
+        help="Reload data files even if the carga ledger lists them",
+    ),
+    bulk: bool = typer.Option(
+        False,
+        "--bulk",
+        help="Load an empty dados without secondary indexes, "
+        "rebuilding them afterwards (a partitioned dados must be empty in "
+        "every partition; not with --parallel)",
+    ),
+    parallel: int = typer.Option(
+        1,
+        "--parallel",
+        min=1,
+        help="Number of pipelines run at once; sibling subtrees run "
+        "concurrently, parents after their children",
+    ),
+    force_transform: bool = typer.Option(
+        False,
+        "--force",
+        help="Rerun transforms even if their SQL and input tables "
+        "did not change",
+    ),
+    run_all_pipelines: bool = typer.Option(
+        False,
+        "--all",
+        help="Run every pipeline under the path in this process, sharing "
+        "one engine and fetcher; a failing pipeline does not stop the "
+        "others",
+    ),
 ):
     """Run a pipeline directly from a directory path, without a registered plugin."""
+    if not run_all_pipelines:
+        _reject_bulk_parallel(bulk, parallel)
+    failed: list[tuple[Path, Exception]] = []
     try:
         resolved = path.resolve()
         if not resolved.is_dir():
@@ -485,12 +764,52 @@ def run_pipeline_path(
 
         config = Config()
         _print_header()
-        run_subtree(
-            config, resolved, force_metadata=force_metadata, console=console
-        )
-        console.print(
-            "[bold green]Pipeline completed successfully![/bold green]"
-        )
+        if run_all_pipelines:
+            if parallel > 1:
+                console.print(
+                    "[yellow]--parallel is ignored with --all: the pipelines "
+                    "share one fetcher session.[/yellow]"
+                )
+            failed = run_all(
+                config,
+                resolved,
+                console=console,
+                force_metadata=force_metadata,
+                async_fetch=async_fetch,
+                adaptive_concurrency=adaptive_concurrency,
+                stream_downloads=stream_downloads,
+                single_pass=single_pass,
+                load_workers=load_workers,
+                pipelined=pipelined,
+                reload=reload,
+                bulk=bulk,
+                force_transform=force_transform,
+            )
+            if not failed:
+                console.print(
+                    "\n[bold green]All pipelines completed successfully!"
+                    "[/bold green]"
+                )
+        else:
+            run_subtree(
+                config,
+                resolved,
+                force_metadata=force_metadata,
+                console=console,
+                async_fetch=async_fetch,
+                adaptive_concurrency=adaptive_concurrency,
+                stream_downloads=stream_downloads,
+                single_pass=single_pass,
+                load_workers=load_workers,
+                pipelined=pipelined,
+                reload=reload,
+                bulk=bulk,
+                max_parallel=parallel,
+                force_transform=force_transform,
+            )
+            console.print(
+                "[bold green]Pipeline completed successfully![/bold green]"
+            )
     except ConfigError as e:
         console.print(f"[bold yellow]{e}[/bold yellow]")
         raise typer.Exit(1)
@@ -501,11 +820,25 @@ def run_pipeline_path(
         traceback.print_exc()
         raise typer.Exit(1)
 
+    if failed:
+        console.print(
+            f"\n[bold red]{len(failed)} pipeline(s) failed:[/bold red]"
+        )
+        for pipeline, error in failed:
+            console.print(f"  {pipeline}: {error}")
+        raise typer.Exit(1)
+
 
 @app.command("transform")
 def transform_pipeline(
     alias: str = typer.Argument(..., help="Plugin alias"),
     pipeline_id: str = typer.Argument(..., help="Pipeline ID to transform"),
+    force: bool = typer.Option(
+        False,
+        "--force",
+        help="Rerun every output even if its SQL and input tables "
+        "did not change",
+    ),
 ):
     """Run only the transform step of a pipeline, without fetch or recursion."""
     try:
@@ -522,7 +855,7 @@ def transform_pipeline(
         console.print(
             f"[bold blue]Transforming {pipeline_id} from {alias}[/bold blue]"
         )
-        TransformRunner(config, transform_path).run()
+        TransformRunner(config, transform_path, force=force).run()
         console.print(
             "[bold green]Transform completed successfully![/bold green]"
         )
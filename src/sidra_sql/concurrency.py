@@ -0,0 +1,188 @@
+"""Adaptive concurrency control for SIDRA downloads.
+
+This module provides `AIMDController`, a thread-safe gate that limits how
+many period downloads are in flight at once and adjusts that limit from
+what the API is telling us:
+
+* Additive increase — after ``limit`` consecutive healthy responses the
+  limit grows by ``increase`` (roughly one step per "round trip" of the
+  whole window).
+* Multiplicative decrease — when the transient-error rate over the last
+  ``window`` responses reaches ``error_threshold``, or the smoothed
+  latency exceeds ``latency_factor`` times the best latency seen so far,
+  the limit is multiplied by ``decrease``. Pass ``latency_factor=None``
+  to react to errors only.
+
+After each decrease further decrease signals are ignored for ``cooldown``
+seconds, because requests already in flight were launched under the old
+limit and would otherwise shrink it several times for a single burst.
+"""
+
+import logging
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Iterator
+
+logger = logging.getLogger(__name__)
+
+_LATENCY_ALPHA = 0.2  # EWMA smoothing factor for observed latencies
+
+
+class AIMDController:
+    """Additive-increase / multiplicative-decrease limit on in-flight work.
+
+    Usage example::
+
+        controller = AIMDController(initial=4, maximum=32)
+        with controller.slot():
+            t0 = time.monotonic()
+            response = do_request()
+            controller.record_success(time.monotonic() - t0)
+
+    Attributes:
+        minimum: Lower bound for the limit.
+        maximum: Upper bound for the limit (size the worker pool to this).
+        last_decision: Short description of the latest limit change, or
+            ``None`` before the first change.
+    """
+
+    def __init__(
+        self,
+        initial: int = 4,
+        minimum: int = 1,
+        maximum: int = 32,
+        increase: int = 1,
+        decrease: float = 0.5,
+        error_threshold: float = 0.1,
+        latency_factor: float | None = 3.0,
+        window: int = 20,
+        cooldown: float = 5.0,
+    ):
+        if not 1 <= minimum <= maximum:
+            raise ValueError("expected 1 <= minimum <= maximum")
+        if not 0 < decrease < 1:
+            raise ValueError("decrease must be between 0 and 1")
+        self.minimum = minimum
+        self.maximum = maximum
+        self.increase = increase
+        self.decrease = decrease
+        self.error_threshold = error_threshold
+        self.latency_factor = latency_factor
+        self.cooldown = cooldown
+        self.last_decision: str | None = None
+
+        self._limit = max(minimum, min(initial, maximum))
+        self._in_flight = 0
+        self._healthy_streak = 0
+        self._outcomes: deque[bool] = deque(maxlen=window)
+        self._latency_ewma: float | None = None
+        self._latency_floor: float | None = None
+        self._last_decrease = float("-inf")
+        self._cond = threading.Condition()
+
+    @property
+    def limit(self) -> int:
+        """Current maximum number of concurrent downloads."""
+        return self._limit
+
+    @property
+    def in_flight(self) -> int:
+        """Number of slots currently held."""
+        return self._in_flight
+
+    def acquire(self, cancel: threading.Event | None = None) -> None:
+        """Block until a slot is free, then take it.
+
+        Raises:
+            InterruptedError: If *cancel* is set while waiting.
+        """
+        with self._cond:
+            while self._in_flight >= self._limit:
+                if cancel is not None and cancel.is_set():
+                    raise InterruptedError("cancelled")
+                self._cond.wait(timeout=0.5)
+            self._in_flight += 1
+
+    def release(self) -> None:
+        """Return a slot taken by `acquire`."""
+        with self._cond:
+            self._in_flight -= 1
+            self._cond.notify()
+
+    @contextmanager
+    def slot(self, cancel: threading.Event | None = None) -> Iterator[None]:
+        """Context manager wrapping `acquire` / `release`."""
+        self.acquire(cancel)
+        try:
+            yield
+        finally:
+            self.release()
+
+    def record_success(self, latency: float) -> None:
+        """Feed the latency (seconds) of a successful request."""
+        with self._cond:
+            self._outcomes.append(True)
+            if self._latency_ewma is None:
+                self._latency_ewma = latency
+            else:
+                self._latency_ewma += _LATENCY_ALPHA * (
+                    latency - self._latency_ewma
+                )
+            if (
+                self._latency_floor is None
+                or self._latency_ewma < self._latency_floor
+            ):
+                self._latency_floor = self._latency_ewma
+
+            if (
+                self.latency_factor is not None
+                and self._latency_ewma
+                > self.latency_factor * self._latency_floor
+            ):
+                self._decrease(
+                    f"latency {self._latency_ewma:.1f}s > "
+                    f"{self.latency_factor:g}x {self._latency_floor:.1f}s"
+                )
+                return
+
+            self._healthy_streak += 1
+            if self._healthy_streak >= self._limit:
+                self._healthy_streak = 0
+                if self._limit < self.maximum:
+                    self._set_limit(
+                        min(self.maximum, self._limit + self.increase),
+                        "additive increase",
+                    )
+
+    def record_error(self) -> None:
+        """Feed a transient failure (timeout, connection error, 5xx)."""
+        with self._cond:
+            self._outcomes.append(False)
+            self._healthy_streak = 0
+            errors = self._outcomes.count(False)
+            rate = errors / len(self._outcomes)
+            if rate >= self.error_threshold:
+                self._decrease(f"error rate {rate:.0%}")
+
+    def _decrease(self, reason: str) -> None:
+        now = time.monotonic()
+        self._healthy_streak = 0
+        if now - self._last_decrease < self.cooldown:
+            return
+        self._last_decrease = now
+        new_limit = max(self.minimum, int(self._limit * self.decrease))
+        if new_limit != self._limit:
+            self._set_limit(new_limit, reason)
+        # The samples that triggered this decrease belong to the old limit.
+        self._outcomes.clear()
+        self._latency_ewma = None
+
+    def _set_limit(self, new_limit: int, reason: str) -> None:
+        logger.info(
+            "Concurrency limit %d -> %d (%s)", self._limit, new_limit, reason
+        )
+        self._limit = new_limit
+        self.last_decision = f"{reason} → {new_limit}"
+        self._cond.notify_all()
@@ -68,6 +68,31 @@ class Config:
         self.db_schema = self.config["database"]["schema"]
         self.db_tablespace = self.config["database"]["tablespace"]
         self.db_readonly_role = self.config["database"]["readonly_role"]
+        # Optional: LIST-partition dados by tabela_sidra_id (see
+        # `database.partition_dados`).
+        self.db_partition_dados = self.config.getboolean(
+            "database", "partition_dados", fallback=False
+        )
+        # Optional: keys kept by the run-wide ID lookup cache (see
+        # `sidra_sql.lookup_cache`).
+        self.db_lookup_cache_size = self.config.getint(
+            "database", "lookup_cache_size", fallback=1_000_000
+        )
+
+        # Optional [fetch] section: machine-wide request rate limit shared
+        # by every pipeline process (0 disables it).
+        self.fetch_rate_limit = self.config.getfloat(
+            "fetch", "rate_limit", fallback=0.0
+        )
+        self.fetch_burst = self.config.getint(
+            "fetch", "burst", fallback=max(1, int(self.fetch_rate_limit))
+        )
+
+        # Optional [storage] format: encoding of downloaded period files
+        # (see `sidra_sql.storage`).
+        self.storage_format = self.config.get(
+            "storage", "format", fallback="json"
+        )
 
     def _validate(self):
         missing = []
@@ -2,18 +2,36 @@
 
 Public functions:
 - `get_engine`: create a SQLAlchemy engine from `Config`.
+- `pool_capacity` / `clamp_workers`: connections an engine's pool can
+  hand out at once, and worker counts limited to them.
+- `create_tables`: create missing tables, optionally partitioning dados.
+- `partition_dados`: convert dados into a table partitioned by SIDRA
+  table, one partition per tabela_sidra_id.
 - `save_agregado`: upsert SIDRA table metadata, periods, and localidades.
 - `build_localidade_lookup`: query localidade IDs by (nc, d1c) keys.
 - `build_dimensao_lookup`: query dimensao IDs by dimension key tuples.
 - `build_periodo_lookup`: query periodo IDs by (codigo, literals) keys.
 - `load_dados`: load data rows into the dados table (also upserts
-  localidades and dimensions).
+  localidades and dimensions), in two passes or a single pass.
+- `loaded_arquivos`: list the data files of a table in the carga ledger.
+- `carga_high_water` / `touched_periodo_ids`: periodos loaded since a
+  point in the carga ledger, for incremental transforms.
+- `bulk_load`: suspend the secondary dados indexes during a first load.
+- `backfill_valor`: fill dados.valor / dados.simbolo for older rows.
 """
 
-import itertools
+import datetime as dt
 import json
 import logging
-from typing import Any, Callable, Iterable
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import contextmanager
+from functools import partial
+from operator import itemgetter
+from pathlib import Path
+from typing import Any, Callable, Iterable, Iterator, Sequence
 
 import sqlalchemy as sa
 from sidra_fetcher.agregados import Agregado
@@ -22,6 +40,7 @@ from sqlalchemy.dialects.postgresql import insert as pg_insert
 
 from . import models
 from .config import Config
+from .lookup_cache import LookupCache
 from .storage import Storage
 
 logger = logging.getLogger(__name__)
@@ -39,6 +58,13 @@ def _coerce(val) -> str | None:
     return str(val) if val is not None else None
 
 
+def _as_date(val) -> dt.date:
+    """Return *val* (a date or an ISO date/datetime string) as a date."""
+    if isinstance(val, dt.date):
+        return val
+    return dt.datetime.fromisoformat(val).date()
+
+
 def _clean_str(val) -> str:
     """Normalize a territory/locality code: strip and remove trailing .0."""
     if val is None:
@@ -59,8 +85,23 @@ def _normalize_nc(nc: str) -> str:
 # ---------------------------------------------------------------------------
 
 
-def get_engine(config: Config) -> sa.engine.Engine:
-    """Create and return a SQLAlchemy engine for the configured DB."""
+# SQLAlchemy's QueuePool defaults.
+DEFAULT_POOL_SIZE = 5
+DEFAULT_MAX_OVERFLOW = 10
+
+
+def get_engine(
+    config: Config,
+    pool_size: int = DEFAULT_POOL_SIZE,
+    max_overflow: int = DEFAULT_MAX_OVERFLOW,
+) -> sa.engine.Engine:
+    """Create and return a SQLAlchemy engine for the configured DB.
+
+    The pool keeps *pool_size* connections open and opens up to
+    *max_overflow* more under load; a checkout beyond that waits for a
+    connection and fails after the pool timeout. Size it to the threads
+    that use the engine at once (see `pool_capacity`).
+    """
     connection_string = (
         f"postgresql+psycopg://{config.db_user}:{config.db_password}"
         f"@{config.db_host}:{config.db_port}/{config.db_name}"
@@ -68,7 +109,408 @@ def get_engine(config: Config) -> sa.engine.Engine:
     return sa.create_engine(
         connection_string,
         connect_args={"options": f"-c search_path={config.db_schema}"},
+        pool_size=pool_size,
+        max_overflow=max_overflow,
+    )
+
+
+def pool_capacity(engine: sa.Engine) -> int | None:
+    """Return how many connections *engine* can hand out at once.
+
+    None if its pool sets no limit.
+    """
+    pool = getattr(engine, "pool", None)
+    if not isinstance(pool, sa.pool.QueuePool) or pool._max_overflow < 0:
+        return None
+    return pool.size() + pool._max_overflow
+
+
+def clamp_workers(engine: sa.Engine, workers: int, what: str) -> int:
+    """Limit *workers* threads, each holding a connection, to the pool.
+
+    Workers beyond `pool_capacity` would wait for a connection held by
+    another one for a whole table and fail with the pool timeout, so
+    they are dropped with a warning.
+    """
+    capacity = pool_capacity(engine)
+    if capacity is None or workers <= capacity:
+        return workers
+    logger.warning(
+        "%d %s exceed the %d connections of the engine pool; using %d",
+        workers,
+        what,
+        capacity,
+        capacity,
+    )
+    return capacity
+
+
+# ---------------------------------------------------------------------------
+# Schema
+# ---------------------------------------------------------------------------
+
+# With ``[database] partition_dados = true`` the dados table is LIST
+# partitioned by tabela_sidra_id. Unique constraints of a partitioned
+# table must contain the partition key, so its primary key becomes
+# (id, tabela_sidra_id); every other constraint and index is the one
+# declared on `models.Dados` and is inherited by the partitions.
+
+_UNPARTITIONED = "dados_unpartitioned"
+
+
+def create_tables(engine: sa.Engine, partition: bool = False):
+    """Create missing tables; with *partition*, partition an empty dados.
+
+    A dados table that already holds rows is left alone (with a warning):
+    converting it can take long and is done by `partition_dados`. Likewise
+    an older dados missing constraints or indexes of `models.Dados` only
+    gets a warning; `upgrade_dados` builds them.
+    """
+    models.Base.metadata.create_all(engine)
+    _add_missing_columns(engine)
+    _warn_outdated_dados(engine)
+    if not partition:
+        return
+    with engine.connect() as conn:
+        if _dados_is_partitioned(conn):
+            return
+        has_rows = conn.execute(
+            sa.select(sa.literal(1)).select_from(models.Dados).limit(1)
+        ).first()
+    if has_rows:
+        logger.warning(
+            "dados is not partitioned and already holds rows; run "
+            "'sidra-sql db partition' to convert it"
+        )
+        return
+    partition_dados(engine)
+
+
+def _add_missing_columns(engine: sa.Engine):
+    """Add nullable model columns missing from tables created earlier.
+
+    `create_all` skips existing tables, so columns added to the models
+    later (such as dados.valor and dados.simbolo) are added here.
+    """
+    inspector = sa.inspect(engine)
+    with engine.begin() as conn:
+        for table in models.Base.metadata.sorted_tables:
+            if not inspector.has_table(table.name):
+                continue
+            existing = {c["name"] for c in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing or not column.nullable:
+                    continue
+                col_type = column.type.compile(dialect=engine.dialect)
+                logger.info("Adding column %s.%s", table.name, column.name)
+                conn.execute(
+                    sa.text(
+                        f"ALTER TABLE {table.name}"
+                        f" ADD COLUMN IF NOT EXISTS {column.name} {col_type}"
+                    )
+                )
+
+
+def _outdated_dados(
+    engine: sa.Engine,
+) -> tuple[list[sa.UniqueConstraint], list[sa.Index]]:
+    """Return the constraints and indexes of `models.Dados` dados lacks.
+
+    A constraint is outdated when dados has none of that name or it covers
+    other columns (``uq_dados`` did not include modificacao).
+    """
+    table = models.Dados.__table__
+    inspector = sa.inspect(engine)
+    if not inspector.has_table(table.name):
+        return [], []
+    unique = {
+        c["name"]: c["column_names"]
+        for c in inspector.get_unique_constraints(table.name)
+    }
+    existing_indexes = {i["name"] for i in inspector.get_indexes(table.name)}
+    constraints = [
+        constraint
+        for constraint in table.constraints
+        if isinstance(constraint, sa.UniqueConstraint)
+        and unique.get(constraint.name) != [c.name for c in constraint.columns]
+    ]
+    indexes = [i for i in table.indexes if i.name not in existing_indexes]
+    return constraints, indexes
+
+
+def _warn_outdated_dados(engine: sa.Engine):
+    constraints, indexes = _outdated_dados(engine)
+    if constraints or indexes:
+        logger.warning(
+            "dados lacks %s; run 'sidra-sql db upgrade' to build them",
+            ", ".join(c.name for c in [*constraints, *indexes]),
+        )
+
+
+def _build_index_concurrently(
+    conn: sa.Connection,
+    name: str,
+    table: str,
+    columns: Iterable[str],
+    where: Any = None,
+    unique: bool = False,
+):
+    """Build an index without blocking writes, replacing a failed build.
+
+    *conn* must be in autocommit mode.
+    """
+    preparer = conn.dialect.identifier_preparer
+    name = preparer.quote(name)
+    conn.execute(sa.text(f"DROP INDEX CONCURRENTLY IF EXISTS {name}"))
+    sql = (
+        f"CREATE {'UNIQUE ' if unique else ''}INDEX CONCURRENTLY {name}"
+        f" ON {preparer.quote(table)} ({', '.join(columns)})"
+    )
+    if where is not None:
+        sql += f" WHERE {where}"
+    conn.execute(sa.text(sql))
+
+
+def _add_unique_using_index(
+    conn: sa.Connection, table: str, name: str, index: str
+):
+    """Add the unique constraint *name* to *table*, taking over *index*."""
+    preparer = conn.dialect.identifier_preparer
+    conn.execute(
+        sa.text(
+            f"ALTER TABLE {preparer.quote(table)}"
+            f" ADD CONSTRAINT {preparer.quote(name)}"
+            f" UNIQUE USING INDEX {preparer.quote(index)}"
+        )
+    )
+
+
+def _dados_partitions(conn: sa.Connection) -> list[str]:
+    return list(
+        conn.execute(
+            sa.text(
+                "SELECT c.relname FROM pg_inherits i"
+                " JOIN pg_class c ON c.oid = i.inhrelid"
+                " WHERE i.inhparent = to_regclass('dados') ORDER BY 1"
+            )
+        ).scalars()
+    )
+
+
+def upgrade_dados(engine: sa.Engine) -> list[str]:
+    """Bring the constraints and indexes of an older dados up to date.
+
+    ``uq_dados`` did not include modificacao, so the rows of a revised
+    period conflicted with the previous revision and were never inserted;
+    it is rebuilt with the columns of `models.Dados`. Indexes declared
+    there later (such as ``ix_dados_ativo``) are created.
+
+    Indexes are built with ``CREATE INDEX CONCURRENTLY`` (on every
+    partition of a partitioned dados), so loads keep running meanwhile;
+    only the swap of ``uq_dados`` onto its new index
+    (``ADD CONSTRAINT ... USING INDEX``) locks dados, briefly.
+
+    Returns the names of the constraints and indexes built.
+    """
+    table = models.Dados.__table__
+    constraints, indexes = _outdated_dados(engine)
+    if not constraints and not indexes:
+        return []
+    with engine.connect() as conn:
+        conn = conn.execution_options(isolation_level="AUTOCOMMIT")
+        partitions = (
+            _dados_partitions(conn) if _dados_is_partitioned(conn) else None
+        )
+        for constraint in constraints:
+            columns = [c.name for c in constraint.columns]
+            logger.info(
+                "Rebuilding constraint %s on (%s)",
+                constraint.name,
+                ", ".join(columns),
+            )
+            for target in partitions or [table.name]:
+                _build_index_concurrently(
+                    conn,
+                    f"{target}_{constraint.name}_new",
+                    target,
+                    columns,
+                    unique=True,
+                )
+        for index in indexes:
+            logger.info("Creating index %s", index.name)
+            columns = [c.name for c in index.columns]
+            where = index.dialect_options["postgresql"]["where"]
+            if partitions is None:
+                _build_index_concurrently(
+                    conn, index.name, table.name, columns, where
+                )
+                continue
+            # The partitioned index created below attaches these.
+            for partition in partitions:
+                _build_index_concurrently(
+                    conn,
+                    f"{partition}_{index.name}",
+                    partition,
+                    columns,
+                    where,
+                )
+
+    with engine.begin() as conn:
+        for constraint in constraints:
+            conn.execute(
+                sa.text(
+                    f"ALTER TABLE {table.name}"
+                    f" DROP CONSTRAINT IF EXISTS {constraint.name}"
+                )
+            )
+            if partitions is None:
+                _add_unique_using_index(
+                    conn,
+                    table.name,
+                    constraint.name,
+                    f"{table.name}_{constraint.name}_new",
+                )
+                continue
+            # The constraint added on dados attaches the partition ones
+            # instead of building new indexes.
+            for partition in partitions:
+                _add_unique_using_index(
+                    conn,
+                    partition,
+                    f"{partition}_{constraint.name}",
+                    f"{partition}_{constraint.name}_new",
+                )
+            conn.execute(sa.schema.AddConstraint(constraint))
+        if partitions is not None:
+            for index in indexes:
+                conn.execute(sa.schema.CreateIndex(index, if_not_exists=True))
+    return [item.name for item in [*constraints, *indexes]]
+
+
+def _dados_is_partitioned(conn: sa.Connection) -> bool:
+    return conn.execute(
+        sa.text(
+            "SELECT EXISTS (SELECT 1 FROM pg_partitioned_table"
+            " WHERE partrelid = to_regclass('dados'))"
+        )
+    ).scalar_one()
+
+
+def _partition_name(tabela_sidra_id: str) -> str:
+    return f"dados_{tabela_sidra_id}"
+
+
+def _create_partition(conn: sa.Connection, tabela_sidra_id: str):
+    preparer = conn.dialect.identifier_preparer
+    literal = str(tabela_sidra_id).replace("'", "''")
+    conn.execute(
+        sa.text(
+            "CREATE TABLE IF NOT EXISTS"
+            f" {preparer.quote(_partition_name(tabela_sidra_id))}"
+            f" PARTITION OF dados FOR VALUES IN ('{literal}')"
+        )
+    )
+
+
+def ensure_dados_partition(conn: sa.Connection, tabela_sidra_id: str):
+    """Create the dados partition of a SIDRA table if dados is partitioned.
+
+    Does not commit.
+    """
+    if _dados_is_partitioned(conn):
+        _create_partition(conn, tabela_sidra_id)
+
+
+def partition_dados(engine: sa.Engine) -> int | None:
+    """Convert dados into a LIST-partitioned table, keeping its rows.
+
+    Runs in one transaction: the old table is renamed, a partitioned
+    dados is created with one partition per SIDRA table (present in dados
+    or tabela_sidra), the rows are copied, and the constraints and
+    indexes of `models.Dados` are built on the filled table.
+
+    Returns the number of partitions created, or None if dados was
+    already partitioned.
+    """
+    table = models.Dados.__table__
+    with engine.begin() as conn:
+        if _dados_is_partitioned(conn):
+            logger.info("dados is already partitioned")
+            return None
+
+        # Free the index and constraint names for the new table.
+        conn.execute(sa.text(f"ALTER TABLE dados RENAME TO {_UNPARTITIONED}"))
+        for index in table.indexes:
+            conn.execute(sa.text(f"DROP INDEX IF EXISTS {index.name}"))
+        for constraint in table.constraints:
+            if isinstance(constraint, sa.UniqueConstraint):
+                conn.execute(
+                    sa.text(
+                        f"ALTER TABLE {_UNPARTITIONED}"
+                        f" DROP CONSTRAINT IF EXISTS {constraint.name}"
+                    )
+                )
+        conn.execute(
+            sa.text(
+                f"ALTER TABLE {_UNPARTITIONED} RENAME CONSTRAINT dados_pkey"
+                f" TO {_UNPARTITIONED}_pkey"
+            )
+        )
+
+        conn.execute(
+            sa.text(
+                f"CREATE TABLE dados (LIKE {_UNPARTITIONED}"
+                "  INCLUDING DEFAULTS INCLUDING IDENTITY)"
+                " PARTITION BY LIST (tabela_sidra_id)"
+            )
+        )
+        tabela_ids = conn.execute(
+            sa.text(
+                f"SELECT DISTINCT tabela_sidra_id FROM {_UNPARTITIONED}"
+                " UNION SELECT id FROM tabela_sidra"
+            )
+        ).scalars()
+        n_partitions = 0
+        for tabela_sidra_id in sorted(tabela_ids):
+            _create_partition(conn, tabela_sidra_id)
+            n_partitions += 1
+
+        n_rows = conn.execute(
+            sa.text(
+                "INSERT INTO dados OVERRIDING SYSTEM VALUE"
+                f" SELECT * FROM {_UNPARTITIONED}"
+            )
+        ).rowcount
+        conn.execute(
+            sa.text(
+                "SELECT setval(pg_get_serial_sequence('dados', 'id'),"
+                " COALESCE(max(id), 0) + 1, false) FROM dados"
+            )
+        )
+        conn.execute(sa.text(f"DROP TABLE {_UNPARTITIONED}"))
+
+        conn.execute(
+            sa.text(
+                "ALTER TABLE dados ADD CONSTRAINT dados_pkey"
+                " PRIMARY KEY (id, tabela_sidra_id)"
+            )
+        )
+        for constraint in table.constraints:
+            if isinstance(
+                constraint, (sa.UniqueConstraint, sa.ForeignKeyConstraint)
+            ):
+                conn.execute(sa.schema.AddConstraint(constraint))
+        for index in table.indexes:
+            conn.execute(sa.schema.CreateIndex(index))
+
+    with engine.connect() as conn:
+        conn.execution_options(isolation_level="AUTOCOMMIT").execute(
+            sa.text("ANALYZE dados")
+        )
+    logger.info(
+        "Partitioned dados: %d rows in %d partitions", n_rows, n_partitions
     )
+    return n_partitions
 
 
 # ---------------------------------------------------------------------------
@@ -93,63 +535,201 @@ def save_agregado(engine: sa.engine.Engine, agregado: Agregado):
             set_={"metadados": stmt.excluded.metadados},
         )
         conn.execute(stmt)
+        ensure_dados_partition(conn, tabela_sidra["id"])
         conn.commit()
 
-    # Save periods
-    periodos_iter = (
-        dict(
-            codigo=periodo.id,
-            literals=periodo.literals,
-            frequencia=periodo.frequencia,
-            data_inicio=periodo.data_inicio if periodo.data_inicio else None,
-            data_fim=periodo.data_fim if periodo.data_fim else None,
-            ano=periodo.ano,
-            ano_fim=periodo.ano_fim,
-            semestre=periodo.semestre,
-            trimestre=periodo.trimestre,
-            mes=periodo.mes,
+    periodos = (
+        (
+            periodo.id,
+            periodo.literals,
+            periodo.frequencia,
+            periodo.data_inicio if periodo.data_inicio else None,
+            periodo.data_fim if periodo.data_fim else None,
+            periodo.ano,
+            periodo.ano_fim,
+            periodo.semestre,
+            periodo.trimestre,
+            periodo.mes,
         )
         for periodo in agregado.periodos
     )
     with engine.connect() as conn:
-        while True:
-            batch = list(itertools.islice(periodos_iter, _BATCH_SIZE))
-            if not batch:
-                break
-            stmt = pg_insert(models.Periodo.__table__).values(batch)
-            stmt = stmt.on_conflict_do_update(
-                constraint="uq_periodo",
-                set_={
-                    "frequencia": stmt.excluded.frequencia,
-                    "data_inicio": stmt.excluded.data_inicio,
-                    "data_fim": stmt.excluded.data_fim,
-                    "ano": stmt.excluded.ano,
-                    "ano_fim": stmt.excluded.ano_fim,
-                    "semestre": stmt.excluded.semestre,
-                    "trimestre": stmt.excluded.trimestre,
-                    "mes": stmt.excluded.mes,
-                },
-            )
-            conn.execute(stmt)
-            conn.commit()
+        _copy_upsert(
+            conn,
+            models.Periodo.__table__,
+            "uq_periodo",
+            _PERIODO_COLUMNS,
+            periodos,
+            update=_PERIODO_COLUMNS[2:],
+        )
+        conn.commit()
 
-    localidades_iter = (
-        dict(
-            nc=str(localidade.nivel.id),
-            nn=localidade.nivel.nome,
-            d1c=str(localidade.id),
-            d1n=localidade.nome,
+    localidades = (
+        (
+            str(localidade.nivel.id),
+            localidade.nivel.nome,
+            str(localidade.id),
+            localidade.nome,
         )
         for localidade in agregado.localidades
     )
     with engine.connect() as conn:
-        while True:
-            batch = list(itertools.islice(localidades_iter, _BATCH_SIZE))
-            if not batch:
-                break
-            stmt = pg_insert(models.Localidade.__table__).values(batch)
-            conn.execute(stmt.on_conflict_do_nothing())
-            conn.commit()
+        _copy_upsert(
+            conn,
+            models.Localidade.__table__,
+            "uq_localidade",
+            _LOCALIDADE_COLUMNS,
+            localidades,
+        )
+        conn.commit()
+
+
+_PERIODO_COLUMNS = (
+    "codigo",
+    "literals",
+    "frequencia",
+    "data_inicio",
+    "data_fim",
+    "ano",
+    "ano_fim",
+    "semestre",
+    "trimestre",
+    "mes",
+)
+_LOCALIDADE_COLUMNS = ("nc", "nn", "d1c", "d1n")
+_DIMENSAO_COLUMNS = (
+    "mc",
+    "mn",
+    "d2c",
+    "d2n",
+    "d4c",
+    "d4n",
+    "d5c",
+    "d5n",
+    "d6c",
+    "d6n",
+    "d7c",
+    "d7n",
+    "d8c",
+    "d8n",
+    "d9c",
+    "d9n",
+)
+
+
+def _copy_upsert(
+    conn: sa.Connection,
+    table: sa.Table,
+    constraint: str,
+    columns: Sequence[str],
+    rows: Iterable[Sequence[Any]],
+    update: Sequence[str] = (),
+) -> int:
+    """Upsert *rows* (tuples of *columns*) into *table* without committing.
+
+    The rows are COPYed into a temporary table and merged with a single
+    ``INSERT ... SELECT DISTINCT ON (key) ... ORDER BY key ON CONFLICT``,
+    where the key is the column list of the unique *constraint*. Rows
+    whose key already exists are left alone, or get their *update*
+    columns overwritten. Inserting in key order means concurrent loads
+    (see ``load_workers`` in `load_dados`) take conflicting keys in the
+    same order and cannot deadlock.
+
+    Returns the number of rows inserted or updated.
+    """
+    key = ", ".join(_constraint_columns(table, constraint))
+    cols = ", ".join(columns)
+    if update:
+        action = f"ON CONSTRAINT {constraint} DO UPDATE SET " + ", ".join(
+            f"{c} = EXCLUDED.{c}" for c in update
+        )
+    else:
+        action = "DO NOTHING"
+
+    staging = _copy_to_merge_table(conn, table, columns, rows)
+    result = conn.execute(
+        sa.text(
+            f"INSERT INTO {table.name} ({cols})"
+            f" SELECT DISTINCT ON ({key}) {cols} FROM {staging}"
+            f" ORDER BY {key}"
+            f" ON CONFLICT {action}"
+        )
+    )
+    return result.rowcount
+
+
+def _copy_upsert_ids(
+    conn: sa.Connection,
+    table: sa.Table,
+    constraint: str,
+    columns: Sequence[str],
+    rows: Iterable[Sequence[Any]],
+) -> dict[tuple, int]:
+    """Insert the new *rows* like `_copy_upsert` and return their IDs.
+
+    Returns a mapping of key (the columns of the unique *constraint*, in
+    order) -> id for every key in *rows*: inserted rows come from
+    ``RETURNING``, existing ones from an exact-key join in the same
+    statement. A key committed by a concurrent load after the statement
+    started is missing from the result and must be looked up again.
+    """
+    key_columns = _constraint_columns(table, constraint)
+    key = ", ".join(key_columns)
+    cols = ", ".join(columns)
+    # Nullable key columns are matched through COALESCE (see _DIM_JOIN).
+    join = " AND ".join(
+        f"COALESCE(t.{c}, chr(1)) = COALESCE(s.{c}, chr(1))"
+        if table.c[c].nullable
+        else f"t.{c} = s.{c}"
+        for c in key_columns
+    )
+    t_key = ", ".join(f"t.{c}" for c in key_columns)
+
+    staging = _copy_to_merge_table(conn, table, columns, rows)
+    result = conn.execute(
+        sa.text(
+            f"WITH ins AS ("
+            f" INSERT INTO {table.name} ({cols})"
+            f" SELECT DISTINCT ON ({key}) {cols} FROM {staging}"
+            f" ORDER BY {key}"
+            f" ON CONFLICT DO NOTHING"
+            f" RETURNING id, {key})"
+            f" SELECT id, {key} FROM ins"
+            f" UNION ALL"
+            f" SELECT t.id, {t_key} FROM {table.name} t"
+            f" JOIN (SELECT DISTINCT {key} FROM {staging}) s ON {join}"
+        )
+    )
+    return {tuple(row[1:]): row[0] for row in result}
+
+
+def _constraint_columns(table: sa.Table, constraint: str) -> list[str]:
+    (unique,) = (c for c in table.constraints if c.name == constraint)
+    return [c.name for c in unique.columns]
+
+
+def _copy_to_merge_table(
+    conn: sa.Connection,
+    table: sa.Table,
+    columns: Sequence[str],
+    rows: Iterable[Sequence[Any]],
+) -> str:
+    """COPY *rows* into a temporary copy of *table*; return its name."""
+    cols = ", ".join(columns)
+    staging = f"_merge_{table.name}"
+    conn.execute(sa.text(f"DROP TABLE IF EXISTS pg_temp.{staging}"))
+    conn.execute(
+        sa.text(
+            f"CREATE TEMP TABLE {staging} ON COMMIT DROP"
+            f" AS SELECT {cols} FROM {table.name} WITH NO DATA"
+        )
+    )
+    raw_conn = conn.connection.dbapi_connection
+    with raw_conn.cursor() as cur:
+        with cur.copy(f"COPY {staging} ({cols}) FROM STDIN") as copy:
+            for row in rows:
+                copy.write_row(row)
+    return staging
 
 
 # ---------------------------------------------------------------------------
@@ -303,6 +883,32 @@ def build_periodo_lookup(
 # ---------------------------------------------------------------------------
 
 
+# V is parsed once, while staging, into dados.valor (numbers) and
+# dados.simbolo (the other special values, such as ".." and "X"; rows
+# whose V is "..." or "-" are skipped before reaching dados).
+# `_parse_valor` and `_valor_sql` / `_simbolo_sql` must agree.
+_NUMERIC_PATTERN = r"[+-]?([0-9]+\.?[0-9]*|\.[0-9]+)([eE][+-]?[0-9]+)?"
+_NUMERIC_RE = re.compile(_NUMERIC_PATTERN)
+
+
+def _parse_valor(v: str) -> tuple[float | None, str | None]:
+    """Split a SIDRA value into (valor, simbolo)."""
+    if _NUMERIC_RE.fullmatch(v):
+        return float(v), None
+    return None, v
+
+
+def _valor_sql(v: str) -> str:
+    return (
+        f"CASE WHEN {v} ~ '^{_NUMERIC_PATTERN}$'"
+        f" THEN {v}::double precision END"
+    )
+
+
+def _simbolo_sql(v: str) -> str:
+    return f"CASE WHEN {v} !~ '^{_NUMERIC_PATTERN}$' THEN {v} END"
+
+
 _STAGING_DDL = (
     "CREATE TEMP TABLE _staging_dados ("
     "  tabela_sidra_id text,"
@@ -311,39 +917,96 @@ _STAGING_DDL = (
     "  periodo_id integer,"
     "  modificacao date,"
     "  ativo boolean,"
-    "  v text"
+    "  v text,"
+    "  valor double precision,"
+    "  simbolo text"
     ") ON COMMIT DROP"
 )
 
 _STAGING_INSERT = (
     "INSERT INTO dados"
-    " (tabela_sidra_id, localidade_id, dimensao_id, periodo_id, modificacao, ativo, v)"
+    " (tabela_sidra_id, localidade_id, dimensao_id, periodo_id, modificacao,"
+    "  ativo, v, valor, simbolo)"
     " SELECT tabela_sidra_id, localidade_id, dimensao_id,"
-    "  periodo_id, modificacao, ativo, v"
+    "  periodo_id, modificacao, ativo, v, valor, simbolo"
     " FROM _staging_dados"
     " ON CONFLICT DO NOTHING"
 )
 
+# Only the active rows of the keys the staging rows revise are touched:
+# each key is looked up in the partial index ix_dados_ativo, instead of
+# scanning every active row of the loaded periods (including the rows
+# just inserted). The explicit %(tabela)s filter lets the planner prune
+# every other partition when dados is partitioned.
 _STAGING_DEACTIVATE = (
     "UPDATE dados d"
     " SET ativo = FALSE"
     " FROM ("
-    "  SELECT tabela_sidra_id, periodo_id, MAX(modificacao) AS max_mod"
+    "  SELECT periodo_id, localidade_id, dimensao_id,"
+    "   MAX(modificacao) AS max_mod"
     "  FROM _staging_dados"
-    "  GROUP BY tabela_sidra_id, periodo_id"
+    "  GROUP BY periodo_id, localidade_id, dimensao_id"
     " ) latest"
-    " WHERE d.tabela_sidra_id = latest.tabela_sidra_id"
+    " WHERE d.tabela_sidra_id = %(tabela)s::text"
     "  AND d.periodo_id = latest.periodo_id"
+    "  AND d.localidade_id = latest.localidade_id"
+    "  AND d.dimensao_id = latest.dimensao_id"
     "  AND d.modificacao < latest.max_mod"
-    "  AND d.ativo = TRUE"
+    "  AND d.ativo"
 )
 
+# Staging rows are sent with the binary COPY protocol: values travel in
+# their declared types (``_STAGING_TYPES``) and the server does not parse
+# text for every field.
 _STAGING_COPY = (
     "COPY _staging_dados"
     " (tabela_sidra_id, localidade_id, dimensao_id,"
-    "  periodo_id, modificacao, ativo, v)"
-    " FROM STDIN"
+    "  periodo_id, modificacao, ativo, v, valor, simbolo)"
+    " FROM STDIN (FORMAT BINARY)"
 )
+_STAGING_TYPES = (
+    "text",
+    "int8",
+    "int8",
+    "int4",
+    "date",
+    "bool",
+    "text",
+    "float8",
+    "text",
+)
+
+
+# Columns of a Formato.A row read by each load pass (see
+# `Storage.iter_rows`).
+_KEY_COLUMNS = (
+    "NC",
+    "D1C",
+    "MC",
+    "D2C",
+    "D4C",
+    "D5C",
+    "D6C",
+    "D7C",
+    "D8C",
+    "D9C",
+)
+_COLLECT_COLUMNS = (
+    *_KEY_COLUMNS,
+    "NN",
+    "D1N",
+    "MN",
+    "D2N",
+    "D4N",
+    "D5N",
+    "D6N",
+    "D7N",
+    "D8N",
+    "D9N",
+    "D3C",
+    "V",
+)
+_STAGING_COLUMNS = (*_KEY_COLUMNS, "D3C", "V")
 
 
 def _loc_key(r: dict) -> tuple[str, str]:
@@ -369,12 +1032,11 @@ def _collect_upsert_data(
     storage: Storage,
     table_files: list[dict],
     on_file_done: Callable[[], None] | None = None,
-) -> tuple[
-    list[dict], list[dict], set[tuple], Iterable[tuple], set[str], bool
-]:
+) -> tuple[list[dict], dict[tuple, dict], set[str], bool]:
     """Scan data files (Pass 1) and collect unique localidades, dimensions, and periodo codigos.
 
-    Returns (loc_dicts, dim_dicts, seen_locs, dim_keys, seen_periodos, has_data).
+    Returns (loc_dicts, dim_dicts, seen_periodos, has_data), where
+    *dim_dicts* maps each dimension lookup key to its row.
     """
     seen_locs: set[tuple] = set()
     loc_dicts: list[dict] = []
@@ -383,7 +1045,8 @@ def _collect_upsert_data(
     has_data = False
 
     for data_file in table_files:
-        for row in storage.read_data(data_file["filepath"]):
+        rows = storage.iter_rows(data_file["filepath"], _COLLECT_COLUMNS)
+        for row in rows:
             if row.get("V") is None:
                 continue
             has_data = True
@@ -428,31 +1091,81 @@ def _collect_upsert_data(
         if on_file_done is not None:
             on_file_done()
 
-    return (
-        loc_dicts,
-        list(seen_dim_full.values()),
-        seen_locs,
-        seen_dim_full.keys(),
-        seen_periodos,
-        has_data,
-    )
+    return loc_dicts, seen_dim_full, seen_periodos, has_data
 
 
 def _upsert_localidades_and_dims(
-    conn: sa.Connection, loc_dicts: list[dict], dim_dicts: list[dict]
-):
-    """Upsert localidades and dimensoes in batches."""
-    for i in range(0, len(loc_dicts), _BATCH_SIZE):
-        stmt = pg_insert(models.Localidade.__table__).values(
-            loc_dicts[i : i + _BATCH_SIZE]
-        )
-        conn.execute(stmt.on_conflict_do_nothing())
-    for i in range(0, len(dim_dicts), _BATCH_SIZE):
-        stmt = pg_insert(models.Dimensao.__table__).values(
-            dim_dicts[i : i + _BATCH_SIZE]
-        )
-        conn.execute(stmt.on_conflict_do_nothing())
+    conn: sa.Connection,
+    loc_dicts: list[dict],
+    dim_dicts: dict[tuple, dict],
+    lookup_cache: LookupCache,
+) -> tuple[dict[tuple, int], dict[tuple, int]]:
+    """Resolve localidade and dimensao IDs, upserting the unknown ones.
+
+    *dim_dicts* maps each dimension lookup key to its row. Keys found in
+    *lookup_cache* are neither upserted nor queried; the others go through
+    `_copy_upsert_ids` and are added to the cache once the upserts commit,
+    so a rolled-back upsert never leaves its IDs in the shared cache.
+    Commits.
+
+    Returns (loc_lookup, dim_lookup).
+    """
+    loc_rows = {
+        (d["nc"], d["d1c"]): itemgetter(*_LOCALIDADE_COLUMNS)(d)
+        for d in loc_dicts
+    }
+    loc_lookup, new_locs = _cached_upsert_ids(
+        conn,
+        lookup_cache,
+        models.Localidade.__table__,
+        "uq_localidade",
+        _LOCALIDADE_COLUMNS,
+        loc_rows,
+        _localidade_lookup_query,
+    )
+    dim_rows = {
+        key: itemgetter(*_DIMENSAO_COLUMNS)(d) for key, d in dim_dicts.items()
+    }
+    dim_lookup, new_dims = _cached_upsert_ids(
+        conn,
+        lookup_cache,
+        models.Dimensao.__table__,
+        "uq_dimensao",
+        _DIMENSAO_COLUMNS,
+        dim_rows,
+        _dimensao_lookup_query,
+    )
     conn.commit()
+    lookup_cache.put_many(models.Localidade.__tablename__, new_locs.items())
+    lookup_cache.put_many(models.Dimensao.__tablename__, new_dims.items())
+    return loc_lookup, dim_lookup
+
+
+def _cached_upsert_ids(
+    conn: sa.Connection,
+    lookup_cache: LookupCache,
+    table: sa.Table,
+    constraint: str,
+    columns: Sequence[str],
+    rows_by_key: dict[tuple, Sequence[Any]],
+    lookup_query: Callable[..., dict[tuple, int]],
+) -> tuple[dict[tuple, int], dict[tuple, int]]:
+    """Return the IDs of *rows_by_key* and the ones *lookup_cache* lacks.
+
+    The second mapping is not stored here: the caller puts it in the
+    cache after committing.
+    """
+    lookup, missing = lookup_cache.get_many(table.name, rows_by_key)
+    if not missing:
+        return lookup, {}
+    ids = _copy_upsert_ids(
+        conn, table, constraint, columns, (rows_by_key[k] for k in missing)
+    )
+    unresolved = [k for k in missing if k not in ids]
+    if unresolved:
+        # Inserted by a concurrent load after the upsert started.
+        ids |= lookup_query(conn, keys=unresolved)
+    return lookup | ids, ids
 
 
 def _periodo_by_codigo_query(
@@ -485,6 +1198,29 @@ def _periodo_by_codigo_query(
     return lookup
 
 
+def _cached_periodo_by_codigo(
+    conn: sa.Connection,
+    lookup_cache: LookupCache,
+    codigos: set[str],
+    frequencias: set[str] | None = None,
+) -> dict[str, int]:
+    """`_periodo_by_codigo_query` for the codigos missing from the cache."""
+    accepted = frozenset(frequencias) if frequencias else None
+    cached, missing = lookup_cache.get_many(
+        "periodo", ((codigo, accepted) for codigo in codigos)
+    )
+    lookup = {codigo: id_ for (codigo, _), id_ in cached.items()}
+    if missing:
+        found = _periodo_by_codigo_query(
+            conn, {codigo for codigo, _ in missing}, frequencias
+        )
+        lookup_cache.put_many(
+            "periodo", (((c, accepted), id_) for c, id_ in found.items())
+        )
+        lookup |= found
+    return lookup
+
+
 def _stream_staging(
     raw_conn,
     storage: Storage,
@@ -500,13 +1236,22 @@ def _stream_staging(
     Returns (n_rows, n_inserted, n_deactivated, missing_locs, missing_dims, missing_periodos).
     """
     missing_locs = missing_dims = missing_periodos = n_rows = 0
+    # One row buffer is reused for every COPY row: the per-file columns
+    # are set once and write_row encodes the values immediately.
+    buf: list[Any] = [None] * len(_STAGING_TYPES)
+    buf[0] = tabela_sidra_id
+    buf[5] = True  # ativo
 
     with raw_conn.cursor() as cur:
         cur.execute(_STAGING_DDL)
         with cur.copy(_STAGING_COPY) as copy:
+            copy.set_types(_STAGING_TYPES)
             for data_file in table_files:
-                modificacao = data_file["modificacao"]
-                for row in storage.read_data(data_file["filepath"]):
+                buf[4] = _as_date(data_file["modificacao"])
+                rows = storage.iter_rows(
+                    data_file["filepath"], _STAGING_COLUMNS
+                )
+                for row in rows:
                     if row.get("V") is None:
                         continue
 
@@ -525,28 +1270,209 @@ def _stream_staging(
                         missing_periodos += 1
                         continue
 
+                    buf[1] = loc_id
+                    buf[2] = dim_id
+                    buf[3] = periodo_id
+                    v = str(row["V"])
+                    buf[6] = v
+                    buf[7], buf[8] = _parse_valor(v)
+                    copy.write_row(buf)
+                    n_rows += 1
+
+                if on_file_done is not None:
+                    on_file_done()
+
+        cur.execute(_STAGING_INSERT)
+        n_inserted = cur.rowcount
+        cur.execute(_STAGING_DEACTIVATE, {"tabela": tabela_sidra_id})
+        n_deactivated = cur.rowcount
+
+    return (
+        n_rows,
+        n_inserted,
+        n_deactivated,
+        missing_locs,
+        missing_dims,
+        missing_periodos,
+    )
+
+
+# Single-pass mode: rows are copied with their natural keys and names, and
+# surrogate IDs are resolved by joins inside PostgreSQL.
+
+_RAW_STAGING_DDL = (
+    "CREATE TEMP TABLE _staging_raw ("
+    "  nc text, nn text, d1c text, d1n text,"
+    "  mc text, mn text, d2c text, d2n text,"
+    "  d4c text, d4n text, d5c text, d5n text, d6c text, d6n text,"
+    "  d7c text, d7n text, d8c text, d8n text, d9c text, d9n text,"
+    "  d3c text, modificacao date, v text"
+    ") ON COMMIT DROP"
+)
+
+_RAW_STAGING_COPY = (
+    "COPY _staging_raw"
+    " (nc, nn, d1c, d1n, mc, mn, d2c, d2n, d4c, d4n, d5c, d5n,"
+    "  d6c, d6n, d7c, d7n, d8c, d8n, d9c, d9n, d3c, modificacao, v)"
+    " FROM STDIN (FORMAT BINARY)"
+)
+_RAW_STAGING_TYPES = ("text",) * 21 + ("date", "text")
+
+_RAW_UPSERT_LOCALIDADES = (
+    "INSERT INTO localidade (nc, nn, d1c, d1n)"
+    " SELECT DISTINCT ON (nc, d1c) nc, nn, d1c, d1n"
+    " FROM _staging_raw"
+    " ORDER BY nc, d1c"
+    " ON CONFLICT DO NOTHING"
+)
+
+_RAW_UPSERT_DIMENSOES = (
+    "INSERT INTO dimensao (mc, mn, d2c, d2n, d4c, d4n, d5c, d5n,"
+    "  d6c, d6n, d7c, d7n, d8c, d8n, d9c, d9n)"
+    " SELECT DISTINCT ON (mc, d2c, d4c, d5c, d6c, d7c, d8c, d9c)"
+    "  mc, COALESCE(mn, ''), COALESCE(d2c, ''), COALESCE(d2n, ''),"
+    "  d4c, d4n, d5c, d5n, d6c, d6n, d7c, d7n, d8c, d8n, d9c, d9n"
+    " FROM _staging_raw"
+    " ORDER BY mc, d2c, d4c, d5c, d6c, d7c, d8c, d9c"
+    " ON CONFLICT DO NOTHING"
+)
+
+# Nullable key columns are compared through COALESCE with a sentinel that
+# never occurs in SIDRA codes, which keeps the join hashable (IS NOT
+# DISTINCT FROM would force a nested loop). d2c is NOT NULL in dimensao and
+# is stored as '' when missing (see _RAW_UPSERT_DIMENSOES).
+_DIM_JOIN = " AND ".join(
+    f"COALESCE(s.{c}, chr(1)) = COALESCE(dm.{c}, chr(1))"
+    for c in ("mc", "d4c", "d5c", "d6c", "d7c", "d8c", "d9c")
+)
+
+# %(frequencias)s holds the accepted periodo frequencias (NULL accepts
+# any). When a codigo maps to several periodos the lowest id wins.
+_RAW_RESOLVED = (
+    " FROM _staging_raw s"
+    " LEFT JOIN localidade l ON l.nc = s.nc AND l.d1c = s.d1c"
+    " LEFT JOIN dimensao dm ON dm.d2c = COALESCE(s.d2c, '') AND "
+    + _DIM_JOIN
+    + " LEFT JOIN ("
+    "  SELECT DISTINCT ON (codigo) id, codigo FROM periodo"
+    "  WHERE codigo IN (SELECT d3c FROM _staging_raw)"
+    "   AND (%(frequencias)s::text[] IS NULL"
+    "    OR frequencia = ANY(%(frequencias)s::text[]))"
+    "  ORDER BY codigo, id"
+    " ) p ON p.codigo = s.d3c"
+)
+
+_RAW_RESOLVE = (
+    "INSERT INTO _staging_dados"
+    " (tabela_sidra_id, localidade_id, dimensao_id,"
+    "  periodo_id, modificacao, ativo, v, valor, simbolo)"
+    " SELECT %(tabela)s::text, l.id, dm.id, p.id, s.modificacao, TRUE, s.v, "
+    + _valor_sql("s.v")
+    + ", "
+    + _simbolo_sql("s.v")
+    + _RAW_RESOLVED
+    + " WHERE l.id IS NOT NULL AND dm.id IS NOT NULL AND p.id IS NOT NULL"
+)
+
+_RAW_MISSING = (
+    "SELECT"
+    " count(*) FILTER (WHERE l.id IS NULL),"
+    " count(*) FILTER (WHERE l.id IS NOT NULL AND dm.id IS NULL),"
+    " count(*) FILTER ("
+    "  WHERE l.id IS NOT NULL AND dm.id IS NOT NULL AND p.id IS NULL)"
+    + _RAW_RESOLVED
+)
+
+
+def _stream_single_pass(
+    raw_conn,
+    storage: Storage,
+    table_files: list[dict],
+    tabela_sidra_id: str,
+    frequencias: set[str] | None,
+    on_file_done: Callable[[], None] | None = None,
+) -> tuple[int, int, int, int, int, int, int]:
+    """Load a table reading every data file once.
+
+    Rows are COPYed with their natural keys into ``_staging_raw``;
+    localidades and dimensoes are upserted and surrogate IDs resolved with
+    set-based SQL, then the resolved rows go through the same
+    ``_staging_dados`` flush as the two-pass path.
+
+    Returns (n_raw, n_rows, n_inserted, n_deactivated, missing_locs,
+    missing_dims, missing_periodos).
+    """
+    n_raw = 0
+    params = {
+        "tabela": tabela_sidra_id,
+        "frequencias": sorted(frequencias) if frequencias else None,
+    }
+
+    with raw_conn.cursor() as cur:
+        cur.execute(_RAW_STAGING_DDL)
+        cur.execute(_STAGING_DDL)
+        with cur.copy(_RAW_STAGING_COPY) as copy:
+            copy.set_types(_RAW_STAGING_TYPES)
+            for data_file in table_files:
+                modificacao = _as_date(data_file["modificacao"])
+                rows = storage.iter_rows(
+                    data_file["filepath"], _COLLECT_COLUMNS
+                )
+                for row in rows:
+                    if row.get("V") is None:
+                        continue
+                    nc, d1c = _loc_key(row)
                     copy.write_row(
                         (
-                            tabela_sidra_id,
-                            loc_id,
-                            dim_id,
-                            periodo_id,
+                            nc,
+                            str(row.get("NN", "")).strip(),
+                            d1c,
+                            str(row.get("D1N", "")).strip(),
+                            _coerce(row.get("MC")),
+                            _coerce(row.get("MN")),
+                            _coerce(row.get("D2C")),
+                            _coerce(row.get("D2N")),
+                            _coerce(row.get("D4C")),
+                            _coerce(row.get("D4N")),
+                            _coerce(row.get("D5C")),
+                            _coerce(row.get("D5N")),
+                            _coerce(row.get("D6C")),
+                            _coerce(row.get("D6N")),
+                            _coerce(row.get("D7C")),
+                            _coerce(row.get("D7N")),
+                            _coerce(row.get("D8C")),
+                            _coerce(row.get("D8N")),
+                            _coerce(row.get("D9C")),
+                            _coerce(row.get("D9N")),
+                            _coerce(row.get("D3C")),
                             modificacao,
-                            True,
                             str(row.get("V")),
                         )
                     )
-                    n_rows += 1
+                    n_raw += 1
 
                 if on_file_done is not None:
                     on_file_done()
 
+        if n_raw == 0:
+            return 0, 0, 0, 0, 0, 0, 0
+
+        cur.execute("ANALYZE _staging_raw")
+        cur.execute(_RAW_UPSERT_LOCALIDADES)
+        cur.execute(_RAW_UPSERT_DIMENSOES)
+        cur.execute(_RAW_RESOLVE, params)
+        n_rows = cur.rowcount
+        missing_locs = missing_dims = missing_periodos = 0
+        if n_rows < n_raw:
+            cur.execute(_RAW_MISSING, params)
+            missing_locs, missing_dims, missing_periodos = cur.fetchone()
         cur.execute(_STAGING_INSERT)
         n_inserted = cur.rowcount
-        cur.execute(_STAGING_DEACTIVATE)
+        cur.execute(_STAGING_DEACTIVATE, params)
         n_deactivated = cur.rowcount
 
     return (
+        n_raw,
         n_rows,
         n_inserted,
         n_deactivated,
@@ -562,6 +1488,10 @@ def load_dados(
     data_files: list[dict[str, Any]],
     on_file_done: Callable[[str], None] | None = None,
     on_table_done: Callable[[str], None] | None = None,
+    single_pass: bool = False,
+    load_workers: int = 1,
+    reload: bool = False,
+    lookup_cache: LookupCache | None = None,
 ):
     """Load data rows from JSON files into the dados table.
 
@@ -571,11 +1501,37 @@ def load_dados(
 
     * Pass 1 — collect unique localidade/dimension rows and lookup keys
       (small memory footprint).
-    * Between passes — upsert localidades and dimensions, then build
-      ID lookup dicts.
-    * Pass 2 — re-read the JSON files and stream resolved rows into a
-      temporary staging table via the PostgreSQL COPY protocol, then
+    * Between passes — resolve localidade, dimension and periodo IDs
+      through *lookup_cache*, upserting only the keys it does not hold
+      (see `LookupCache`). Pass the same cache to every call of a run to
+      share it across tables and pipelines; a fresh one is used
+      otherwise.
+    * Pass 2 — re-read the data files and stream resolved rows into a
+      temporary staging table via binary COPY, then
       INSERT into dados with ON CONFLICT DO NOTHING.
+
+    Both passes read only the columns they need through
+    `Storage.iter_rows`, which serves them from the Parquet staging cache
+    when ``pyarrow`` is installed.
+
+    With ``single_pass=True`` each file is read once instead: rows are
+    COPYed with their natural keys and names into a staging table and
+    localidades, dimensoes and periodos are resolved with SQL joins (see
+    `_stream_single_pass`). *on_file_done* then fires once per file
+    rather than twice.
+
+    Every loaded file is recorded in the ``carga`` ledger together with
+    the SHA-256 of its content, in the same transaction as its rows.
+    Files already in the ledger are skipped (their callbacks still fire)
+    unless ``reload=True``.
+
+    With ``load_workers > 1`` independent tables are loaded concurrently,
+    each on its own pooled connection; workers beyond the engine's pool
+    are dropped (see `clamp_workers`). Localidade and dimensao upserts
+    always insert in key order, so concurrent loads wait on each other's
+    keys instead of deadlocking, and the callbacks are invoked under a
+    lock. If any table fails, the others still finish and the first
+    error is raised.
     """
     files_by_table: dict[str, list[dict]] = {}
     for data_file in data_files:
@@ -583,108 +1539,516 @@ def load_dados(
 
         files_by_table.setdefault(tabela_sidra_id, []).append(data_file)
 
-    for tabela_sidra_id, table_files in files_by_table.items():
+    if single_pass:
+        load_table = _load_table_single_pass
+    else:
+        if lookup_cache is None:
+            lookup_cache = LookupCache()
+        load_table = partial(_load_table, lookup_cache=lookup_cache)
+    passes = 1 if single_pass else 2
+    workers = clamp_workers(
+        engine, min(load_workers, len(files_by_table)), "load workers"
+    )
+    # Progress callbacks are usually not thread-safe (rich, counters).
+    callback_lock = threading.Lock()
+
+    def _load(tabela_sidra_id: str, table_files: list[dict]) -> None:
         _file_done: Callable[[], None] | None = None
         if on_file_done is not None:
-            sid = tabela_sidra_id
 
-            def _file_done(s=sid) -> None:
-                on_file_done(s)
+            def _file_done() -> None:
+                with callback_lock:
+                    on_file_done(tabela_sidra_id)
+
+        table_files = [
+            data_file | {"hash": storage.file_hash(data_file["filepath"])}
+            for data_file in table_files
+        ]
+        if not reload:
+            pending = _pending_files(engine, tabela_sidra_id, table_files)
+            skipped = len(table_files) - len(pending)
+            if skipped:
+                logger.info(
+                    "Skipping %d already loaded files for table %s",
+                    skipped,
+                    tabela_sidra_id,
+                )
+                if _file_done is not None:
+                    for _ in range(skipped * passes):
+                        _file_done()
+            table_files = pending
+
+        if table_files:
+            load_table(
+                engine,
+                storage,
+                tabela_sidra_id,
+                table_files,
+                on_file_done=_file_done,
+            )
+        if on_table_done is not None:
+            with callback_lock:
+                on_table_done(tabela_sidra_id)
 
-        (
-            loc_dicts,
-            dim_dicts,
-            seen_locs,
-            seen_dim_lookup,
-            seen_periodos,
-            has_data,
-        ) = _collect_upsert_data(storage, table_files, on_file_done=_file_done)
+    if workers <= 1:
+        for tabela_sidra_id, table_files in files_by_table.items():
+            _load(tabela_sidra_id, table_files)
+        return
+
+    logger.info(
+        "Loading %d tables with %d workers", len(files_by_table), workers
+    )
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {
+            executor.submit(_load, sid, table_files): sid
+            for sid, table_files in files_by_table.items()
+        }
+        errors: list[BaseException] = []
+        for future in as_completed(futures):
+            try:
+                future.result()
+            except Exception as e:
+                logger.error("Failed to load table %s: %s", futures[future], e)
+                errors.append(e)
+    if errors:
+        raise errors[0]
+
+
+def _load_table(
+    engine: sa.Engine,
+    storage: Storage,
+    tabela_sidra_id: str,
+    table_files: list[dict],
+    on_file_done: Callable[[], None] | None = None,
+    *,
+    lookup_cache: LookupCache,
+):
+    """Two-pass load of one SIDRA table (see `load_dados`)."""
+    loc_dicts, dim_dicts, seen_periodos, has_data = _collect_upsert_data(
+        storage, table_files, on_file_done=on_file_done
+    )
 
-        if not has_data:
-            logger.info("No data rows found for table %s", tabela_sidra_id)
+    if not has_data:
+        logger.info("No data rows found for table %s", tabela_sidra_id)
+        with engine.begin() as conn:
+            _record_carga(conn, tabela_sidra_id, table_files, [])
+        return
 
-            if on_table_done is not None:
-                on_table_done(tabela_sidra_id)
-            continue
+    logger.info(
+        "Collected %d unique periodo codigos from data for table %s",
+        len(seen_periodos),
+        tabela_sidra_id,
+    )
+
+    with engine.connect() as conn:
+        loc_lookup, dim_lookup = _upsert_localidades_and_dims(
+            conn, loc_dicts, dim_dicts, lookup_cache
+        )
+        logger.info(
+            "Resolved %d localidades and %d dimensions for table %s",
+            len(loc_lookup),
+            len(dim_lookup),
+            tabela_sidra_id,
+        )
+        logger.debug("Lookup cache: %s", lookup_cache.stats())
 
+        periodo_by_codigo = _cached_periodo_by_codigo(
+            conn,
+            lookup_cache,
+            seen_periodos,
+            frequencias=_periodo_frequencias(conn, tabela_sidra_id),
+        )
         logger.info(
-            "Collected %d unique periodo codigos from data for table %s",
+            "Matched %d periodos out of %d unique codigos from data",
+            len(periodo_by_codigo),
             len(seen_periodos),
+        )
+
+        raw_conn = conn.connection.dbapi_connection
+        (
+            n_rows,
+            n_inserted,
+            n_deactivated,
+            missing_locs,
+            missing_dims,
+            missing_periodos,
+        ) = _stream_staging(
+            raw_conn,
+            storage,
+            table_files,
             tabela_sidra_id,
+            loc_lookup,
+            dim_lookup,
+            periodo_by_codigo,
+            on_file_done=on_file_done,
+        )
+        _record_carga(
+            conn, tabela_sidra_id, table_files, _staged_periodo_ids(conn)
         )
+        conn.commit()
 
-        with engine.connect() as conn:
-            _upsert_localidades_and_dims(conn, loc_dicts, dim_dicts)
-            logger.info(
-                "Upserted %d localidades and %d dimensions for table %s",
-                len(loc_dicts),
-                len(dim_dicts),
-                tabela_sidra_id,
-            )
+    _log_load_result(
+        tabela_sidra_id,
+        n_rows,
+        n_inserted,
+        n_deactivated,
+        missing_locs,
+        missing_dims,
+        missing_periodos,
+    )
 
-            loc_lookup = _localidade_lookup_query(conn, keys=seen_locs)
-            dim_lookup = _dimensao_lookup_query(conn, keys=seen_dim_lookup)
-            periodicidade = conn.execute(
-                sa.select(models.TabelaSidra.periodicidade).where(
-                    models.TabelaSidra.id == tabela_sidra_id
-                )
-            ).scalar_one_or_none()
-            periodo_by_codigo = _periodo_by_codigo_query(
-                conn,
-                seen_periodos,
-                frequencias=expected_periodo_frequencias(periodicidade),
-            )
-            logger.info(
-                "Matched %d periodos out of %d unique codigos from data",
-                len(periodo_by_codigo),
-                len(seen_periodos),
-            )
 
-            raw_conn = conn.connection.dbapi_connection
-            (
-                n_rows,
-                n_inserted,
-                n_deactivated,
-                missing_locs,
-                missing_dims,
-                missing_periodos,
-            ) = _stream_staging(
-                raw_conn,
-                storage,
-                table_files,
-                tabela_sidra_id,
-                loc_lookup,
-                dim_lookup,
-                periodo_by_codigo,
-                on_file_done=_file_done,
+def _carga_key(data_file: dict) -> tuple[str, str, str]:
+    return (
+        Path(data_file["filepath"]).name,
+        str(data_file["modificacao"]),
+        data_file["hash"],
+    )
+
+
+def _pending_files(
+    engine: sa.Engine, tabela_sidra_id: str, table_files: list[dict]
+) -> list[dict]:
+    """Return the files of *table_files* not yet in the carga ledger."""
+    with engine.connect() as conn:
+        loaded = {
+            (row.arquivo, str(row.modificacao), row.hash)
+            for row in conn.execute(
+                sa.select(
+                    models.Carga.arquivo,
+                    models.Carga.modificacao,
+                    models.Carga.hash,
+                ).where(models.Carga.tabela_sidra_id == tabela_sidra_id)
             )
-            conn.commit()
+        }
+    return [f for f in table_files if _carga_key(f) not in loaded]
 
-        if on_table_done is not None:
-            on_table_done(tabela_sidra_id)
 
-        if missing_dims > 0:
-            logger.warning(
-                "Skipping %d rows with unknown dimensao for table %s",
-                missing_dims,
-                tabela_sidra_id,
+def loaded_arquivos(engine: sa.Engine, tabela_sidra_id: str) -> set[str]:
+    """Return the names of the data files of a table in the carga ledger."""
+    with engine.connect() as conn:
+        return set(
+            conn.execute(
+                sa.select(models.Carga.arquivo)
+                .where(models.Carga.tabela_sidra_id == tabela_sidra_id)
+                .distinct()
+            ).scalars()
+        )
+
+
+def _staged_periodo_ids(conn: sa.Connection) -> list[int]:
+    """Return the periodo IDs of the rows in ``_staging_dados``."""
+    return sorted(
+        conn.exec_driver_sql(
+            "SELECT DISTINCT periodo_id FROM _staging_dados"
+        ).scalars()
+    )
+
+
+def _record_carga(
+    conn: sa.Connection,
+    tabela_sidra_id: str,
+    table_files: list[dict],
+    periodo_ids: list[int],
+):
+    """Add *table_files* to the carga ledger (without committing).
+
+    *periodo_ids* are the periodos the load wrote to dados; incremental
+    transforms read them back with `touched_periodo_ids`.
+    """
+    rows = [
+        {
+            "tabela_sidra_id": tabela_sidra_id,
+            "arquivo": arquivo,
+            "modificacao": modificacao,
+            "hash": file_hash,
+            "periodo_ids": periodo_ids,
+        }
+        for arquivo, modificacao, file_hash in map(_carga_key, table_files)
+    ]
+    for i in range(0, len(rows), _BATCH_SIZE):
+        stmt = pg_insert(models.Carga.__table__).values(
+            rows[i : i + _BATCH_SIZE]
+        )
+        conn.execute(stmt.on_conflict_do_nothing())
+
+
+def carga_high_water(conn: sa.Connection) -> int:
+    """Return the highest carga ID, waiting for loads in progress.
+
+    The ``SHARE`` lock waits until every transaction that already wrote
+    to the ledger has committed, and lasts until *conn*'s transaction
+    ends. Every carga row committed later gets a higher ID, so the
+    ledger up to the returned ID is final.
+    """
+    conn.exec_driver_sql("LOCK TABLE carga IN SHARE MODE")
+    return conn.execute(sa.select(sa.func.max(models.Carga.id))).scalar() or 0
+
+
+def touched_periodo_ids(
+    conn: sa.Connection, after: int, up_to: int
+) -> list[int] | None:
+    """Return the periodo IDs loaded by the cargas in ``(after, up_to]``.
+
+    Returns None when one of those cargas predates the
+    ``carga.periodo_ids`` column, so the periodos it touched are unknown.
+    """
+    in_range = models.Carga.id > after, models.Carga.id <= up_to
+    unknown = conn.execute(
+        sa.select(sa.func.count())
+        .select_from(models.Carga)
+        .where(*in_range, models.Carga.periodo_ids.is_(None))
+    ).scalar_one()
+    if unknown:
+        return None
+    periodo_id = sa.func.unnest(models.Carga.periodo_ids)
+    return sorted(
+        conn.execute(
+            sa.select(periodo_id).where(*in_range).distinct()
+        ).scalars()
+    )
+
+
+def _periodo_frequencias(
+    conn: sa.Connection, tabela_sidra_id: str
+) -> set[str] | None:
+    """Return the periodo frequencias expected for a SIDRA table."""
+    periodicidade = conn.execute(
+        sa.select(models.TabelaSidra.periodicidade).where(
+            models.TabelaSidra.id == tabela_sidra_id
+        )
+    ).scalar_one_or_none()
+    return expected_periodo_frequencias(periodicidade)
+
+
+def _load_table_single_pass(
+    engine: sa.Engine,
+    storage: Storage,
+    tabela_sidra_id: str,
+    table_files: list[dict],
+    on_file_done: Callable[[], None] | None = None,
+):
+    """Single-pass load of one SIDRA table (see `load_dados`)."""
+    with engine.connect() as conn:
+        frequencias = _periodo_frequencias(conn, tabela_sidra_id)
+        raw_conn = conn.connection.dbapi_connection
+        (
+            n_raw,
+            n_rows,
+            n_inserted,
+            n_deactivated,
+            missing_locs,
+            missing_dims,
+            missing_periodos,
+        ) = _stream_single_pass(
+            raw_conn,
+            storage,
+            table_files,
+            tabela_sidra_id,
+            frequencias,
+            on_file_done=on_file_done,
+        )
+        _record_carga(
+            conn, tabela_sidra_id, table_files, _staged_periodo_ids(conn)
+        )
+        conn.commit()
+
+    if n_raw == 0:
+        logger.info("No data rows found for table %s", tabela_sidra_id)
+        return
+    _log_load_result(
+        tabela_sidra_id,
+        n_rows,
+        n_inserted,
+        n_deactivated,
+        missing_locs,
+        missing_dims,
+        missing_periodos,
+    )
+
+
+def _log_load_result(
+    tabela_sidra_id: str,
+    n_rows: int,
+    n_inserted: int,
+    n_deactivated: int,
+    missing_locs: int,
+    missing_dims: int,
+    missing_periodos: int,
+):
+    if missing_dims > 0:
+        logger.warning(
+            "Skipping %d rows with unknown dimensao for table %s",
+            missing_dims,
+            tabela_sidra_id,
+        )
+    if missing_locs > 0:
+        logger.warning(
+            "Skipping %d rows with unknown localidade for table %s",
+            missing_locs,
+            tabela_sidra_id,
+        )
+    if missing_periodos > 0:
+        logger.warning(
+            "Skipping %d rows with unknown periodo for table %s",
+            missing_periodos,
+            tabela_sidra_id,
+        )
+    logger.info(
+        "Loaded %d/%d rows into dados for table %s (%d deactivated)",
+        n_inserted,
+        n_rows,
+        tabela_sidra_id,
+        n_deactivated,
+    )
+
+
+# ---------------------------------------------------------------------------
+# Bulk load
+# ---------------------------------------------------------------------------
+
+_BULK_MAINTENANCE_WORK_MEM = "512MB"
+
+
+@contextmanager
+def bulk_load(
+    engine: sa.Engine,
+    index_workers: int = 4,
+    maintenance_work_mem: str = _BULK_MAINTENANCE_WORK_MEM,
+) -> Iterator[dict[str, float]]:
+    """Suspend the secondary indexes of an empty dados during a first load.
+
+    Usage example::
+
+        with database.bulk_load(engine) as timings:
+            database.load_dados(engine, storage, data_files)
+        # timings == {"drop": ..., "load": ..., "index": ..., "analyze": ...}
+
+    If dados holds no rows, the non-unique indexes declared on
+    `models.Dados` are dropped before the block runs, so the load only
+    maintains ``uq_dados`` (needed by ON CONFLICT). Afterwards — also when
+    the block fails — they are rebuilt concurrently, one connection per
+    index (at most *index_workers*) with *maintenance_work_mem*, and
+    dados is analyzed. The duration of each phase, in seconds, is stored
+    in the yielded dict. On a dados that already holds rows nothing is
+    dropped and only the ``load`` phase is timed.
+
+    The check covers the whole table: the indexes of a partitioned dados
+    are partitioned indexes, which cannot be dropped for one partition
+    alone, so adding a table to a dados that holds other tables always
+    loads with the indexes in place.
+    """
+    timings: dict[str, float] = {}
+    t0 = time.monotonic()
+    indexes = _drop_secondary_indexes(engine)
+    if indexes:
+        timings["drop"] = time.monotonic() - t0
+    else:
+        logger.info("dados is not empty; loading with its indexes")
+    t0 = time.monotonic()
+    try:
+        yield timings
+    finally:
+        timings["load"] = time.monotonic() - t0
+        if indexes:
+            t0 = time.monotonic()
+            _create_indexes(
+                engine, indexes, index_workers, maintenance_work_mem
             )
-        if missing_locs > 0:
-            logger.warning(
-                "Skipping %d rows with unknown localidade for table %s",
-                missing_locs,
-                tabela_sidra_id,
+            timings["index"] = time.monotonic() - t0
+            t0 = time.monotonic()
+            with engine.connect() as conn:
+                conn.execution_options(isolation_level="AUTOCOMMIT").execute(
+                    sa.text("ANALYZE dados")
+                )
+            timings["analyze"] = time.monotonic() - t0
+        for phase, seconds in timings.items():
+            logger.info("Bulk load phase %s: %.1f s", phase, seconds)
+
+
+def _drop_secondary_indexes(engine: sa.Engine) -> list[sa.Index]:
+    """Drop the non-unique dados indexes if dados is empty; return them."""
+    with engine.begin() as conn:
+        # Blocks concurrent writers until the drop commits, so no rows
+        # arrive between the emptiness check and the drop.
+        conn.execute(sa.text("LOCK TABLE dados IN SHARE MODE"))
+        if conn.execute(
+            sa.select(sa.literal(1)).select_from(models.Dados).limit(1)
+        ).first():
+            return []
+        indexes = [
+            index
+            for index in models.Dados.__table__.indexes
+            if not index.unique
+        ]
+        for index in indexes:
+            conn.execute(sa.schema.DropIndex(index, if_exists=True))
+    logger.info(
+        "Dropped %d dados indexes for bulk load: %s",
+        len(indexes),
+        ", ".join(index.name for index in indexes),
+    )
+    return indexes
+
+
+def _create_indexes(
+    engine: sa.Engine,
+    indexes: list[sa.Index],
+    workers: int,
+    maintenance_work_mem: str,
+):
+    def _create(index: sa.Index) -> None:
+        with engine.begin() as conn:
+            conn.execute(
+                sa.text("SELECT set_config('maintenance_work_mem', :m, true)"),
+                {"m": maintenance_work_mem},
             )
-        if missing_periodos > 0:
-            logger.warning(
-                "Skipping %d rows with unknown periodo for table %s",
-                missing_periodos,
-                tabela_sidra_id,
+            conn.execute(sa.schema.CreateIndex(index, if_not_exists=True))
+        logger.info("Rebuilt index %s", index.name)
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        for future in [executor.submit(_create, index) for index in indexes]:
+            future.result()
+
+
+# ---------------------------------------------------------------------------
+# Backfill
+# ---------------------------------------------------------------------------
+
+_BACKFILL_VALOR = (
+    f"UPDATE dados SET valor = {_valor_sql('v')},"
+    f" simbolo = {_simbolo_sql('v')}"
+    " WHERE tabela_sidra_id = :tabela"
+    " AND valor IS NULL AND simbolo IS NULL"
+)
+
+
+def backfill_valor(engine: sa.Engine) -> int:
+    """Fill dados.valor and dados.simbolo for rows loaded before they existed.
+
+    Runs one transaction per SIDRA table, so an interrupted backfill keeps
+    the tables already done and can simply be run again. Returns the
+    number of rows updated.
+    """
+    with engine.connect() as conn:
+        tabelas = (
+            conn.execute(
+                sa.select(models.TabelaSidra.id).order_by(
+                    models.TabelaSidra.id
+                )
             )
-        logger.info(
-            "Loaded %d/%d rows into dados for table %s (%d deactivated)",
-            n_inserted,
-            n_rows,
-            tabela_sidra_id,
-            n_deactivated,
+            .scalars()
+            .all()
         )
+    total = 0
+    for tabela_sidra_id in tabelas:
+        with engine.begin() as conn:
+            n = conn.execute(
+                sa.text(_BACKFILL_VALOR), {"tabela": tabela_sidra_id}
+            ).rowcount
+        if n:
+            logger.info(
+                "Backfilled valor for %d rows of table %s", n, tabela_sidra_id
+            )
+        total += n
+    return total
@@ -0,0 +1,103 @@
+"""Run-wide cache of localidade, dimensao and periodo surrogate IDs.
+
+`LookupCache` maps the natural key of a localidade ``(nc, d1c)``, a
+dimensao ``(mc, d2c, d4c...d9c)`` or a periodo ``(codigo, frequencias)``
+to its ``id``. One instance is created per run (see
+`runner.run_subtree`) and handed to every `database.load_dados` call, so
+tables and pipelines that share municipalities, variables and periods
+only look up the keys the run has not seen yet.
+
+Entries are filled incrementally from the ``RETURNING`` rows of the
+upserts and from the lookup queries for the keys that were already in
+the database. The cache holds at most ``maxsize`` keys across all kinds
+and evicts the least recently used one first. Rows are never deleted
+from the lookup tables while a run is going on, so cached IDs stay valid
+for the life of the instance; do not share one across a ``TRUNCATE``.
+"""
+
+import threading
+from collections import OrderedDict
+from typing import Hashable, Iterable
+
+DEFAULT_MAXSIZE = 1_000_000
+
+
+class LookupCache:
+    """Thread-safe LRU mapping of ``(kind, key)`` to a surrogate ID.
+
+    Usage example::
+
+        cache = LookupCache(maxsize=100_000)
+        found, missing = cache.get_many("localidade", keys)
+        found |= query_ids(missing)
+        cache.put_many("localidade", found.items())
+
+    Attributes:
+        maxsize: Maximum number of keys kept, over all kinds.
+        hits: Keys served from the cache.
+        misses: Keys that had to be looked up in the database.
+        evictions: Keys dropped to stay within ``maxsize``.
+    """
+
+    def __init__(self, maxsize: int = DEFAULT_MAXSIZE):
+        if maxsize < 1:
+            raise ValueError("maxsize must be positive")
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries: OrderedDict[tuple, int] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get_many(
+        self, kind: str, keys: Iterable[Hashable]
+    ) -> tuple[dict[Hashable, int], list[Hashable]]:
+        """Return ``(found, missing)`` for *keys* of *kind*.
+
+        *found* maps the cached keys to their IDs (and marks them as
+        recently used); *missing* lists the other keys in input order.
+        """
+        found: dict[Hashable, int] = {}
+        missing: list[Hashable] = []
+        with self._lock:
+            for key in keys:
+                entry = (kind, key)
+                id_ = self._entries.get(entry)
+                if id_ is None:
+                    missing.append(key)
+                    self.misses += 1
+                else:
+                    self._entries.move_to_end(entry)
+                    found[key] = id_
+                    self.hits += 1
+        return found, missing
+
+    def put_many(
+        self, kind: str, items: Iterable[tuple[Hashable, int]]
+    ) -> None:
+        """Store ``(key, id)`` pairs of *kind*, evicting the oldest keys."""
+        with self._lock:
+            for key, id_ in items:
+                entry = (kind, key)
+                self._entries[entry] = id_
+                self._entries.move_to_end(entry)
+            overflow = len(self._entries) - self.maxsize
+            for _ in range(max(0, overflow)):
+                self._entries.popitem(last=False)
+            self.evictions += max(0, overflow)
+
+    @property
+    def hit_rate(self) -> float:
+        """Fraction of looked-up keys served from the cache."""
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def stats(self) -> str:
+        """One-line summary of the counters, for logs."""
+        return (
+            f"{len(self)} keys, {self.hits} hits, {self.misses} misses "
+            f"({self.hit_rate:.0%} hit rate), {self.evictions} evictions"
+        )
@@ -6,6 +6,8 @@ from sqlalchemy import (
     Boolean,
     CheckConstraint,
     Date,
+    DateTime,
+    Double,
     ForeignKey,
     Identity,
     Integer,
@@ -160,11 +162,23 @@ class Dados(Base):
     __tablename__ = "dados"
     __table_args__ = (
         sa.Index("ix_dados_periodo", "tabela_sidra_id", "periodo_id"),
+        # Active rows, looked up by key when a revision supersedes them.
+        sa.Index(
+            "ix_dados_ativo",
+            "tabela_sidra_id",
+            "periodo_id",
+            "localidade_id",
+            "dimensao_id",
+            "modificacao",
+            postgresql_where=sa.text("ativo"),
+        ),
+        # One row per revision (modificacao) of each key.
         UniqueConstraint(
             "tabela_sidra_id",
             "localidade_id",
             "dimensao_id",
             "periodo_id",
+            "modificacao",
             name="uq_dados",
         ),
     )
@@ -202,3 +216,76 @@ class Dados(Base):
     ativo: Mapped[bool] = mapped_column(Boolean, nullable=False, default=True)
     # VALOR
     v: Mapped[str] = mapped_column(Text, nullable=False)
+    # V convertido para número (NULL quando V não é numérico)
+    valor: Mapped[float | None] = mapped_column(Double)
+    # V quando não é numérico, p.ex. ".." ou "X"
+    simbolo: Mapped[str | None] = mapped_column(Text)
+
+
+class Carga(Base):
+    """Ledger of data files already loaded into `Dados`.
+
+    ``load_dados`` skips a file whose (tabela_sidra_id, arquivo,
+    modificacao, hash) is already recorded here.
+    """
+
+    __tablename__ = "carga"
+    __table_args__ = (
+        UniqueConstraint(
+            "tabela_sidra_id",
+            "arquivo",
+            "modificacao",
+            "hash",
+            name="uq_carga",
+        ),
+    )
+
+    id: Mapped[int] = mapped_column(
+        BigInteger,
+        Identity(always=True),
+        primary_key=True,
+    )
+    tabela_sidra_id: Mapped[str] = mapped_column(
+        ForeignKey("tabela_sidra.id"),
+        nullable=False,
+    )
+    # Nome do arquivo de dados (sem diretório)
+    arquivo: Mapped[str] = mapped_column(Text, nullable=False)
+    modificacao: Mapped[dt.date] = mapped_column(Date, nullable=False)
+    # SHA-256 do conteúdo do arquivo
+    hash: Mapped[str] = mapped_column(Text, nullable=False)
+    carregado_em: Mapped[dt.datetime] = mapped_column(
+        DateTime(timezone=True),
+        nullable=False,
+        server_default=func.now(),
+    )
+    # Periodos gravados em dados pela carga (NULL em cargas anteriores a
+    # esta coluna)
+    periodo_ids: Mapped[list[int] | None] = mapped_column(ARRAY(Integer))
+
+
+class Transformacao(Base):
+    """State of the transform outputs.
+
+    Every output records the fingerprint of its last run, so unchanged
+    ones can be skipped; ``incremental`` and ``materialized_view`` outputs
+    also use the hash of the SQL they were built from, and an
+    ``incremental`` one the carga ID it is up to date with (see
+    `sidra_sql.transform_runner`).
+    """
+
+    __tablename__ = "transformacao"
+
+    schema: Mapped[str] = mapped_column(Text, primary_key=True)
+    nome: Mapped[str] = mapped_column(Text, primary_key=True)
+    # SHA-256 do arquivo SQL da saída
+    sql_hash: Mapped[str] = mapped_column(Text, nullable=False)
+    # Maior carga.id já refletida na saída (NULL fora de incremental)
+    carga_id: Mapped[int | None] = mapped_column(BigInteger)
+    # Hash do SQL, do transform.toml e das entradas da última execução
+    fingerprint: Mapped[str | None] = mapped_column(Text)
+    atualizado_em: Mapped[dt.datetime] = mapped_column(
+        DateTime(timezone=True),
+        nullable=False,
+        server_default=func.now(),
+    )
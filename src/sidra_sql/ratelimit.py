@@ -0,0 +1,129 @@
+"""Machine-wide request rate limiting for the SIDRA API.
+
+`RateLimiter` implements a token bucket whose state (available tokens and
+the time of the last refill) lives in a small binary file under
+``data_dir``. Every thread and every process that points at the same file
+draws from the same bucket: a thread lock serializes access within one
+process and an exclusive file lock serializes it across processes, so
+``run-all.py`` launching one interpreter per pipeline still respects a
+single global requests/second budget.
+
+Tokens are handed out as reservations: when the bucket is empty the
+caller is told how long to wait for its token instead of retrying, so
+waiting callers are served in arrival order and never spin on the lock.
+"""
+
+import logging
+import os
+import struct
+import threading
+import time
+from pathlib import Path
+
+from .config import Config
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows
+    fcntl = None
+    import msvcrt
+
+logger = logging.getLogger(__name__)
+
+_STATE = struct.Struct("<dd")  # (tokens, last refill as Unix time)
+STATE_FILENAME = ".ratelimit"
+_OPEN_FLAGS = os.O_RDWR | os.O_CREAT | getattr(os, "O_BINARY", 0)
+
+
+def _lock(fd: int) -> None:
+    if fcntl is not None:
+        fcntl.flock(fd, fcntl.LOCK_EX)
+    else:  # pragma: no cover - Windows
+        os.lseek(fd, 0, os.SEEK_SET)
+        msvcrt.locking(fd, msvcrt.LK_LOCK, _STATE.size)
+
+
+def _unlock(fd: int) -> None:
+    if fcntl is not None:
+        fcntl.flock(fd, fcntl.LOCK_UN)
+    else:  # pragma: no cover - Windows
+        os.lseek(fd, 0, os.SEEK_SET)
+        msvcrt.locking(fd, msvcrt.LK_UNLCK, _STATE.size)
+
+
+class RateLimiter:
+    """Token bucket shared through a state file.
+
+    Args:
+        rate: Sustained requests per second.
+        burst: Bucket capacity — how many requests may be issued back to
+            back after an idle period.
+        state_path: File holding the shared bucket state. Created on
+            first use.
+    """
+
+    def __init__(self, rate: float, burst: int, state_path: Path | str):
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        self.rate = rate
+        self.burst = max(1, burst)
+        self.state_path = Path(state_path)
+        self._thread_lock = threading.Lock()
+
+    @classmethod
+    def default(cls, config: Config) -> "RateLimiter | None":
+        """Build the limiter configured in ``[fetch]``, or None if disabled."""
+        if config.fetch_rate_limit <= 0:
+            return None
+        return cls(
+            config.fetch_rate_limit,
+            config.fetch_burst,
+            Path(config.data_dir) / STATE_FILENAME,
+        )
+
+    def reserve(self) -> float:
+        """Take one token and return the seconds to wait before using it."""
+        self.state_path.parent.mkdir(parents=True, exist_ok=True)
+        with self._thread_lock:
+            fd = os.open(self.state_path, _OPEN_FLAGS, 0o644)
+            try:
+                _lock(fd)
+                try:
+                    return self._reserve_locked(fd)
+                finally:
+                    _unlock(fd)
+            finally:
+                os.close(fd)
+
+    def _reserve_locked(self, fd: int) -> float:
+        now = time.time()
+        os.lseek(fd, 0, os.SEEK_SET)
+        raw = os.read(fd, _STATE.size)
+        if len(raw) == _STATE.size:
+            tokens, last = _STATE.unpack(raw)
+            # Clamp so a clock step backwards cannot drain the bucket.
+            elapsed = max(0.0, now - last)
+            tokens = min(float(self.burst), tokens + elapsed * self.rate)
+        else:
+            tokens = float(self.burst)
+        # Tokens may go negative: the debt is the queue of callers that
+        # already hold a reservation and are sleeping until it matures.
+        tokens -= 1.0
+        os.lseek(fd, 0, os.SEEK_SET)
+        os.write(fd, _STATE.pack(tokens, now))
+        return max(0.0, -tokens / self.rate)
+
+    def acquire(self, cancel: threading.Event | None = None) -> None:
+        """Block until a token is available.
+
+        Raises:
+            InterruptedError: If *cancel* is set while waiting.
+        """
+        delay = self.reserve()
+        if delay <= 0:
+            return
+        logger.debug("Rate limit: waiting %.2f s", delay)
+        if cancel is None:
+            time.sleep(delay)
+        elif cancel.wait(delay):
+            raise InterruptedError("cancelled")
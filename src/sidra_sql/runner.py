@@ -5,16 +5,28 @@ each child subtree (any subdirectory containing ``fetch.toml`` or
 ``transform.toml``) runs to completion before the parent's own
 ``fetch.toml`` / ``transform.toml`` execute. This lets a parent's
 SQL transform consume the materialized outputs of its children.
+With ``max_parallel > 1`` independent sibling subtrees run concurrently
+while keeping that ordering.
+
+`run_all` runs every pipeline of a tree in one process instead, sharing
+one engine, one fetcher and the table metadata between them and isolating
+failures per pipeline (``sidra-sql run-path --all``).
 """
 
 import logging
 import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 from pathlib import Path
 
+import sqlalchemy as sa
 from rich.console import Console
+from rich.table import Table
 
+from . import database, transform_runner
 from .config import Config
-from .toml_runner import TomlScript
+from .lookup_cache import LookupCache
+from .storage import Storage
+from .toml_runner import TomlScript, make_fetcher
 from .transform_runner import TransformRunner
 
 logger = logging.getLogger(__name__)
@@ -31,15 +43,246 @@ def run_subtree(
     path: Path,
     force_metadata: bool = False,
     console: Console | None = None,
+    async_fetch: bool = False,
+    adaptive_concurrency: bool = False,
+    stream_downloads: bool = False,
+    single_pass: bool = False,
+    load_workers: int = 1,
+    pipelined: bool = False,
+    reload: bool = False,
+    update: bool = False,
+    bulk: bool = False,
+    lookup_cache: LookupCache | None = None,
+    max_parallel: int = 1,
+    force_transform: bool = False,
 ):
-    """Run all sub-pipelines under ``path`` post-order, then ``path`` itself."""
+    """Run all sub-pipelines under ``path`` post-order, then ``path`` itself.
+
+    Every fetch in the subtree shares one *lookup_cache* (created here
+    when omitted), so surrogate IDs resolved for one table are reused by
+    the next; its counters are logged at the end of the top-level call.
+
+    With ``max_parallel > 1`` up to that many pipelines run at once:
+    sibling subtrees share no dependencies and run concurrently, while a
+    parent still starts only after all its children finished (see
+    `_run_concurrently`). Progress bars are then replaced by one line per
+    pipeline and a timeline at the end.
+
+    Transform outputs whose SQL and inputs did not change since their
+    last run are skipped unless *force_transform* is set (see
+    `TransformRunner`).
+
+    *bulk* cannot be combined with ``max_parallel > 1``: the pipelines
+    load into one dados, and the first to finish would rebuild its
+    indexes while the others are still loading.
+    """
     if not path.exists() or not path.is_dir():
         raise FileNotFoundError(f"Pipeline directory not found: {path}")
+    if bulk and max_parallel > 1:
+        raise ValueError("bulk loads cannot run with max_parallel > 1")
+
+    top_level = lookup_cache is None
+    if top_level:
+        lookup_cache = LookupCache(config.db_lookup_cache_size)
+    options = {
+        "force_metadata": force_metadata,
+        "async_fetch": async_fetch,
+        "adaptive_concurrency": adaptive_concurrency,
+        "stream_downloads": stream_downloads,
+        "single_pass": single_pass,
+        "load_workers": load_workers,
+        "pipelined": pipelined,
+        "reload": reload,
+        "update": update,
+        "bulk": bulk,
+        "lookup_cache": lookup_cache,
+        "force_transform": force_transform,
+    }
+
+    if max_parallel > 1:
+        _run_concurrently(config, path, console, max_parallel, options)
+    else:
+        _run_sequentially(config, path, console, options)
 
+    if top_level:
+        logger.info("Lookup cache: %s", lookup_cache.stats())
+
+
+def _run_sequentially(
+    config: Config, path: Path, console: Console | None, options: dict
+):
     for child in sorted(path.iterdir()):
         if _is_pipeline_dir(child):
-            run_subtree(config, child, force_metadata, console)
+            _run_sequentially(config, child, console, options)
+    _run_pipeline(config, path, console, **options)
+
+
+def _pipeline_tree(path: Path) -> dict[Path, list[Path]]:
+    """Map *path* and every pipeline below it to its pipeline children.
+
+    Follows the same directories as `run_subtree`: only subdirectories
+    holding a ``fetch.toml`` or ``transform.toml`` are descended into.
+    """
+    children = [c for c in sorted(path.iterdir()) if _is_pipeline_dir(c)]
+    tree = {path: children}
+    for child in children:
+        tree |= _pipeline_tree(child)
+    return tree
+
+
+def _pipeline_connections(options: dict) -> int:
+    """Return the connections one pipeline of `run_subtree` uses at once.
+
+    Its fetch loads with ``load_workers`` connections and its transform
+    runs up to `transform_runner.DEFAULT_MAX_WORKERS` outputs at once; one
+    more covers the pipeline's own thread.
+    """
+    return (
+        max(
+            options.get("load_workers", 1),
+            transform_runner.DEFAULT_MAX_WORKERS,
+        )
+        + 1
+    )
+
+
+def _run_concurrently(
+    config: Config,
+    path: Path,
+    console: Console | None,
+    max_parallel: int,
+    options: dict,
+):
+    """Run the pipeline tree under *path* as a DAG on a thread pool.
+
+    A pipeline is submitted once all of its children have finished, so
+    siblings run concurrently and parents keep the post-order guarantee.
+    After the first failure no new pipeline is started; the ones already
+    running finish and the error is raised. Like `run_all`, the pipelines
+    share one engine whose tables are created before any of them starts;
+    its pool holds `_pipeline_connections` for each running pipeline.
+    """
+    tree = _pipeline_tree(path)
+    parent_of = {child: node for node, kids in tree.items() for child in kids}
+    pending_children = {node: len(kids) for node, kids in tree.items()}
+    timeline: list[tuple[Path, float, float, bool]] = []
+    errors: list[BaseException] = []
+    t0 = time.monotonic()
+
+    def _timed(node: Path) -> tuple[float, float, BaseException | None]:
+        start = time.monotonic() - t0
+        if console:
+            console.print(f"[cyan]▶[/cyan] {_label(path, node)}")
+        error = None
+        try:
+            # Progress bars of concurrent pipelines cannot share a console.
+            _run_pipeline(config, node, None, engine=engine, **options)
+        except Exception as e:
+            error = e
+        end = time.monotonic() - t0
+        if console:
+            mark = "[red]✗[/red]" if error else "[green]✓[/green]"
+            console.print(
+                f"{mark} {_label(path, node)} [dim]{end - start:.1f}s[/dim]"
+            )
+        return start, end, error
 
+    logger.info(
+        "Running %d pipelines with up to %d in parallel",
+        len(tree),
+        max_parallel,
+    )
+    engine = database.get_engine(
+        config, pool_size=max_parallel * _pipeline_connections(options)
+    )
+    database.create_tables(engine, partition=config.db_partition_dados)
+    try:
+        with ThreadPoolExecutor(
+            max_workers=max_parallel, thread_name_prefix="pipeline"
+        ) as executor:
+            running = {
+                executor.submit(_timed, node): node
+                for node, n in pending_children.items()
+                if n == 0
+            }
+            while running:
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    node = running.pop(future)
+                    start, end, error = future.result()
+                    timeline.append((node, start, end, error is None))
+                    if error is not None:
+                        logger.error("Pipeline %s failed: %s", node, error)
+                        errors.append(error)
+                        continue
+                    parent = parent_of.get(node)
+                    if parent is None:
+                        continue
+                    pending_children[parent] -= 1
+                    if pending_children[parent] == 0 and not errors:
+                        running[executor.submit(_timed, parent)] = parent
+    finally:
+        engine.dispose()
+
+    _log_timeline(path, timeline, console)
+    if errors:
+        raise errors[0]
+
+
+def _label(root: Path, node: Path) -> str:
+    return root.name if node == root else node.relative_to(root).as_posix()
+
+
+def _log_timeline(
+    root: Path,
+    timeline: list[tuple[Path, float, float, bool]],
+    console: Console | None,
+    width: int = 40,
+):
+    """Log (and print) when each pipeline ran, as offsets from the start."""
+    if not timeline:
+        return
+    total = max(end for _, _, end, _ in timeline) or 1.0
+    table = Table(title="Linha do tempo", box=None, header_style="bold")
+    table.add_column("Pipeline")
+    table.add_column("Início", justify="right")
+    table.add_column("Fim", justify="right")
+    table.add_column("")
+    for node, start, end, ok in sorted(timeline, key=lambda t: t[1]):
+        label = _label(root, node)
+        logger.info(
+            "Timeline: %s %.1fs -> %.1fs%s",
+            label,
+            start,
+            end,
+            "" if ok else " (failed)",
+        )
+        offset = int(start / total * width)
+        length = max(1, int(end / total * width) - offset)
+        color = "green" if ok else "red"
+        table.add_row(
+            label,
+            f"{start:.1f}s",
+            f"{end:.1f}s",
+            " " * offset + f"[{color}]{'█' * length}[/{color}]",
+        )
+    if console:
+        console.print(table)
+
+
+def _run_pipeline(
+    config: Config,
+    path: Path,
+    console: Console | None,
+    engine: sa.Engine | None = None,
+    force_transform: bool = False,
+    **options,
+):
+    """Run the ``fetch.toml`` and then the ``transform.toml`` of *path*.
+
+    *options* are passed on to `TomlScript`; *force_transform* to
+    `TransformRunner` as ``force``.
+    """
     fetch_path = path / "fetch.toml"
     transform_path = path / "transform.toml"
 
@@ -50,7 +293,7 @@ def run_subtree(
             )
         t0 = time.monotonic()
         TomlScript(
-            config, fetch_path, force_metadata=force_metadata, console=console
+            config, fetch_path, console=console, engine=engine, **options
         ).run()
         if console:
             elapsed = time.monotonic() - t0
@@ -65,9 +308,98 @@ def run_subtree(
                 style="magenta dim",
             )
         t0 = time.monotonic()
-        TransformRunner(config, transform_path, console=console).run()
+        TransformRunner(
+            config,
+            transform_path,
+            console=console,
+            engine=engine,
+            force=force_transform,
+        ).run()
         if console:
             elapsed = time.monotonic() - t0
             console.print(
                 f"  [green]✓[/green] transform concluído em [bold]{elapsed:.1f}s[/bold]"
             )
+
+
+def find_pipelines(root: Path) -> list[Path]:
+    """Return every pipeline directory under *root*, children first."""
+    found: list[Path] = []
+    for child in sorted(root.iterdir()):
+        if child.is_dir():
+            found.extend(find_pipelines(child))
+    if _is_pipeline_dir(root):
+        found.append(root)
+    return found
+
+
+def run_all(
+    config: Config,
+    root: Path,
+    console: Console | None = None,
+    max_workers: int | None = None,
+    async_fetch: bool = False,
+    adaptive_concurrency: bool = False,
+    stream_downloads: bool = False,
+    **options,
+) -> list[tuple[Path, Exception]]:
+    """Run every pipeline under *root* in this process, children first.
+
+    Unlike `run_subtree`, each pipeline directory runs on its own and a
+    failure is recorded instead of stopping the run, so one broken
+    pipeline does not keep the others from running. All pipelines share
+    one engine (created, with its tables, once), one fetcher session and
+    one `LookupCache`; the metadata of a SIDRA table used by several
+    pipelines is read and saved once.
+
+    *options* are passed on to `_run_pipeline`. Returns the
+    ``(pipeline, error)`` pairs of the pipelines that failed.
+    """
+    if not root.is_dir():
+        raise FileNotFoundError(f"Pipeline directory not found: {root}")
+
+    engine = database.get_engine(
+        config,
+        pool_size=max(
+            database.DEFAULT_POOL_SIZE, options.get("load_workers", 1)
+        ),
+    )
+    database.create_tables(engine, partition=config.db_partition_dados)
+    fetcher = make_fetcher(
+        config,
+        Storage.default(config),
+        max_workers=max_workers,
+        async_fetch=async_fetch,
+        adaptive_concurrency=adaptive_concurrency,
+        stream_downloads=stream_downloads,
+    )
+    lookup_cache = LookupCache(config.db_lookup_cache_size)
+
+    failed: list[tuple[Path, Exception]] = []
+    try:
+        with fetcher:
+            for pipeline in find_pipelines(root):
+                if console:
+                    console.print(f"\n[cyan]→ {pipeline}[/cyan]")
+                try:
+                    _run_pipeline(
+                        config,
+                        pipeline,
+                        console,
+                        engine=engine,
+                        fetcher=fetcher,
+                        lookup_cache=lookup_cache,
+                        **options,
+                    )
+                except Exception as e:
+                    logger.exception("Pipeline %s failed", pipeline)
+                    if console:
+                        console.print(
+                            f"[bold red]Pipeline failed:[/bold red] "
+                            f"{pipeline}: {e}"
+                        )
+                    failed.append((pipeline, e))
+    finally:
+        engine.dispose()
+    logger.info("Lookup cache: %s", lookup_cache.stats())
+    return failed
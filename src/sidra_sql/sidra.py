@@ -9,26 +9,37 @@ request parameters.
 
 Public API
 - `Fetcher`: context-managed client for downloading SIDRA tables.
+- `AsyncFetcher`: asyncio variant of `Fetcher` for very large plans.
 - `unnest_classificacoes`: yields classification/category mappings.
 """
 
+import asyncio
+import functools
 import logging
 import threading
 import time
 from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
-from typing import Any, Callable, Generator
+from typing import Any, Awaitable, Callable, Generator, TypeVar
 
 import httpx
+import orjson
 from sidra_fetcher.agregados import Agregado, Classificacao
 from sidra_fetcher.fetcher import SidraClient
 from sidra_fetcher.sidra import Formato, Parametro, Precisao
 
+from .concurrency import AIMDController
 from .config import Config
+from .ratelimit import RateLimiter
 from .storage import Storage
 
 logger = logging.getLogger(__name__)
 
+_T = TypeVar("_T")
+
+_HTTP_TIMEOUT = 600  # seconds
+_STREAM_CHUNK_SIZE = 64 * 1024  # bytes
+_ADMIT_POLL_INTERVAL = 0.1  # seconds between checks of a download gate
 _MAX_RETRIES = 5
 _RETRY_BASE_DELAY = 5  # seconds; doubles on each attempt (5, 10, 20, 40, 80)
 
@@ -42,6 +53,10 @@ _TRANSIENT_ERRORS = (
 )
 
 
+def _is_server_error(e: httpx.HTTPStatusError) -> bool:
+    return e.response is not None and e.response.status_code >= 500
+
+
 class Fetcher:
     """Helper to download SIDRA tables and save them locally.
 
@@ -59,6 +74,20 @@ class Fetcher:
             requests to the SIDRA API.
         storage: `Storage` repository where downloaded files are written.
         max_workers: Maximum number of concurrent period downloads.
+        controller: Optional `AIMDController`. When set, the thread pool
+            is sized to ``controller.maximum`` and each period download
+            must hold one of the controller's slots, so the effective
+            concurrency follows ``controller.limit``.
+        rate_limiter: `RateLimiter` awaited before every data request.
+            Defaults to the ``[fetch]`` limit from config (or none).
+        stream: When True, response bodies are streamed to disk as-is
+            (see `stream_table`) instead of being parsed into Python
+            objects and re-serialized by `Storage.write_data`. Ignored
+            when the storage format is not streamable (``columnar``).
+        agregados: Metadata of the tables already handled by this
+            fetcher, by table id. `plan_periods` reads it before the
+            metadata file, and pipelines sharing the fetcher save each
+            table's metadata once.
     """
 
     def __init__(
@@ -66,12 +95,25 @@ class Fetcher:
         config: Config,
         max_workers: int = 4,
         storage: Storage | None = None,
+        controller: AIMDController | None = None,
+        rate_limiter: RateLimiter | None = None,
+        stream: bool = False,
     ):
-        self.sidra_client = SidraClient(timeout=600)
+        self.sidra_client = SidraClient(timeout=_HTTP_TIMEOUT)
         self.storage = (
             storage if storage is not None else Storage.default(config)
         )
-        self.max_workers = max_workers
+        self.rate_limiter = (
+            rate_limiter
+            if rate_limiter is not None
+            else RateLimiter.default(config)
+        )
+        self.controller = controller
+        self.max_workers = (
+            controller.maximum if controller is not None else max_workers
+        )
+        self.stream = stream
+        self.agregados: dict[str, Agregado] = {}
         self._cancel = threading.Event()
 
     def plan_periods(
@@ -105,7 +147,9 @@ class Fetcher:
         # Use cached metadata when available — avoids redundant round-trips
         # after load_metadata has already fetched and stored the Agregado.
         metadata_path = self.storage.get_metadata_filepath(tabela_sidra)
-        if metadata_path.exists():
+        if str(tabela_sidra) in self.agregados:
+            metadados = self.agregados[str(tabela_sidra)]
+        elif metadata_path.exists():
             metadados = self.storage.read_metadata(tabela_sidra)
         else:
             metadados = self.sidra_client.get_agregado_metadados(
@@ -139,6 +183,8 @@ class Fetcher:
         self,
         plan: list[tuple[Any, Parametro, str]],
         on_file_done: Callable[[Any], None] | None = None,
+        on_result: Callable[[dict[str, Any]], None] | None = None,
+        admit: Callable[[Any], bool] | None = None,
     ) -> list[dict[str, Any]]:
         """Download many periods concurrently from a flat plan.
 
@@ -152,6 +198,14 @@ class Fetcher:
                 can correlate downloads back to their originating request.
             on_file_done: Optional callback fired once per completed
                 download (success or failure), useful for progress bars.
+            on_result: Optional callback fired with each successful result
+                dict as soon as it is available, before *on_file_done*.
+                Lets callers start consuming files while others are still
+                downloading.
+            admit: Optional gate called with an entry's key before its
+                download starts; the entry waits while it returns False.
+                Entries are started in plan order, so callers can bound
+                how far downloads run ahead of whoever consumes them.
 
         Returns:
             List of dicts with keys "key", "filepath", "modificacao", in
@@ -162,25 +216,37 @@ class Fetcher:
         errors: list[Exception] = []
         executor = ThreadPoolExecutor(max_workers=self.max_workers)
         try:
+            download = (
+                self._download_period
+                if self.controller is None
+                else self._controlled_download_period
+            )
             future_to_meta = {
                 executor.submit(
-                    self._download_period, parameter, modification
+                    self._admitted_download,
+                    download,
+                    admit,
+                    key,
+                    parameter,
+                    modification,
                 ): (key, modification)
                 for key, parameter, modification in plan
             }
             for future in as_completed(future_to_meta):
                 key, modification = future_to_meta[future]
                 try:
-                    results.append(
-                        {
-                            "key": key,
-                            "filepath": future.result(),
-                            "modificacao": modification,
-                        }
-                    )
+                    result = {
+                        "key": key,
+                        "filepath": future.result(),
+                        "modificacao": modification,
+                    }
                 except Exception as e:
                     logger.error("Period download failed: %s", e)
                     errors.append(e)
+                else:
+                    results.append(result)
+                    if on_result is not None:
+                        on_result(result)
                 if on_file_done is not None:
                     on_file_done(key)
         except KeyboardInterrupt:
@@ -193,6 +259,21 @@ class Fetcher:
             raise errors[0]
         return results
 
+    def _admitted_download(
+        self,
+        download: Callable[[Parametro, str], Path],
+        admit: Callable[[Any], bool] | None,
+        key: Any,
+        parameter: Parametro,
+        modification: str,
+    ) -> Path:
+        """Wait until *admit* lets *key* through, then run *download*."""
+        if admit is not None:
+            while not admit(key):
+                if self._cancel.wait(_ADMIT_POLL_INTERVAL):
+                    raise InterruptedError("cancelled")
+        return download(parameter, modification)
+
     def download_table(
         self,
         tabela_sidra: str,
@@ -256,6 +337,14 @@ class Fetcher:
         )
         return agregado
 
+    def fetch_periodos(self, tabela_sidra: str) -> list:
+        """Fetch only the current period list of a SIDRA table.
+
+        One request, versus one per territorial level for
+        `fetch_metadata`; enough to detect new and revised periods.
+        """
+        return self.sidra_client.get_agregado_periodos(int(tabela_sidra))
+
     def _download_period(
         self,
         parameter: Parametro,
@@ -264,25 +353,37 @@ class Fetcher:
         """Download a single period and save it; return the destination path."""
         if self._cancel.is_set():
             raise InterruptedError("cancelled")
-        if self.storage.exists(parameter, modification):
-            filepath = self.storage.get_data_filepath(parameter, modification)
+        filepath = self.storage.find_data_filepath(parameter, modification)
+        if filepath is not None:
             logger.debug("File already exists (cache hit): %s", filepath)
             return filepath
         logger.info(
             "Downloading %s",
             self.storage.get_data_filepath(parameter, modification).name,
         )
+        if self.stream and self.storage.codec.streamable:
+            return self.stream_table(parameter, modification)
         data = self.get_table(parameter)
         return self.storage.write_data(
             data=data, parameter=parameter, modification=modification
         )
 
+    def _controlled_download_period(
+        self,
+        parameter: Parametro,
+        modification: str,
+    ) -> Path:
+        """Run `_download_period` while holding a controller slot."""
+        with self.controller.slot(self._cancel):
+            return self._download_period(parameter, modification)
+
     def get_table(self, parameter: Parametro) -> dict:
         """Request a SIDRA table and return it as a dictionary.
 
         Retries up to `_MAX_RETRIES` times on transient network errors
         using exponential backoff (5 s, 10 s, 20 s, …).  Raises the
-        underlying exception once all attempts are exhausted.
+        underlying exception once all attempts are exhausted. Every
+        attempt first waits on ``rate_limiter`` when one is configured.
 
         Args:
             parameter: A `Parametro` instance with the desired request
@@ -292,12 +393,57 @@ class Fetcher:
             A `dict` constructed from the JSON response.
         """
         url = parameter.url()
+        return self._with_retries(lambda: self.sidra_client.get(url))
+
+    def stream_table(self, parameter: Parametro, modification: str) -> Path:
+        """Stream a SIDRA response body straight to its data file.
+
+        The raw JSON bytes are copied (compressed, if the storage format
+        says so) to a temporary file next to the destination in chunks of
+        `_STREAM_CHUNK_SIZE` and atomically renamed once complete, so
+        memory use does not grow with the size of the table and an
+        interrupted download never leaves a partial file behind. The
+        request goes through the `SidraClient` connection pool and
+        retries follow `get_table`.
+
+        Returns:
+            The destination path.
+        """
+        url = parameter.url()
+        client = self.sidra_client.client
+
+        def _attempt() -> Path:
+            with self.storage.stream_writer(parameter, modification) as f:
+                with client.stream("GET", url) as response:
+                    response.raise_for_status()
+                    for chunk in response.iter_bytes(_STREAM_CHUNK_SIZE):
+                        if self._cancel.is_set():
+                            raise InterruptedError("cancelled")
+                        f.write(chunk)
+            return self.storage.get_data_filepath(parameter, modification)
+
+        return self._with_retries(_attempt)
+
+    def _with_retries(self, attempt_fn: Callable[[], _T]) -> _T:
+        """Call *attempt_fn* with rate limiting, retries and feedback.
+
+        Shared retry loop of `get_table` and `stream_table`.
+        """
         for attempt in range(_MAX_RETRIES):
             if self._cancel.is_set():
                 raise InterruptedError("cancelled")
+            if self.rate_limiter is not None:
+                self.rate_limiter.acquire(self._cancel)
+            t0 = time.monotonic()
             try:
-                return self.sidra_client.get(url)
+                result = attempt_fn()
+            except httpx.HTTPStatusError as e:
+                if self.controller is not None and _is_server_error(e):
+                    self.controller.record_error()
+                raise
             except _TRANSIENT_ERRORS as e:
+                if self.controller is not None:
+                    self.controller.record_error()
                 if attempt >= _MAX_RETRIES - 1:
                     raise
                 delay = _RETRY_BASE_DELAY * (2**attempt)
@@ -310,6 +456,10 @@ class Fetcher:
                 )
                 if self._cancel.wait(delay):
                     raise InterruptedError("cancelled")
+            else:
+                if self.controller is not None:
+                    self.controller.record_success(time.monotonic() - t0)
+                return result
 
     def __enter__(self):
         """Enter the context manager and return this `Fetcher`."""
@@ -326,6 +476,222 @@ class Fetcher:
         self.sidra_client.__exit__(exc_type, exc_value, traceback)
 
 
+class AsyncFetcher(Fetcher):
+    """Asyncio-based `Fetcher` that multiplexes downloads on one event loop.
+
+    Planning and metadata requests are inherited from `Fetcher` and stay
+    synchronous. ``download_periods`` keeps the same contract but runs
+    ``max_workers`` coroutines over a shared ``httpx.AsyncClient``, so
+    hundreds of requests can be in flight without one OS thread each.
+    Parsed responses are written to disk through a small thread pool of
+    ``write_workers`` so file I/O never blocks the event loop.
+
+    Retry and cancellation semantics match `Fetcher`: transient network
+    errors are retried with the same exponential backoff, and a
+    ``KeyboardInterrupt`` cancels every in-flight request before being
+    re-raised.
+    """
+
+    def __init__(
+        self,
+        config: Config,
+        max_workers: int = 100,
+        storage: Storage | None = None,
+        write_workers: int = 4,
+        rate_limiter: RateLimiter | None = None,
+        stream: bool = False,
+    ):
+        super().__init__(
+            config,
+            max_workers=max_workers,
+            storage=storage,
+            rate_limiter=rate_limiter,
+            stream=stream,
+        )
+        self.write_workers = write_workers
+
+    def download_periods(
+        self,
+        plan: list[tuple[Any, Parametro, str]],
+        on_file_done: Callable[[Any], None] | None = None,
+        on_result: Callable[[dict[str, Any]], None] | None = None,
+        admit: Callable[[Any], bool] | None = None,
+    ) -> list[dict[str, Any]]:
+        """Download many periods concurrently on a private event loop.
+
+        See `Fetcher.download_periods` for the arguments and return value.
+        Callbacks (including *admit*) run on the event loop thread and
+        must not block.
+        """
+        try:
+            return asyncio.run(
+                self._download_periods(plan, on_file_done, on_result, admit)
+            )
+        except KeyboardInterrupt:
+            self._cancel.set()
+            raise
+
+    async def _download_periods(
+        self,
+        plan: list[tuple[Any, Parametro, str]],
+        on_file_done: Callable[[Any], None] | None,
+        on_result: Callable[[dict[str, Any]], None] | None = None,
+        admit: Callable[[Any], bool] | None = None,
+    ) -> list[dict[str, Any]]:
+        results: list[dict[str, Any]] = []
+        errors: list[Exception] = []
+        # Workers pull from one shared iterator instead of spawning a task
+        # per entry, so plans with tens of thousands of periods stay cheap.
+        pending = iter(plan)
+        limits = httpx.Limits(
+            max_connections=self.max_workers,
+            max_keepalive_connections=self.max_workers,
+        )
+
+        with ThreadPoolExecutor(max_workers=self.write_workers) as writer:
+            async with httpx.AsyncClient(
+                timeout=_HTTP_TIMEOUT, limits=limits, follow_redirects=True
+            ) as client:
+
+                async def _worker() -> None:
+                    for key, parameter, modification in pending:
+                        try:
+                            if admit is not None:
+                                while not admit(key):
+                                    if self._cancel.is_set():
+                                        raise InterruptedError("cancelled")
+                                    await asyncio.sleep(_ADMIT_POLL_INTERVAL)
+                            filepath = await self._download_period_async(
+                                client, writer, parameter, modification
+                            )
+                        except Exception as e:
+                            logger.error("Period download failed: %s", e)
+                            errors.append(e)
+                        else:
+                            result = {
+                                "key": key,
+                                "filepath": filepath,
+                                "modificacao": modification,
+                            }
+                            results.append(result)
+                            if on_result is not None:
+                                on_result(result)
+                        if on_file_done is not None:
+                            on_file_done(key)
+
+                n_workers = min(self.max_workers, len(plan))
+                await asyncio.gather(*(_worker() for _ in range(n_workers)))
+
+        if errors:
+            raise errors[0]
+        return results
+
+    async def _download_period_async(
+        self,
+        client: httpx.AsyncClient,
+        writer: ThreadPoolExecutor,
+        parameter: Parametro,
+        modification: str,
+    ) -> Path:
+        """Download a single period and save it.
+
+        Returns the destination path.
+        """
+        if self._cancel.is_set():
+            raise InterruptedError("cancelled")
+        filepath = self.storage.find_data_filepath(parameter, modification)
+        if filepath is not None:
+            logger.debug("File already exists (cache hit): %s", filepath)
+            return filepath
+        logger.info(
+            "Downloading %s",
+            self.storage.get_data_filepath(parameter, modification).name,
+        )
+        if self.stream and self.storage.codec.streamable:
+            return await self.stream_table_async(
+                client, writer, parameter, modification
+            )
+        data = await self.get_table_async(client, parameter)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            writer,
+            functools.partial(
+                self.storage.write_data,
+                data=data,
+                parameter=parameter,
+                modification=modification,
+            ),
+        )
+
+    async def get_table_async(
+        self, client: httpx.AsyncClient, parameter: Parametro
+    ) -> dict:
+        """Async counterpart of `Fetcher.get_table` using *client*."""
+        url = parameter.url()
+
+        async def _attempt() -> dict:
+            response = await client.get(url)
+            response.raise_for_status()
+            return orjson.loads(response.content)
+
+        return await self._with_retries_async(_attempt)
+
+    async def stream_table_async(
+        self,
+        client: httpx.AsyncClient,
+        writer: ThreadPoolExecutor,
+        parameter: Parametro,
+        modification: str,
+    ) -> Path:
+        """Async counterpart of `Fetcher.stream_table`.
+
+        Chunks are written through *writer* so disk I/O stays off the
+        event loop.
+        """
+        url = parameter.url()
+        loop = asyncio.get_running_loop()
+
+        async def _attempt() -> Path:
+            with self.storage.stream_writer(parameter, modification) as f:
+                async with client.stream("GET", url) as response:
+                    response.raise_for_status()
+                    async for chunk in response.aiter_bytes(
+                        _STREAM_CHUNK_SIZE
+                    ):
+                        await loop.run_in_executor(writer, f.write, chunk)
+            return self.storage.get_data_filepath(parameter, modification)
+
+        return await self._with_retries_async(_attempt)
+
+    async def _with_retries_async(
+        self, attempt_fn: Callable[[], Awaitable[_T]]
+    ) -> _T:
+        """Async counterpart of `Fetcher._with_retries`."""
+        for attempt in range(_MAX_RETRIES):
+            if self._cancel.is_set():
+                raise InterruptedError("cancelled")
+            if self.rate_limiter is not None:
+                # reserve() blocks on a file lock shared with other
+                # processes; keep it off the event loop.
+                delay = await asyncio.to_thread(self.rate_limiter.reserve)
+                if delay > 0:
+                    await asyncio.sleep(delay)
+            try:
+                return await attempt_fn()
+            except _TRANSIENT_ERRORS as e:
+                if attempt >= _MAX_RETRIES - 1:
+                    raise
+                delay = _RETRY_BASE_DELAY * (2**attempt)
+                logger.error("%s while fetching data: %s", type(e).__name__, e)
+                logger.info(
+                    "Retrying in %d s (attempt %d/%d)…",
+                    delay,
+                    attempt + 1,
+                    _MAX_RETRIES,
+                )
+                await asyncio.sleep(delay)
+
+
 def unnest_classificacoes(
     classificacoes: list[Classificacao],
     data: dict[str, list[str]] | None = None,
@@ -4,10 +4,48 @@ This module provides the `Storage` class, which centralizes all
 filesystem operations for SIDRA tables: constructing deterministic file
 paths from a `Parametro`, checking whether a file already exists, and
 reading/writing JSON data files.
+
+Data files are always written through a temporary file in the same
+directory and renamed into place, so a crash or interruption never leaves
+a truncated file that later runs would mistake for a cache hit.
+
+On-disk format
+--------------
+How period files are encoded is chosen with ``[storage] format`` in
+``config.ini`` and recorded in the file extension, so caches written with
+different formats can coexist and are all read back transparently:
+
+=================  ==================  ===================================
+format             extension           layout
+=================  ==================  ===================================
+``json``           ``.json``           pretty-printed JSON (default)
+``json-compact``   ``.json``           JSON without indentation
+``json-gzip``      ``.json.gz``        gzip-compressed compact JSON
+``json-zstd``      ``.json.zst``       zstd-compressed compact JSON
+                                       (requires ``zstandard``)
+``columnar``       ``.cols.json.gz``   gzip-compressed column-oriented
+                                       JSON (key names stored once)
+=================  ==================  ===================================
+
+Staging cache
+-------------
+`iter_rows` serves the loaders a projection of a data file (only the
+columns they ask for) with the ``"..."``/``"-"`` → ``None`` normalization
+already applied. When ``pyarrow`` is installed the parsed rows are kept in
+a derived Parquet file under ``t-<id>/_cache/`` the first time a data file
+is read, so later passes and re-loads read only the requested columns
+instead of re-parsing the whole JSON document. Without ``pyarrow`` rows
+are projected straight from the data file.
 """
 
+import gzip
+import hashlib
 import logging
+import os
+import tempfile
+from contextlib import contextmanager
 from pathlib import Path
+from typing import Any, BinaryIO, Iterable, Iterator
 
 import orjson
 from sidra_fetcher.agregados import Agregado
@@ -16,19 +54,182 @@ from sidra_fetcher.sidra import Parametro
 
 from .config import Config
 
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # pragma: no cover - optional dependency
+    pa = pq = None
+
 logger = logging.getLogger(__name__)
 
+METADATA_FILENAME = "metadados.json"
+CACHE_DIRNAME = "_cache"
+
+
+def _zstandard():
+    try:
+        import zstandard
+    except ImportError as e:
+        raise ImportError(
+            "The 'json-zstd' storage format requires the 'zstandard' "
+            "package: pip install 'sidra-sql[zstd]'"
+        ) from e
+    return zstandard
+
+
+class _Codec:
+    """Encoding of a SIDRA response (``[header, *rows]``) on disk."""
+
+    name: str
+    suffix: str
+    # Whether a raw JSON response body can be piped through `wrap_writer`
+    # without parsing it first (see `Storage.stream_writer`).
+    streamable = True
+
+    def encode(self, data: Any) -> bytes:
+        return orjson.dumps(data)
+
+    def decode(self, raw: bytes) -> Any:
+        return orjson.loads(raw)
+
+    @contextmanager
+    def wrap_writer(self, f: BinaryIO) -> Iterator[BinaryIO]:
+        yield f
+
+    def read(self, filepath: Path) -> Any:
+        with filepath.open("rb") as f:
+            return self.decode(f.read())
+
+
+class _JsonCodec(_Codec):
+    name = "json"
+    suffix = ".json"
+
+    def encode(self, data: Any) -> bytes:
+        return orjson.dumps(data, option=orjson.OPT_INDENT_2)
+
+
+class _CompactJsonCodec(_Codec):
+    name = "json-compact"
+    suffix = ".json"
+
+
+class _GzipJsonCodec(_Codec):
+    name = "json-gzip"
+    suffix = ".json.gz"
+
+    def encode(self, data: Any) -> bytes:
+        return gzip.compress(orjson.dumps(data), compresslevel=6)
+
+    def decode(self, raw: bytes) -> Any:
+        return orjson.loads(gzip.decompress(raw))
+
+    @contextmanager
+    def wrap_writer(self, f: BinaryIO) -> Iterator[BinaryIO]:
+        with gzip.GzipFile(fileobj=f, mode="wb", compresslevel=6) as gz:
+            yield gz
+
+
+class _ZstdJsonCodec(_Codec):
+    name = "json-zstd"
+    suffix = ".json.zst"
+
+    def encode(self, data: Any) -> bytes:
+        return _zstandard().ZstdCompressor().compress(orjson.dumps(data))
+
+    def decode(self, raw: bytes) -> Any:
+        # Frames written by `wrap_writer` do not record their content
+        # size, so decompress through a stream reader.
+        reader = _zstandard().ZstdDecompressor().stream_reader(raw)
+        with reader:
+            return orjson.loads(reader.read())
+
+    @contextmanager
+    def wrap_writer(self, f: BinaryIO) -> Iterator[BinaryIO]:
+        compressor = _zstandard().ZstdCompressor()
+        with compressor.stream_writer(f, closefd=False) as zf:
+            yield zf
+
+
+class _ColumnarCodec(_Codec):
+    """``{"header": {...}, "columns": {"NC": [...], ...}}``, gzipped.
+
+    Formato.A rows repeat every key name in every row; storing one list
+    per column keeps each name once and compresses much better.
+    """
+
+    name = "columnar"
+    suffix = ".cols.json.gz"
+    streamable = False
+
+    def encode(self, data: Any) -> bytes:
+        header, rows = (data[0], data[1:]) if data else ({}, [])
+        keys = list(header) or list(rows[0] if rows else [])
+        columns = {k: [row.get(k) for row in rows] for k in keys}
+        payload = {"header": header, "columns": columns}
+        return gzip.compress(orjson.dumps(payload), compresslevel=6)
+
+    def decode(self, raw: bytes) -> Any:
+        payload = orjson.loads(gzip.decompress(raw))
+        columns = payload["columns"]
+        keys = list(columns)
+        rows = [
+            dict(zip(keys, values, strict=True))
+            for values in zip(*columns.values(), strict=True)
+        ]
+        return [payload["header"], *rows]
+
+
+CODECS: dict[str, _Codec] = {
+    codec.name: codec
+    for codec in (
+        _JsonCodec(),
+        _CompactJsonCodec(),
+        _GzipJsonCodec(),
+        _ZstdJsonCodec(),
+        _ColumnarCodec(),
+    )
+}
+
+# Longest suffix first so ".cols.json.gz" wins over ".json.gz".
+_READ_CODECS: list[_Codec] = sorted(
+    {c.suffix: c for c in reversed(list(CODECS.values()))}.values(),
+    key=lambda c: len(c.suffix),
+    reverse=True,
+)
+
+
+def codec_for_path(filepath: Path) -> _Codec | None:
+    """Return the codec that reads *filepath*, or None if it is not data."""
+    name = filepath.name
+    if name == METADATA_FILENAME:
+        return None
+    for codec in _READ_CODECS:
+        if name.endswith(codec.suffix):
+            return codec
+    return None
+
+
+def _cache_value(value: Any) -> str | None:
+    return value if value is None or isinstance(value, str) else str(value)
+
 
 class Storage:
-    def __init__(self, data_dir: Path | str):
+    def __init__(self, data_dir: Path | str, format: str = "json"):
+        if format not in CODECS:
+            raise ValueError(
+                f"Unknown storage format {format!r}; "
+                f"expected one of {', '.join(CODECS)}"
+            )
         self.data_dir = Path(data_dir)
+        self.codec = CODECS[format]
 
     @classmethod
     def default(cls, config: Config) -> "Storage":
         """Create a Storage rooted at the data directory from config."""
         data_dir = config.data_dir
         data_dir.mkdir(exist_ok=True, parents=True)
-        return cls(data_dir)
+        return cls(data_dir, format=config.storage_format)
 
     @staticmethod
     def build_data_filename(parameter: Parametro, modification: str) -> str:
@@ -73,20 +274,91 @@ class Storage:
 
     def get_metadata_filepath(self, agregado: int | str) -> Path:
         """Return the full path for a table's metadata JSON file."""
-        return self.data_dir / f"t-{agregado}" / "metadados.json"
+        return self.data_dir / f"t-{agregado}" / METADATA_FILENAME
 
     def get_data_filepath(
         self,
         parameter: Parametro,
         modification: str,
     ) -> Path:
-        """Return the full path for the given parameter and modification."""
+        """Return the path a new file for *parameter* is written to.
+
+        The extension follows the configured storage format; use
+        `find_data_filepath` to locate a file written in any format.
+        """
         filename = self.build_data_filename(parameter, modification)
+        filename = filename.removesuffix(".json") + self.codec.suffix
         return self.data_dir / f"t-{parameter.agregado}" / filename
 
+    def find_data_filepath(
+        self,
+        parameter: Parametro,
+        modification: str,
+    ) -> Path | None:
+        """Return the existing data file for *parameter*, in any format.
+
+        The configured format is checked first; None if nothing exists.
+        """
+        preferred = self.get_data_filepath(parameter, modification)
+        if preferred.exists():
+            return preferred
+        stem = self.build_data_filename(parameter, modification)
+        stem = stem.removesuffix(".json")
+        for codec in _READ_CODECS:
+            candidate = preferred.with_name(stem + codec.suffix)
+            if candidate.exists():
+                return candidate
+        return None
+
     def exists(self, parameter: Parametro, modification: str) -> bool:
-        """Return True if the file for the given parameter already exists."""
-        return self.get_data_filepath(parameter, modification).exists()
+        """Return True if a file for the given parameter already exists."""
+        return self.find_data_filepath(parameter, modification) is not None
+
+    @contextmanager
+    def atomic_writer(
+        self,
+        parameter: Parametro,
+        modification: str,
+    ) -> Iterator[BinaryIO]:
+        """Open a binary temp file that replaces the data file on success.
+
+        The temporary file lives in the destination directory (``t-<id>/``)
+        under a hidden ``.part`` name, so it is never picked up as data.
+        It is renamed over the destination when the ``with`` block exits
+        normally and removed if the block raises.
+        """
+        filepath = self.get_data_filepath(parameter, modification)
+        filepath.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_name = tempfile.mkstemp(
+            dir=filepath.parent, prefix=f".{filepath.name}.", suffix=".part"
+        )
+        try:
+            with os.fdopen(fd, "wb") as f:
+                yield f
+            os.replace(tmp_name, filepath)
+        except BaseException:
+            Path(tmp_name).unlink(missing_ok=True)
+            raise
+        logger.info("Wrote file %s", filepath)
+
+    @contextmanager
+    def stream_writer(
+        self,
+        parameter: Parametro,
+        modification: str,
+    ) -> Iterator[BinaryIO]:
+        """Like `atomic_writer`, but bytes written are raw JSON.
+
+        The configured codec compresses them on the fly. Only valid for
+        streamable formats (see ``codec.streamable``).
+        """
+        if not self.codec.streamable:
+            raise ValueError(
+                f"Storage format {self.codec.name!r} cannot be streamed"
+            )
+        with self.atomic_writer(parameter, modification) as f:
+            with self.codec.wrap_writer(f) as w:
+                yield w
 
     def write_data(
         self,
@@ -94,26 +366,28 @@ class Storage:
         parameter: Parametro,
         modification: str,
     ) -> Path:
-        """Write *data* to disk as JSON and return the destination path."""
+        """Write *data* in the configured format and return its path."""
         filepath = self.get_data_filepath(parameter, modification)
-        filepath.parent.mkdir(parents=True, exist_ok=True)
         logger.info("Writing file %s", filepath)
-        with filepath.open("w", encoding="utf-8") as f:
-            f.write(orjson.dumps(data, option=orjson.OPT_INDENT_2).decode())
+        with self.atomic_writer(parameter, modification) as f:
+            f.write(self.codec.encode(data))
         return filepath
 
     def read_data(self, filepath: Path) -> list[dict]:
-        """Read a JSON file previously written by `write`.
+        """Read a data file previously written by `write_data`.
+
+        The format is detected from the file extension, so files written
+        with any storage format can be read.
 
         Args:
-            filepath: Path to the JSON file to read.
+            filepath: Path to the data file to read.
 
         Returns:
             A list of dicts containing the table data.
         """
         logger.info("Reading file %s", filepath)
-        with filepath.open("rb") as f:
-            data = orjson.loads(f.read())
+        codec = codec_for_path(filepath) or self.codec
+        data = codec.read(filepath)
 
         if len(data) > 1:
             rows = data[1:]
@@ -138,12 +412,103 @@ class Storage:
         agregado = load_agregado(filepath)
         return agregado
 
+    @staticmethod
+    def file_hash(filepath: Path) -> str:
+        """Return the SHA-256 hex digest of *filepath*'s content."""
+        digest = hashlib.sha256()
+        with filepath.open("rb") as f:
+            while chunk := f.read(1024 * 1024):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    @staticmethod
+    def get_cache_filepath(filepath: Path) -> Path:
+        """Return the Parquet staging cache path derived from *filepath*."""
+        codec = codec_for_path(filepath)
+        stem = filepath.name.removesuffix(codec.suffix if codec else "")
+        return filepath.parent / CACHE_DIRNAME / f"{stem}.parquet"
+
+    def iter_rows(
+        self,
+        filepath: Path,
+        columns: Iterable[str],
+    ) -> Iterator[dict]:
+        """Yield the data rows of *filepath* restricted to *columns*.
+
+        Rows are normalized like `read_data`; columns absent from the
+        file are simply missing from the yielded dicts. The staging cache
+        is used (and created on first read) when ``pyarrow`` is available.
+        """
+        columns = list(columns)
+        if pq is None:
+            for row in self.read_data(filepath):
+                yield {c: row[c] for c in columns if c in row}
+            return
+
+        cache_path = self.get_cache_filepath(filepath)
+        if not self._cache_is_fresh(filepath, cache_path):
+            self._write_cache(cache_path, self.read_data(filepath))
+        logger.debug("Reading cache %s", cache_path)
+        parquet_file = pq.ParquetFile(cache_path)
+        present = [c for c in columns if c in parquet_file.schema_arrow.names]
+        table = parquet_file.read(columns=present)
+        values = [table.column(c).to_pylist() for c in present]
+        for row_values in zip(*values, strict=True):
+            yield dict(zip(present, row_values, strict=True))
+
+    @staticmethod
+    def _cache_is_fresh(filepath: Path, cache_path: Path) -> bool:
+        try:
+            cache_mtime = cache_path.stat().st_mtime_ns
+        except FileNotFoundError:
+            return False
+        return cache_mtime >= filepath.stat().st_mtime_ns
+
+    @staticmethod
+    def _write_cache(cache_path: Path, rows: list[dict]) -> None:
+        """Write *rows* to *cache_path* as Parquet string columns."""
+        keys = list(rows[0]) if rows else []
+        table = pa.table(
+            {
+                k: pa.array(
+                    [_cache_value(row.get(k)) for row in rows],
+                    type=pa.string(),
+                )
+                for k in keys
+            }
+        )
+        cache_path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_name = tempfile.mkstemp(
+            dir=cache_path.parent,
+            prefix=f".{cache_path.name}.",
+            suffix=".part",
+        )
+        os.close(fd)
+        try:
+            pq.write_table(table, tmp_name)
+            os.replace(tmp_name, cache_path)
+        except BaseException:
+            Path(tmp_name).unlink(missing_ok=True)
+            raise
+        logger.debug("Wrote cache %s", cache_path)
+
+    @staticmethod
+    def list_data_files(dirpath: Path) -> list[Path]:
+        """Return every data file in *dirpath*, whatever its format."""
+        if not dirpath.is_dir():
+            return []
+        return sorted(
+            f
+            for f in dirpath.iterdir()
+            if f.is_file() and codec_for_path(f) is not None
+        )
+
     def read_data_dir(self, dirpath: Path) -> list[dict]:
         # Group files by base name (before the @modification suffix) and keep
         # only the file with the latest modification per parameter combination.
         latest: dict[str, tuple[Path, str]] = {}
-        for f in dirpath.glob("*.json"):
-            stem = f.stem
+        for f in self.list_data_files(dirpath):
+            stem = f.name.removesuffix(codec_for_path(f).suffix)
             if "@" in stem:
                 base, mod = stem.rsplit("@", 1)
             else:
@@ -53,9 +53,12 @@ Example TOML
 """
 
 import logging
+import queue
+from contextlib import ExitStack, contextmanager
+import threading
 import tomllib
 from pathlib import Path
-from typing import Any, Iterable
+from typing import Any, Iterable, Iterator
 
 import sqlalchemy as sa
 from rich.console import Console
@@ -72,9 +75,11 @@ from rich.progress import (
     TimeRemainingColumn,
 )
 
-from . import database, models, sidra
+from . import database, sidra
+from .concurrency import AIMDController
 from .config import Config
-from .storage import Storage
+from .lookup_cache import LookupCache
+from .storage import Storage, codec_for_path
 
 logger = logging.getLogger(__name__)
 
@@ -93,6 +98,29 @@ class _MainOnlyTimeRemainingColumn(TimeRemainingColumn):
         return super().render(task)
 
 
+class _ConcurrencyColumn(TextColumn):
+    """Show the adaptive concurrency limit on tasks that carry one."""
+
+    def __init__(self):
+        super().__init__("", style="grey70")
+
+    def render(self, task):
+        limit = task.fields.get("limit")
+        if limit is None:
+            return Text("")
+        decision = task.fields.get("decision")
+        text = f"limite {limit}"
+        if decision:
+            text += f" ({decision})"
+        return Text(text, style="grey70")
+
+
+def _data_stem(filename: str) -> str:
+    """Strip the storage-format suffix so any format of a file matches."""
+    codec = codec_for_path(Path(filename))
+    return filename if codec is None else filename.removesuffix(codec.suffix)
+
+
 def _make_progress(console: Console | None) -> Progress:
     return Progress(
         SpinnerColumn(finished_text="[green]✓[/green]"),
@@ -121,12 +149,38 @@ def _make_download_progress(console: Console | None) -> Progress:
         MofNCompleteColumn(),
         _MainOnlyTimeElapsedColumn(),
         _MainOnlyTimeRemainingColumn(),
+        _ConcurrencyColumn(),
         console=console,
         transient=False,
         disable=console is None,
     )
 
 
+def make_fetcher(
+    config: Config,
+    storage: Storage,
+    max_workers: int | None = None,
+    async_fetch: bool = False,
+    adaptive_concurrency: bool = False,
+    stream_downloads: bool = False,
+) -> sidra.Fetcher:
+    """Build the fetcher described by the `TomlScript` download options."""
+    if async_fetch and adaptive_concurrency:
+        raise ValueError(
+            "adaptive_concurrency is only supported by the thread-pool fetcher"
+        )
+    fetcher_cls = sidra.AsyncFetcher if async_fetch else sidra.Fetcher
+    fetcher_kwargs = (
+        {} if max_workers is None else {"max_workers": max_workers}
+    )
+    fetcher_kwargs["stream"] = stream_downloads
+    if adaptive_concurrency:
+        fetcher_kwargs["controller"] = AIMDController(
+            maximum=max_workers or 32
+        )
+    return fetcher_cls(config, storage=storage, **fetcher_kwargs)
+
+
 class TomlScript:
     """ETL pipeline runner that loads table definitions from a TOML file.
 
@@ -136,24 +190,105 @@ class TomlScript:
     2. Fetch and save metadata (tabela_sidra, localidade).
     3. Download all data files.
     4. Load data rows into the dados table (also upserts dimensions).
+
+    With ``async_fetch=True`` downloads go through `sidra.AsyncFetcher`
+    instead of the thread-pool `sidra.Fetcher`; ``max_workers`` then caps
+    concurrent requests on the event loop rather than OS threads. When
+    omitted, each fetcher's own default is used.
+
+    With ``adaptive_concurrency=True`` the thread-pool fetcher is driven by
+    an `AIMDController`: ``max_workers`` becomes the ceiling and the
+    number of in-flight downloads follows the observed latency and
+    transient-error rate. The current limit is shown next to the
+    download progress bar.
+
+    With ``stream_downloads=True`` response bodies are streamed to disk
+    without being parsed, keeping per-worker memory at one chunk.
+
+    With ``single_pass=True`` `database.load_dados` reads each data file
+    once and resolves surrogate IDs inside PostgreSQL.
+
+    ``load_workers`` is the number of SIDRA tables loaded into the database
+    concurrently, each on its own connection.
+
+    With ``pipelined=True`` each table is loaded as soon as its downloads
+    finish, while other tables are still downloading (see
+    `_download_and_load`); downloads start for at most
+    ``load_queue_size`` tables beyond the ones being loaded.
+
+    Files already recorded in the ``carga`` ledger are not loaded again
+    unless ``reload=True``.
+
+    With ``bulk=True`` a load into an empty dados runs without its
+    secondary indexes, which are rebuilt afterwards (see
+    `database.bulk_load`); the duration of each phase is reported. The
+    indexes are dropped once the first files are ready to load, not while
+    the downloads before them run.
+
+    Surrogate IDs resolved while loading are kept in *lookup_cache* (a
+    `LookupCache`). Pass one shared instance to reuse them across
+    scripts; by default each script gets its own.
+
+    Several scripts of one run can also share an *engine* (whose tables
+    the caller has created) and an already entered *fetcher* (see
+    `make_fetcher`); the fetcher options above are then ignored. Tables
+    whose metadata the shared fetcher already holds are not read or saved
+    again.
+
+    With ``update=True`` only the period list of each table is fetched
+    again (cached metadata is otherwise reused) and only the periods whose
+    data file, named after the period's modification date, is missing
+    from the ``carga`` ledger are planned — new and revised periods.
     """
 
     def __init__(
         self,
         config: Config,
         toml_path: Path,
-        max_workers: int = 4,
+        max_workers: int | None = None,
         force_metadata: bool = False,
         console: Console | None = None,
+        async_fetch: bool = False,
+        adaptive_concurrency: bool = False,
+        stream_downloads: bool = False,
+        single_pass: bool = False,
+        load_workers: int = 1,
+        pipelined: bool = False,
+        load_queue_size: int = 4,
+        reload: bool = False,
+        update: bool = False,
+        bulk: bool = False,
+        lookup_cache: LookupCache | None = None,
+        engine: sa.Engine | None = None,
+        fetcher: sidra.Fetcher | None = None,
     ):
         self.config = config
         self.toml_path = toml_path
         self.force_metadata = force_metadata
         self.console = console
-        self.storage = Storage.default(config)
-        self.fetcher = sidra.Fetcher(
-            config, max_workers=max_workers, storage=self.storage
-        )
+        self.single_pass = single_pass
+        self.load_workers = load_workers
+        self.pipelined = pipelined
+        self.load_queue_size = load_queue_size
+        self.reload = reload
+        self.update = update
+        self.bulk = bulk
+        if lookup_cache is None:
+            lookup_cache = LookupCache(config.db_lookup_cache_size)
+        self.lookup_cache = lookup_cache
+        self.engine = engine
+        self._owns_fetcher = fetcher is None
+        if fetcher is None:
+            fetcher = make_fetcher(
+                config,
+                Storage.default(config),
+                max_workers=max_workers,
+                async_fetch=async_fetch,
+                adaptive_concurrency=adaptive_concurrency,
+                stream_downloads=stream_downloads,
+            )
+        self.fetcher = fetcher
+        self.storage = fetcher.storage
 
     def get_tabelas(self) -> Iterable[dict[str, Any]]:
         """Read the TOML file and return an expanded list of table request dicts."""
@@ -167,9 +302,7 @@ class TomlScript:
             split_vars = entry.pop("split_variables", False)
 
             if unnest is not False:
-                metadados = self.fetcher.sidra_client.get_agregado_metadados(
-                    entry["tabela_sidra"]
-                )
+                metadados = self._unnest_metadata(entry["tabela_sidra"])
                 if unnest is True:
                     entry.pop("classifications", None)
                     to_unnest = metadados.classificacoes
@@ -205,6 +338,22 @@ class TomlScript:
 
         return result
 
+    def _unnest_metadata(self, tabela_sidra_id: str) -> Any:
+        """Return the metadata whose classifications a table unnests.
+
+        Like `load_metadata`, reuses the metadata already held by the
+        fetcher or cached on disk unless *force_metadata* is set, so
+        ``update`` runs do not fetch it again for every table.
+        """
+        if str(tabela_sidra_id) in self.fetcher.agregados:
+            return self.fetcher.agregados[str(tabela_sidra_id)]
+        metadata_filepath = self.storage.get_metadata_filepath(tabela_sidra_id)
+        if metadata_filepath.exists() and not self.force_metadata:
+            return self.storage.read_metadata(tabela_sidra_id)
+        return self.fetcher.sidra_client.get_agregado_metadados(
+            tabela_sidra_id
+        )
+
     def download(
         self, tabelas: Iterable[dict[str, Any]]
     ) -> list[dict[str, Any]]:
@@ -225,6 +374,44 @@ class TomlScript:
             for r in results
         ]
 
+    def plan(
+        self, engine: sa.Engine, tabelas: Iterable[dict[str, Any]]
+    ) -> list[tuple[dict[str, Any], Any, str]]:
+        """Build the flat download plan of (tabela, parameter, modification).
+
+        In update mode, entries whose data file is already in the carga
+        ledger are left out.
+        """
+        plan: list[tuple[dict[str, Any], Any, str]] = []
+        loaded: dict[str, set[str]] = {}
+        n_skipped = 0
+        for tabela in tabelas:
+            sid = str(tabela["tabela_sidra"])
+            if self.update and sid not in loaded:
+                loaded[sid] = {
+                    _data_stem(arquivo)
+                    for arquivo in database.loaded_arquivos(engine, sid)
+                }
+            for parameter, modification in self.fetcher.plan_periods(**tabela):
+                if self.update and (
+                    _data_stem(
+                        self.storage.build_data_filename(
+                            parameter, modification
+                        )
+                    )
+                    in loaded[sid]
+                ):
+                    n_skipped += 1
+                    continue
+                plan.append((tabela, parameter, modification))
+        if self.update:
+            logger.info(
+                "Update: %d new or revised files, %d unchanged",
+                len(plan),
+                n_skipped,
+            )
+        return plan
+
     def load_metadata(
         self, engine: sa.Engine, tabelas: Iterable[dict[str, Any]]
     ):
@@ -235,6 +422,12 @@ class TomlScript:
             if tabela_sidra_id in seen:
                 continue
             seen.add(tabela_sidra_id)
+            if str(tabela_sidra_id) in self.fetcher.agregados:
+                logger.info(
+                    "Metadata for table %s already saved in this run",
+                    tabela_sidra_id,
+                )
+                continue
 
             metadata_filepath = self.storage.get_metadata_filepath(
                 tabela_sidra_id
@@ -244,6 +437,14 @@ class TomlScript:
                     "Reading cached metadata for table %s", tabela_sidra_id
                 )
                 agregado = self.storage.read_metadata(tabela_sidra_id)
+                if self.update:
+                    logger.info(
+                        "Refreshing periods for table %s", tabela_sidra_id
+                    )
+                    agregado.periodos = self.fetcher.fetch_periodos(
+                        tabela_sidra_id
+                    )
+                    self.storage.write_metadata(agregado)
             else:
                 logger.info("Fetching metadata for table %s", tabela_sidra_id)
                 agregado = self.fetcher.fetch_metadata(tabela_sidra_id)
@@ -253,11 +454,218 @@ class TomlScript:
                 "Saving metadata to database for table %s", tabela_sidra_id
             )
             database.save_agregado(engine, agregado)
+            self.fetcher.agregados[str(tabela_sidra_id)] = agregado
+
+    def _download_and_load(
+        self,
+        engine: sa.Engine,
+        plan: list[tuple[dict[str, Any], Any, str]],
+        files_per_table: dict[str, int],
+    ):
+        """Download *plan* while loading finished tables in the background.
+
+        As soon as the last period of a table is downloaded its files are
+        put on a queue consumed by ``load_workers`` loader threads, so the
+        database load of early tables overlaps the download of the later
+        ones. Downloads are throttled to the pace of the loaders: a table
+        takes one of ``load_workers + load_queue_size`` slots before its
+        first period is downloaded and gives it back once it is loaded, so
+        the download callbacks never block. A table with a failed download
+        is not loaded; the download error is raised once everything else
+        has finished. With ``bulk=True`` the dados indexes are dropped when
+        the first table reaches a loader and rebuilt after the last load.
+        """
+        passes = 1 if self.single_pass else 2
+        n_loaders = database.clamp_workers(
+            engine, max(1, self.load_workers), "loaders"
+        )
+        load_queue: queue.Queue[list[dict[str, Any]] | None] = queue.Queue()
+        remaining = dict(files_per_table)
+        ready: dict[str, list[dict[str, Any]]] = {}
+        load_errors: list[Exception] = []
+        stop = threading.Event()
+        slots = threading.Semaphore(n_loaders + self.load_queue_size)
+        admitted: set[str] = set()
+        admitted_lock = threading.Lock()
+        # Admission follows plan order, so keep each table's periods
+        # together: a table is never admitted while an earlier one still
+        # waits behind it for a free download worker.
+        order = {sid: i for i, sid in enumerate(files_per_table)}
+        plan = sorted(plan, key=lambda entry: order[entry[0]["tabela_sidra"]])
+        bulk_lock = threading.Lock()
+        bulk_started = False
+
+        with (
+            ExitStack() as bulk_stack,
+            _make_download_progress(self.console) as progress,
+        ):
+            download_task = progress.add_task(
+                "Download", total=len(plan), main=True
+            )
+            load_task = progress.add_task(
+                "Carregando no banco de dados",
+                total=len(plan) * passes,
+                main=True,
+            )
+            task_by_table: dict[str, TaskID] = {}
+            if len(files_per_table) > 1:
+                for sid, count in files_per_table.items():
+                    task_by_table[sid] = progress.add_task(
+                        f"Tabela {sid}", total=count
+                    )
+
+            def _admit(key: dict[str, Any]) -> bool:
+                sid = key["tabela_sidra"]
+                with admitted_lock:
+                    if sid in admitted:
+                        return True
+                    if not slots.acquire(blocking=False):
+                        return False
+                    admitted.add(sid)
+                    return True
+
+            def _on_result(result: dict[str, Any]) -> None:
+                key = result["key"]
+                ready.setdefault(key["tabela_sidra"], []).append(
+                    key
+                    | {
+                        "filepath": result["filepath"],
+                        "modificacao": result["modificacao"],
+                    }
+                )
+
+            def _on_done(key: dict[str, Any]) -> None:
+                sid = key["tabela_sidra"]
+                progress.advance(download_task)
+                sub = task_by_table.get(sid)
+                if sub is not None:
+                    progress.advance(sub)
+                remaining[sid] -= 1
+                if remaining[sid] > 0:
+                    return
+                table_files = ready.pop(sid, [])
+                if len(table_files) < files_per_table[sid]:
+                    logger.warning(
+                        "Not loading table %s: some downloads failed", sid
+                    )
+                    progress.advance(load_task, files_per_table[sid] * passes)
+                    if sub is not None:
+                        progress.update(sub, description=f"Tabela {sid} ✗")
+                    slots.release()
+                    return
+                if sub is not None:
+                    progress.update(
+                        sub, description=f"Tabela {sid} (carregando)"
+                    )
+                load_queue.put(table_files)
+
+            def _on_db_file_done(sid: str) -> None:
+                progress.advance(load_task)
+
+            def _on_db_table_done(sid: str) -> None:
+                sub = task_by_table.get(sid)
+                if sub is not None:
+                    progress.update(sub, description=f"Tabela {sid} ✓")
+
+            def _start_bulk_load() -> None:
+                nonlocal bulk_started
+                with bulk_lock:
+                    if not bulk_started:
+                        bulk_started = True
+                        bulk_stack.enter_context(self._bulk_load(engine))
+
+            def _loader() -> None:
+                while (table_files := load_queue.get()) is not None:
+                    if stop.is_set():
+                        slots.release()
+                        continue
+                    try:
+                        _start_bulk_load()
+                        database.load_dados(
+                            engine,
+                            self.storage,
+                            table_files,
+                            on_file_done=_on_db_file_done,
+                            on_table_done=_on_db_table_done,
+                            single_pass=self.single_pass,
+                            reload=self.reload,
+                            lookup_cache=self.lookup_cache,
+                        )
+                    except Exception as e:
+                        logger.error("Database load failed: %s", e)
+                        load_errors.append(e)
+                    finally:
+                        slots.release()
+
+            loaders = [
+                threading.Thread(target=_loader, name=f"loader-{i}")
+                for i in range(n_loaders)
+            ]
+            for thread in loaders:
+                thread.start()
+            try:
+                self.fetcher.download_periods(
+                    plan,
+                    on_file_done=_on_done,
+                    on_result=_on_result,
+                    admit=_admit,
+                )
+            except KeyboardInterrupt:
+                stop.set()
+                raise
+            finally:
+                for _ in loaders:
+                    load_queue.put(None)
+                for thread in loaders:
+                    thread.join()
+
+            progress.update(download_task, description="Download concluído ✓")
+            progress.update(load_task, description="Carregamento concluído ✓")
+        if load_errors:
+            raise load_errors[0]
+
+    @contextmanager
+    def _bulk_load(self, engine: sa.Engine) -> Iterator[None]:
+        if not self.bulk:
+            yield
+            return
+        with database.bulk_load(engine) as timings:
+            yield
+        if self.console is not None:
+            labels = {
+                "drop": "Remoção de índices",
+                "load": "Carga",
+                "index": "Recriação de índices",
+                "analyze": "ANALYZE",
+            }
+            info = Table.grid(padding=(0, 2))
+            info.add_column(style="bold")
+            info.add_column(justify="right")
+            for phase, seconds in timings.items():
+                info.add_row(labels[phase], f"{seconds:.1f}s")
+            self.console.print(info)
+
+    @contextmanager
+    def _fetcher_session(self) -> Iterator[None]:
+        """Enter the fetcher, unless it is shared and entered by the caller."""
+        if not self._owns_fetcher:
+            yield
+            return
+        with self.fetcher:
+            yield
 
     def run(self):
         """Execute the full fetch-and-load pipeline."""
-        engine = database.get_engine(self.config)
-        models.Base.metadata.create_all(engine)
+        engine = self.engine
+        if engine is None:
+            # One connection per load worker or pipelined loader.
+            engine = database.get_engine(
+                self.config,
+                pool_size=max(database.DEFAULT_POOL_SIZE, self.load_workers),
+            )
+            database.create_tables(
+                engine, partition=self.config.db_partition_dados
+            )
         try:
             self._run(engine)
         except KeyboardInterrupt:
@@ -272,7 +680,7 @@ class TomlScript:
         n_meta = len({t["tabela_sidra"] for t in tabelas})
         s_meta = "tabela" if n_meta == 1 else "tabelas"
 
-        with self.fetcher:
+        with self._fetcher_session():
             with _make_progress(self.console) as progress:
                 meta_task = progress.add_task(
                     f"Metadados ({n_meta} {s_meta})", total=None, main=True
@@ -285,12 +693,7 @@ class TomlScript:
                     description=f"Metadados ({n_meta} {s_meta})",
                 )
 
-            plan: list[tuple[dict[str, Any], Any, str]] = []
-            for tabela in tabelas:
-                for parameter, modification in self.fetcher.plan_periods(
-                    **tabela
-                ):
-                    plan.append((tabela, parameter, modification))
+            plan = self.plan(engine, tabelas)
 
             n_plan = len(plan)
             if self.console is not None:
@@ -299,8 +702,21 @@ class TomlScript:
                 info.add_column()
                 info.add_row("Pipeline", str(self.toml_path))
                 info.add_row("Tabelas", f"{n_meta} {s_meta}")
-                info.add_row("Arquivos", str(n_plan))
-                info.add_row("Threads", str(self.fetcher.max_workers))
+                info.add_row(
+                    "Arquivos",
+                    f"{n_plan} novos ou revisados"
+                    if self.update
+                    else str(n_plan),
+                )
+                workers = str(self.fetcher.max_workers)
+                if getattr(self.fetcher, "controller", None) is not None:
+                    workers = f"até {workers} (adaptativo)"
+                info.add_row(
+                    "Conexões"
+                    if isinstance(self.fetcher, sidra.AsyncFetcher)
+                    else "Threads",
+                    workers,
+                )
                 info.add_row(
                     "Banco",
                     f"{self.config.db_host}:{self.config.db_port}/{self.config.db_name}"
@@ -315,6 +731,10 @@ class TomlScript:
                 sid = tabela["tabela_sidra"]
                 files_per_table[sid] = files_per_table.get(sid, 0) + 1
 
+            if self.pipelined:
+                self._download_and_load(engine, plan, files_per_table)
+                return
+
             with _make_download_progress(self.console) as progress:
                 global_task = progress.add_task(
                     "Download", total=n_plan, main=True
@@ -326,11 +746,21 @@ class TomlScript:
                             f"Tabela {sid}", total=count
                         )
 
+                controller = getattr(self.fetcher, "controller", None)
+                if controller is not None:
+                    progress.update(global_task, limit=controller.limit)
+
                 def _on_done(key: dict[str, Any]) -> None:
                     sub = task_by_table.get(key["tabela_sidra"])
                     if sub is not None:
                         progress.advance(sub)
                     progress.advance(global_task)
+                    if controller is not None:
+                        progress.update(
+                            global_task,
+                            limit=controller.limit,
+                            decision=controller.last_decision,
+                        )
 
                 results = self.fetcher.download_periods(
                     plan, on_file_done=_on_done
@@ -349,20 +779,27 @@ class TomlScript:
                     global_task, description="Download concluído ✓"
                 )
 
-        with _make_download_progress(self.console) as progress:
+        with (
+            self._bulk_load(engine),
+            _make_download_progress(self.console) as progress,
+        ):
             db_files_per_table: dict[str, int] = {}
             for d in data_files:
                 sid = str(d["tabela_sidra"])
                 db_files_per_table[sid] = db_files_per_table.get(sid, 0) + 1
             n_db_files = sum(db_files_per_table.values())
+            # Each file is read once per load pass.
+            passes = 1 if self.single_pass else 2
             db_global_task = progress.add_task(
-                "Carregando no banco de dados", total=n_db_files * 2, main=True
+                "Carregando no banco de dados",
+                total=n_db_files * passes,
+                main=True,
             )
             db_task_by_table: dict[str, TaskID] = {}
             if len(db_files_per_table) > 1:
                 for sid, count in db_files_per_table.items():
                     db_task_by_table[sid] = progress.add_task(
-                        f"Tabela {sid}", total=count * 2
+                        f"Tabela {sid}", total=count * passes
                     )
 
             def _on_db_file_done(sid: str) -> None:
@@ -382,6 +819,10 @@ class TomlScript:
                 data_files,
                 on_file_done=_on_db_file_done,
                 on_table_done=_on_db_table_done,
+                single_pass=self.single_pass,
+                reload=self.reload,
+                load_workers=self.load_workers,
+                lookup_cache=self.lookup_cache,
             )
             progress.update(
                 db_global_task, description="Carregamento concluído ✓"
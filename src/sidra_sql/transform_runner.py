@@ -11,7 +11,7 @@ TOML schema
     [[table]]
     name        = "ipca"
     schema      = "analytics"
-    strategy    = "replace"     # "replace" or "view"
+    strategy    = "replace"     # see Strategies below
     sql         = "ipca.sql"
     description = "IPCA - série detalhada"
 
@@ -22,7 +22,8 @@ TOML schema
     sql         = "ipca_resumo.sql"
 
 Required fields per entry: ``name``, ``schema``, ``strategy``, ``sql``.
-Optional: ``description``, ``primary_key``, ``indexes``.
+Optional: ``description``, ``primary_key``, ``indexes``, ``depends_on``;
+``period_key`` is required by ``incremental``.
 
 Strategies
 ~~~~~~~~~~
@@ -30,11 +31,46 @@ Strategies
     ``DROP TABLE IF EXISTS`` followed by ``CREATE TABLE ... AS``.
     Full refresh — best for batch imports into Power BI, Excel, etc.
 
+``swap``
+    Like ``replace``, but the new table, its primary key and indexes are
+    built under a shadow name while readers keep querying the old table;
+    a short final transaction drops the old table and renames the new
+    one into place. Best for tables read while they are refreshed.
+
+``incremental``
+    Built like ``replace`` on the first run. Later runs delete and
+    re-select only the rows whose ``period_key`` column (a
+    ``dados.periodo_id``) is one of the periodos written by the loads
+    since the previous run, as recorded in the ``carga`` ledger. The
+    carga high-water mark and the SQL hash of each output are kept in
+    the ``transformacao`` table; a changed SQL file triggers a full
+    rebuild.
+
+``materialized_view``
+    ``CREATE MATERIALIZED VIEW`` plus its indexes on the first run (or
+    when the SQL file changed), ``REFRESH MATERIALIZED VIEW
+    CONCURRENTLY`` afterwards, so readers are never blocked by a
+    refresh. Needs a unique index: ``primary_key`` or an index with
+    ``unique = true``.
+
 ``view``
     ``CREATE OR REPLACE VIEW``.  Zero storage cost, always up-to-date,
     best for live database connections.
 
-Each entry runs in its own transaction; if one fails, previously
+Dependencies
+~~~~~~~~~~~~
+Entries form a DAG. An entry depends on every other entry of the same
+file whose name appears after ``FROM`` or ``JOIN`` in its SQL (either
+``schema.name`` or the bare ``name``), plus the ones listed in its
+optional ``depends_on`` (``["ipca"]`` or ``["analytics.ipca"]``). A name
+that merely looks like a reference, e.g. a CTE named after another
+entry, only adds an ordering constraint. Entries run as soon as all of
+their dependencies are materialized, up to ``max_workers`` at a time,
+each on its own connection, so a file finishes in the time of its
+critical path.
+
+Each entry runs in its own transaction; if one fails, no further entry
+is started, the ones already running finish, and previously
 materialized outputs from the same pipeline persist.
 
 The SQL queries use unqualified table names (``dados``, ``dimensao``,
@@ -42,10 +78,17 @@ The SQL queries use unqualified table names (``dados``, ``dimensao``,
 ``search_path`` set by ``get_engine`` from ``config.ini``.
 """
 
+import hashlib
+import json
 import logging
+import re
+import time
 import tomllib
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 from pathlib import Path
+from typing import NamedTuple
 
+import sqlalchemy as sa
 from rich.console import Console
 from rich.progress import (
     Progress,
@@ -53,22 +96,115 @@ from rich.progress import (
     TextColumn,
     TimeElapsedColumn,
 )
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 
-from . import database
+from . import database, models
 from .config import Config
 
 logger = logging.getLogger(__name__)
 
+DEFAULT_MAX_WORKERS = 4
+
+_STRATEGIES = ("incremental", "materialized_view", "replace", "swap", "view")
+
+# The swap step waits at most this long for the lock on the live table
+# before giving up and retrying, so that readers queued behind it are not
+# blocked by a long-running query (see `TransformRunner._swap`).
+_SWAP_LOCK_TIMEOUT = "2s"
+_SWAP_ATTEMPTS = 5
+_LOCK_NOT_AVAILABLE = "55P03"
+
+_IDENT = r'(?:"[^"]+"|[A-Za-z_][\w$]*)'
+_REFERENCE_RE = re.compile(
+    rf"\b(?:FROM|JOIN)\s+({_IDENT}(?:\s*\.\s*{_IDENT})?)", re.IGNORECASE
+)
+_COMMENT_OR_STRING_RE = re.compile(r"--[^\n]*|/\*.*?\*/|'(?:[^']|'')*'", re.S)
+_COMMENT_RE = re.compile(r"--[^\n]*|/\*.*?\*/", re.S)
+# A SIDRA table ID literal: '1737' or 1737.
+_TABELA_ID = r"(?:'(\d+)'|\b(\d+)\b)"
+_TABELA_COLUMN_RE = re.compile(r"\btabela_sidra_id\b", re.IGNORECASE)
+_EQUALS_TABELA_RE = re.compile(rf"\s*=\s*{_TABELA_ID}")
+_IN_TABELAS_RE = re.compile(
+    r"\s*IN\s*\(\s*((?:'\d+'|\d+)(?:\s*,\s*(?:'\d+'|\d+))*)\s*\)",
+    re.IGNORECASE,
+)
+_TABELA_EQUALS_RE = re.compile(
+    rf"{_TABELA_ID}\s*(?<![<>!])=\s*(?:{_IDENT}\s*\.\s*)?$"
+)
+_COMPARED_AFTER_RE = re.compile(
+    r"\s*(?:[=<>!]|(?:NOT\s+)?(?:IN|I?LIKE|BETWEEN)\b|IS\b)", re.IGNORECASE
+)
+_COMPARED_BEFORE_RE = re.compile(rf"[=<>]\s*(?:{_IDENT}\s*\.\s*)?$")
+
+
+def referenced_relations(sql: str) -> set[str]:
+    """Return the relation names after ``FROM``/``JOIN`` in *sql*.
+
+    Names are unquoted and lowercased; a qualified reference is returned
+    as ``schema.name``. Comments and string literals are ignored.
+    """
+    sql = _COMMENT_OR_STRING_RE.sub(" ", sql)
+    relations = set()
+    for match in _REFERENCE_RE.finditer(sql):
+        parts = re.split(r"\s*\.\s*", match.group(1))
+        relations.add(
+            ".".join(
+                p[1:-1] if p.startswith('"') else p.lower() for p in parts
+            )
+        )
+    return relations
+
+
+def referenced_tabelas(sql: str) -> set[str] | None:
+    """Return the SIDRA table IDs *sql* filters ``tabela_sidra_id`` on.
+
+    Only literal filters are recognized (``tabela_sidra_id = '1737'``,
+    ``tabela_sidra_id IN ('7060', 1419)``). Returns None when there is
+    none or when ``tabela_sidra_id`` is compared with anything else (a
+    column, a subquery, ``<>``...), i.e. the tables read are unknown.
+    """
+    sql = _COMMENT_RE.sub(" ", sql)
+    tabelas = set()
+    for match in _TABELA_COLUMN_RE.finditer(sql):
+        before, after = sql[: match.start()], sql[match.end() :]
+        if literal := _EQUALS_TABELA_RE.match(after):
+            tabelas.add(literal[1] or literal[2])
+        elif literals := _IN_TABELAS_RE.match(after):
+            tabelas.update(re.findall(r"\d+", literals[1]))
+        elif literal := _TABELA_EQUALS_RE.search(before):
+            tabelas.add(literal[1] or literal[2])
+        elif _COMPARED_AFTER_RE.match(after) or _COMPARED_BEFORE_RE.search(
+            before
+        ):
+            return None
+    return tabelas or None
+
 
 class TransformRunner:
-    """Run SQL transformations declared in a ``transform.toml`` file."""
+    """Run SQL transformations declared in a ``transform.toml`` file.
+
+    Pass *engine* to reuse the connection pool of a larger run; by default
+    one engine is created from *config*. Up to *max_workers* independent
+    entries are materialized at the same time. Entries whose fingerprint
+    did not change since their last run are skipped unless *force* is
+    set (see `_fingerprints`).
+    """
 
     def __init__(
-        self, config: Config, toml_path: Path, console: Console | None = None
+        self,
+        config: Config,
+        toml_path: Path,
+        console: Console | None = None,
+        engine: sa.Engine | None = None,
+        max_workers: int = DEFAULT_MAX_WORKERS,
+        force: bool = False,
     ):
         self.config = config
         self.toml_path = toml_path
         self.console = console
+        self.engine = engine
+        self.max_workers = max_workers
+        self.force = force
 
     def run(self):
         with open(self.toml_path, "rb") as f:
@@ -82,7 +218,28 @@ class TransformRunner:
                 "com campo 'sql' explícito por entrada."
             )
 
-        engine = database.get_engine(self.config)
+        entries = [self._prepare(entry) for entry in tables]
+        dependencies = self._dependencies(entries)
+
+        engine = self.engine
+        if engine is None:
+            engine = database.get_engine(self.config)
+        _create_state_table(engine)
+
+        # Concurrent CREATE SCHEMA IF NOT EXISTS can still collide on the
+        # catalog's unique index, so the schemas are created up front.
+        with engine.begin() as conn:
+            for schema in sorted({entry["schema"] for entry in entries}):
+                conn.exec_driver_sql(f'CREATE SCHEMA IF NOT EXISTS "{schema}"')
+            marks = _carga_marks(conn)
+            stored = _stored_fingerprints(conn)
+
+        fingerprints = self._fingerprints(entries, dependencies, marks, stored)
+        for entry, fingerprint in zip(entries, fingerprints, strict=True):
+            entry["fingerprint"] = fingerprint
+            entry["unchanged"] = not self.force and fingerprint == stored.get(
+                f"{entry['schema']}.{entry['name']}"
+            )
 
         with Progress(
             SpinnerColumn(finished_text="[green]✓[/green]"),
@@ -92,10 +249,10 @@ class TransformRunner:
             transient=False,
             disable=self.console is None,
         ) as progress:
-            for entry in tables:
-                self._materialize(engine, entry, progress)
+            self._run_dag(engine, entries, dependencies, progress)
 
-    def _materialize(self, engine, entry: dict, progress: Progress) -> None:
+    def _prepare(self, entry: dict) -> dict:
+        """Validate *entry* and return it with its SQL ``query`` read."""
         missing = [
             f for f in ("name", "schema", "strategy", "sql") if f not in entry
         ]
@@ -105,56 +262,568 @@ class TransformRunner:
                 f"{', '.join(missing)}"
             )
 
-        name = entry["name"]
-        schema = entry["schema"]
-        strategy = entry["strategy"]
-        sql_rel = entry["sql"]
-        primary_key = entry.get("primary_key")
-        indexes = entry.get("indexes", [])
+        qualified = f'"{entry["schema"]}"."{entry["name"]}"'
+        if entry["strategy"] not in _STRATEGIES:
+            raise ValueError(
+                f"Unknown strategy {entry['strategy']!r} for {qualified} "
+                f"in {self.toml_path}"
+            )
 
+        sql_rel = entry["sql"]
         sql_path = self.toml_path.parent / sql_rel
         if not sql_path.exists():
             raise FileNotFoundError(
                 f"{self.toml_path}: arquivo SQL '{sql_rel}' não encontrado em "
                 f"{self.toml_path.parent}"
             )
-        query = sql_path.read_text(encoding="utf-8").strip().replace("%", "%%")
+        if entry["strategy"] == "incremental" and "period_key" not in entry:
+            raise ValueError(
+                f"{self.toml_path}: {qualified} usa strategy 'incremental' "
+                "sem o campo 'period_key'"
+            )
+        if entry["strategy"] == "materialized_view" and not (
+            entry.get("primary_key")
+            or any(idx.get("unique") for idx in entry.get("indexes", []))
+        ):
+            raise ValueError(
+                f"{self.toml_path}: {qualified} usa strategy "
+                "'materialized_view' sem índice único (REFRESH "
+                "CONCURRENTLY exige 'primary_key' ou um índice com "
+                "unique = true)"
+            )
+        query = sql_path.read_text(encoding="utf-8").strip()
+        return {**entry, "query": query}
+
+    def _dependencies(self, entries: list[dict]) -> list[set[int]]:
+        """Return, for each entry, the indexes of the entries it reads.
+
+        Raises ValueError for an unknown ``depends_on`` name or a cycle.
+        """
+        by_name: dict[str, set[int]] = {}
+        for i, entry in enumerate(entries):
+            by_name.setdefault(entry["name"], set()).add(i)
+            by_name.setdefault(
+                f"{entry['schema']}.{entry['name']}", set()
+            ).add(i)
+
+        dependencies = []
+        for i, entry in enumerate(entries):
+            deps: set[int] = set()
+            for relation in referenced_relations(entry["query"]):
+                deps |= by_name.get(relation, set())
+            for name in entry.get("depends_on", []):
+                if name not in by_name:
+                    raise ValueError(
+                        f"{self.toml_path}: depends_on de "
+                        f"'{entry['name']}' cita '{name}', que não é uma "
+                        "[[table]] deste arquivo"
+                    )
+                deps |= by_name[name]
+            deps.discard(i)
+            dependencies.append(deps)
+
+        # Kahn's algorithm: whatever cannot be ordered is part of a cycle.
+        remaining = {i: set(deps) for i, deps in enumerate(dependencies)}
+        while True:
+            ready = [i for i, deps in remaining.items() if not deps]
+            if not ready:
+                break
+            for i in ready:
+                del remaining[i]
+            for deps in remaining.values():
+                deps.difference_update(ready)
+        if remaining:
+            names = ", ".join(entries[i]["name"] for i in sorted(remaining))
+            raise ValueError(
+                f"{self.toml_path}: dependência circular entre: {names}"
+            )
+        return dependencies
+
+    def _fingerprints(
+        self,
+        entries: list[dict],
+        dependencies: list[set[int]],
+        marks: dict[str | None, tuple[int, int]],
+        stored: dict[str, str],
+    ) -> list[str]:
+        """Return a hash of everything the output of each entry depends on.
+
+        That is the entry itself (SQL text and TOML fields), the carga
+        ledger mark of every SIDRA table it filters on (of the whole
+        ledger when `referenced_tabelas` finds none and the entry reads
+        more than transform outputs), the fingerprints of the entries of
+        this file it reads and the stored fingerprints of outputs of
+        other pipelines it reads. An unchanged fingerprint means that
+        rerunning the entry would produce the same output.
+        """
+        own = {f"{e['schema']}.{e['name']}" for e in entries}
+        fingerprints: dict[int, str] = {}
+
+        def fingerprint(i: int) -> str:
+            if i not in fingerprints:
+                entry = entries[i]
+                relations = referenced_relations(entry["query"])
+                tabelas = referenced_tabelas(entry["query"])
+                if tabelas is None:
+                    # Only reads that reach past the transform outputs
+                    # depend on the ledger.
+                    outputs = own | stored.keys()
+                    tabelas = {None} if relations - outputs else set()
+                inputs = [
+                    entry,
+                    sorted((t, marks.get(t)) for t in tabelas),
+                    sorted(
+                        (rel, stored[rel])
+                        for rel in relations
+                        if rel in stored and rel not in own
+                    ),
+                    sorted(fingerprint(d) for d in dependencies[i]),
+                ]
+                fingerprints[i] = hashlib.sha256(
+                    json.dumps(inputs, sort_keys=True, default=str).encode()
+                ).hexdigest()
+            return fingerprints[i]
+
+        return [fingerprint(i) for i in range(len(entries))]
+
+    def _run_dag(
+        self,
+        engine,
+        entries: list[dict],
+        dependencies: list[set[int]],
+        progress: Progress,
+    ) -> None:
+        """Materialize *entries* as soon as their dependencies are done.
+
+        After the first failure no new entry is started; the ones already
+        running finish and the error is raised.
+        """
+        dependents: list[list[int]] = [[] for _ in entries]
+        for i, deps in enumerate(dependencies):
+            for dep in deps:
+                dependents[dep].append(i)
+        pending = [len(deps) for deps in dependencies]
+        errors: list[BaseException] = []
+
+        with ThreadPoolExecutor(
+            max_workers=max(1, self.max_workers),
+            thread_name_prefix="transform",
+        ) as executor:
+
+            def submit(i: int):
+                return executor.submit(
+                    self._materialize, engine, entries[i], progress
+                )
+
+            running = {submit(i): i for i, n in enumerate(pending) if n == 0}
+            while running:
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    i = running.pop(future)
+                    try:
+                        future.result()
+                    except Exception as e:
+                        logger.error(
+                            "Transform %s failed: %s", entries[i]["name"], e
+                        )
+                        errors.append(e)
+                        continue
+                    for dependent in dependents[i]:
+                        pending[dependent] -= 1
+                        if pending[dependent] == 0 and not errors:
+                            running[submit(dependent)] = dependent
+
+        if errors:
+            raise errors[0]
+
+    def _materialize(self, engine, entry: dict, progress: Progress) -> None:
+        name = entry["name"]
+        schema = entry["schema"]
+        strategy = entry["strategy"]
+        primary_key = entry.get("primary_key")
+        indexes = entry.get("indexes", [])
+        query = entry["query"].replace("%", "%%")
 
         qualified = f'"{schema}"."{name}"'
-        strategy_label = {"replace": "tabela", "view": "view"}.get(
-            strategy, strategy
-        )
+        if entry["unchanged"]:
+            logger.info("Skipping %s: SQL and inputs unchanged", qualified)
+            progress.add_task(
+                f"{qualified} [dim][inalterado][/dim]", total=1, completed=1
+            )
+            return
+        strategy_label = {
+            "incremental": "tabela, incremental",
+            "materialized_view": "materialized view",
+            "replace": "tabela",
+            "swap": "tabela, swap",
+            "view": "view",
+        }.get(strategy, strategy)
         task = progress.add_task(
             f"{qualified} [dim][{strategy_label}][/dim]", total=None
         )
+        t0 = time.monotonic()
+
+        if strategy == "swap":
+            self._swap(engine, schema, name, query, primary_key, indexes)
+        elif strategy == "incremental":
+            self._incremental(engine, entry, query)
+        elif strategy == "materialized_view":
+            self._materialized_view(engine, entry, query)
+        else:
+            with engine.begin() as conn:
+                if strategy == "view":
+                    conn.exec_driver_sql(
+                        f"CREATE OR REPLACE VIEW {qualified} AS\n{query}"
+                    )
+                elif strategy == "replace":
+                    conn.exec_driver_sql(f"DROP TABLE IF EXISTS {qualified}")
+                    _create_table(conn, qualified, query, primary_key, indexes)
+
+        with engine.begin() as conn:
+            _save_fingerprint(conn, entry)
+        logger.info(
+            "Materialized %s (%s) in %.1fs",
+            qualified,
+            strategy,
+            time.monotonic() - t0,
+        )
+        progress.update(task, total=1, completed=1)
+
+    def _swap(
+        self,
+        engine,
+        schema: str,
+        name: str,
+        query: str,
+        primary_key: list[str] | None,
+        indexes: list[dict],
+    ) -> None:
+        """Build *name* in a shadow table, then swap it in.
+
+        The shadow table, its primary key and its indexes are built in one
+        transaction that does not touch the live table, so readers keep
+        seeing the old rows. A second, short transaction drops the live
+        table and renames the shadow table and its indexes into place.
+        That step takes an ACCESS EXCLUSIVE lock; it waits at most
+        ``_SWAP_LOCK_TIMEOUT`` for running queries and is retried, instead
+        of queueing every new reader behind a long query.
+        """
+        qualified = f'"{schema}"."{name}"'
+        shadow = f"{name}__swap"
+        shadow_qualified = f'"{schema}"."{shadow}"'
+        pk_name = f"{name}_pkey"
+        renames = [(f"{shadow}_pkey", pk_name)] if primary_key else []
+        renames += [(f"{idx['name']}__swap", idx["name"]) for idx in indexes]
 
         with engine.begin() as conn:
-            conn.exec_driver_sql(f'CREATE SCHEMA IF NOT EXISTS "{schema}"')
+            # Left behind by a run that died before the swap.
+            conn.exec_driver_sql(f"DROP TABLE IF EXISTS {shadow_qualified}")
+            _create_table(
+                conn,
+                shadow_qualified,
+                query,
+                primary_key,
+                indexes,
+                suffix="__swap",
+                pk_name=f"{shadow}_pkey",
+            )
 
-            if strategy == "view":
+        try:
+            for attempt in range(1, _SWAP_ATTEMPTS + 1):
+                try:
+                    with engine.begin() as conn:
+                        conn.exec_driver_sql(
+                            f"SET LOCAL lock_timeout = '{_SWAP_LOCK_TIMEOUT}'"
+                        )
+                        conn.exec_driver_sql(
+                            f"DROP TABLE IF EXISTS {qualified}"
+                        )
+                        conn.exec_driver_sql(
+                            f"ALTER TABLE {shadow_qualified} "
+                            f'RENAME TO "{name}"'
+                        )
+                        for old, new in renames:
+                            conn.exec_driver_sql(
+                                f'ALTER INDEX "{schema}"."{old}" '
+                                f'RENAME TO "{new}"'
+                            )
+                    return
+                except sa.exc.OperationalError as e:
+                    sqlstate = getattr(e.orig, "sqlstate", None)
+                    if (
+                        sqlstate != _LOCK_NOT_AVAILABLE
+                        or attempt == _SWAP_ATTEMPTS
+                    ):
+                        raise
+                    logger.warning(
+                        "Swap of %s waited %s for readers (attempt %d/%d), "
+                        "retrying",
+                        qualified,
+                        _SWAP_LOCK_TIMEOUT,
+                        attempt,
+                        _SWAP_ATTEMPTS,
+                    )
+                    time.sleep(attempt)
+        except Exception:
+            with engine.begin() as conn:
                 conn.exec_driver_sql(
-                    f"CREATE OR REPLACE VIEW {qualified} AS\n{query}"
+                    f"DROP TABLE IF EXISTS {shadow_qualified}"
+                )
+            raise
+
+    def _incremental(self, engine, entry: dict, query: str) -> None:
+        """Refresh only the periodos loaded since the last run of *entry*.
+
+        The rows of the output whose ``period_key`` column holds one of
+        the periodo IDs written by the cargas since the recorded
+        high-water mark are deleted and selected again from *query*. The
+        output is rebuilt in full on its first run, when its SQL file
+        changed, when the table is missing, or when a carga predates
+        ``carga.periodo_ids``.
+        """
+        schema = entry["schema"]
+        name = entry["name"]
+        qualified = f'"{schema}"."{name}"'
+        period_key = f'"{entry["period_key"]}"'
+        sql_hash = hashlib.sha256(entry["query"].encode()).hexdigest()
+
+        # Taken in its own transaction: the lock on carga only has to wait
+        # for the loads in progress, not block new ones during the refresh.
+        with engine.begin() as conn:
+            up_to = database.carga_high_water(conn)
+
+        with engine.begin() as conn:
+            state = _load_state(conn, schema, name)
+            periodo_ids = None
+            if state is None or state.carga_id is None:
+                reason = "first run"
+            elif state.sql_hash != sql_hash:
+                reason = "SQL changed"
+            elif not state.exists:
+                reason = "table missing"
+            else:
+                periodo_ids = database.touched_periodo_ids(
+                    conn, state.carga_id, up_to
                 )
-            elif strategy == "replace":
+                reason = "periodos of older cargas unknown"
+
+            if periodo_ids is None:
+                logger.info("Rebuilding %s in full (%s)", qualified, reason)
                 conn.exec_driver_sql(f"DROP TABLE IF EXISTS {qualified}")
-                conn.exec_driver_sql(f"CREATE TABLE {qualified} AS\n{query}")
+                _create_table(
+                    conn,
+                    qualified,
+                    query,
+                    entry.get("primary_key"),
+                    entry.get("indexes", []),
+                )
+            elif periodo_ids:
+                params = {"periodo_ids": periodo_ids}
+                conn.exec_driver_sql(
+                    f"DELETE FROM {qualified}"
+                    f" WHERE {period_key} = ANY(%(periodo_ids)s)",
+                    params,
+                )
+                conn.exec_driver_sql(
+                    f"INSERT INTO {qualified}"
+                    f" SELECT * FROM (\n{query}\n) AS q"
+                    f" WHERE q.{period_key} = ANY(%(periodo_ids)s)",
+                    params,
+                )
+                logger.info(
+                    "Refreshed %d periodos of %s", len(periodo_ids), qualified
+                )
+            else:
+                logger.info("No new cargas for %s", qualified)
+            _save_state(conn, schema, name, sql_hash, up_to)
 
-                if primary_key:
-                    pk_cols = ", ".join(f'"{c}"' for c in primary_key)
-                    conn.exec_driver_sql(
-                        f"ALTER TABLE {qualified} ADD PRIMARY KEY ({pk_cols})"
-                    )
+    def _materialized_view(self, engine, entry: dict, query: str) -> None:
+        """Create the materialized view of *entry* or refresh it.
 
-                for idx in indexes:
-                    idx_name = idx["name"]
-                    idx_cols = ", ".join(f'"{c}"' for c in idx["columns"])
-                    unique = "UNIQUE" if idx.get("unique") else ""
+        The view is (re)created, with its indexes, on the first run, when
+        it is missing or when its SQL file changed; otherwise it is
+        refreshed with ``REFRESH MATERIALIZED VIEW CONCURRENTLY``, which
+        keeps it readable and needs a unique index. A ``primary_key``
+        becomes the unique index ``<name>_pkey``.
+        """
+        schema = entry["schema"]
+        name = entry["name"]
+        qualified = f'"{schema}"."{name}"'
+        primary_key = entry.get("primary_key")
+        sql_hash = hashlib.sha256(entry["query"].encode()).hexdigest()
+
+        with engine.begin() as conn:
+            state = _load_state(conn, schema, name)
+            if state is not None and state.exists:
+                if state.sql_hash == sql_hash:
                     conn.exec_driver_sql(
-                        f'CREATE {unique} INDEX "{idx_name}" ON {qualified} ({idx_cols})'
+                        f"REFRESH MATERIALIZED VIEW CONCURRENTLY {qualified}"
                     )
-            else:
-                raise ValueError(
-                    f"Unknown strategy {strategy!r} for {qualified} in {self.toml_path}"
-                )
+                    return
+                logger.info("Recreating %s (SQL changed)", qualified)
+            conn.exec_driver_sql(
+                f"DROP MATERIALIZED VIEW IF EXISTS {qualified}"
+            )
+            conn.exec_driver_sql(
+                f"CREATE MATERIALIZED VIEW {qualified} AS\n{query}"
+            )
+            indexes = entry.get("indexes", [])
+            if primary_key:
+                pk = {
+                    "name": f"{name}_pkey",
+                    "columns": primary_key,
+                    "unique": True,
+                }
+                indexes = [pk, *indexes]
+            _create_indexes(conn, qualified, indexes)
+            _save_state(conn, schema, name, sql_hash, None)
 
-        progress.update(task, total=1, completed=1)
+
+def _create_state_table(engine) -> None:
+    """Create the transformacao table, or bring an older one up to date."""
+    with engine.begin() as conn:
+        # Transforms of concurrent pipelines may get here at the same time.
+        conn.exec_driver_sql(
+            "SELECT pg_advisory_xact_lock(hashtext('transformacao'))"
+        )
+        models.Base.metadata.create_all(
+            conn, tables=[models.Transformacao.__table__]
+        )
+        columns = {
+            c["name"]: c for c in sa.inspect(conn).get_columns("transformacao")
+        }
+        if not columns["carga_id"]["nullable"]:
+            conn.exec_driver_sql(
+                "ALTER TABLE transformacao ALTER COLUMN carga_id DROP NOT NULL"
+            )
+        if "fingerprint" not in columns:
+            conn.exec_driver_sql(
+                "ALTER TABLE transformacao ADD COLUMN fingerprint text"
+            )
+
+
+def _carga_marks(conn) -> dict[str | None, tuple[int, int]]:
+    """Return ``(max id, count)`` of the carga ledger per SIDRA table.
+
+    The mark of the whole ledger is under the key None.
+    """
+    c = models.Carga
+    rows = conn.execute(
+        sa.select(
+            c.tabela_sidra_id, sa.func.max(c.id), sa.func.count()
+        ).group_by(sa.func.grouping_sets(c.tabela_sidra_id, sa.tuple_()))
+    ).all()
+    return {tabela: (max_id, n) for tabela, max_id, n in rows}
+
+
+def _stored_fingerprints(conn) -> dict[str, str]:
+    """Return the fingerprint of each recorded output that still exists."""
+    t = models.Transformacao
+    qualified = sa.func.format("%I.%I", t.schema, t.nome)
+    rows = conn.execute(
+        sa.select(t.schema, t.nome, t.fingerprint).where(
+            t.fingerprint.is_not(None),
+            sa.func.to_regclass(qualified).is_not(None),
+        )
+    )
+    return {f"{row.schema}.{row.nome}": row.fingerprint for row in rows}
+
+
+def _save_fingerprint(conn, entry: dict) -> None:
+    t = models.Transformacao
+    stmt = pg_insert(t.__table__).values(
+        schema=entry["schema"],
+        nome=entry["name"],
+        sql_hash=hashlib.sha256(entry["query"].encode()).hexdigest(),
+        fingerprint=entry["fingerprint"],
+    )
+    conn.execute(
+        stmt.on_conflict_do_update(
+            index_elements=["schema", "nome"],
+            set_={
+                "sql_hash": stmt.excluded.sql_hash,
+                "fingerprint": stmt.excluded.fingerprint,
+                "atualizado_em": sa.func.now(),
+            },
+        )
+    )
+
+
+class _State(NamedTuple):
+    sql_hash: str
+    carga_id: int | None
+    exists: bool
+
+
+def _load_state(conn, schema: str, name: str) -> _State | None:
+    """Return the recorded state of output *schema.name*, if any."""
+    t = models.Transformacao
+    row = conn.execute(
+        sa.select(t.sql_hash, t.carga_id).where(
+            t.schema == schema, t.nome == name
+        )
+    ).one_or_none()
+    if row is None:
+        return None
+    exists = conn.execute(
+        sa.select(sa.func.to_regclass(f'"{schema}"."{name}"'))
+    ).scalar()
+    return _State(row.sql_hash, row.carga_id, exists is not None)
+
+
+def _save_state(
+    conn, schema: str, name: str, sql_hash: str, carga_id: int | None
+) -> None:
+    t = models.Transformacao
+    stmt = pg_insert(t.__table__).values(
+        schema=schema, nome=name, sql_hash=sql_hash, carga_id=carga_id
+    )
+    conn.execute(
+        stmt.on_conflict_do_update(
+            index_elements=["schema", "nome"],
+            set_={
+                "sql_hash": stmt.excluded.sql_hash,
+                "carga_id": stmt.excluded.carga_id,
+                "atualizado_em": sa.func.now(),
+            },
+        )
+    )
+
+
+def _create_table(
+    conn,
+    qualified: str,
+    query: str,
+    primary_key: list[str] | None,
+    indexes: list[dict],
+    suffix: str = "",
+    pk_name: str | None = None,
+) -> None:
+    """``CREATE TABLE ... AS`` *query*, then its primary key and indexes.
+
+    *suffix* is appended to every index name, and *pk_name* names the
+    primary key constraint, so a shadow table can be indexed while the
+    live table still holds the final names.
+    """
+    conn.exec_driver_sql(f"CREATE TABLE {qualified} AS\n{query}")
+
+    if primary_key:
+        pk_cols = ", ".join(f'"{c}"' for c in primary_key)
+        constraint = f'CONSTRAINT "{pk_name}" ' if pk_name else ""
+        conn.exec_driver_sql(
+            f"ALTER TABLE {qualified} ADD {constraint}PRIMARY KEY ({pk_cols})"
+        )
+
+    _create_indexes(conn, qualified, indexes, suffix)
+
+
+def _create_indexes(
+    conn, qualified: str, indexes: list[dict], suffix: str = ""
+) -> None:
+    for idx in indexes:
+        idx_name = idx["name"] + suffix
+        idx_cols = ", ".join(f'"{c}"' for c in idx["columns"])
+        unique = "UNIQUE" if idx.get("unique") else ""
+        conn.exec_driver_sql(
+            f'CREATE {unique} INDEX "{idx_name}" ON {qualified} ({idx_cols})'
+        )
@@ -3,6 +3,15 @@ from dataclasses import dataclass, field
 from enum import Enum
 from pathlib import Path
 
+# Keep in sync with `transform_runner._STRATEGIES`.
+_STRATEGIES = (
+    "replace",
+    "swap",
+    "incremental",
+    "materialized_view",
+    "view",
+)
+
 
 class Severity(Enum):
     OK = "ok"
@@ -205,10 +214,26 @@ class PluginValidator:
                 continue
 
             strategy = t["strategy"]
-            if strategy not in ("replace", "view"):
+            if strategy not in _STRATEGIES:
                 section.error(
                     f"transform.toml: {entry} strategy inválido: {strategy!r} "
-                    "(esperado 'replace' ou 'view')"
+                    f"(esperado {', '.join(map(repr, _STRATEGIES))})"
+                )
+                any_error = True
+            elif strategy == "incremental" and "period_key" not in t:
+                section.error(
+                    f"transform.toml: {entry} strategy 'incremental' exige "
+                    "o campo 'period_key'"
+                )
+                any_error = True
+            elif strategy == "materialized_view" and not (
+                t.get("primary_key")
+                or any(idx.get("unique") for idx in t.get("indexes", []))
+            ):
+                section.error(
+                    f"transform.toml: {entry} strategy 'materialized_view' "
+                    "exige 'primary_key' ou um índice com unique = true "
+                    "(necessário para REFRESH CONCURRENTLY)"
                 )
                 any_error = True
 
@@ -228,5 +253,17 @@ class PluginValidator:
                 )
                 any_error = True
 
+        names = {t["name"] for t in tables if "name" in t} | {
+            f"{schema}.{name}" for schema, name in seen
+        }
+        for i, t in enumerate(tables):
+            for dep in t.get("depends_on", []):
+                if dep not in names:
+                    section.error(
+                        f"transform.toml: [[table]][{i}] depends_on cita "
+                        f"'{dep}', que não é uma saída deste arquivo"
+                    )
+                    any_error = True
+
         if not any_error:
             section.ok(f"transform.toml válido ({len(tables)} saída(s))")
@@ -1,5 +1,8 @@
 import tempfile
+import threading
+import time
 import unittest
+from contextlib import contextmanager
 from pathlib import Path
 from unittest import mock
 
@@ -25,6 +28,10 @@ class DummyConfig:
     def __init__(self):
         self.db_schema = None
         self.data_dir = Path(tempfile.mkdtemp())
+        self.fetch_rate_limit = 0.0
+        self.fetch_burst = 1
+        self.storage_format = "json"
+        self.db_lookup_cache_size = 1000
 
 
 def make_script() -> TomlScript:
@@ -61,6 +68,143 @@ class TestTomlScript(unittest.TestCase):
         self.assertIn("modificacao", data_files[0])
         self.assertEqual(data_files[0]["tabela_sidra"], "1")
 
+    def test_download_and_load_overlaps_tables(self):
+        """A table is loaded while later tables are still downloading."""
+        script = make_script()
+        script.pipelined = True
+        a_loaded = threading.Event()
+        loaded = []
+
+        plan = [
+            ({"tabela_sidra": sid}, f"param-{sid}{i}", "2025-01-01")
+            for sid in ("A", "B")
+            for i in range(2)
+        ]
+
+        class FakeFetcher:
+            def download_periods(self, plan, on_file_done, on_result, admit):
+                for key, param, mod in plan:
+                    assert admit(key)
+                    if key["tabela_sidra"] == "B":
+                        # B only starts once A has reached the loader.
+                        assert a_loaded.wait(timeout=5)
+                    if param != "param-B1":
+                        on_result(
+                            {"key": key, "filepath": param, "modificacao": mod}
+                        )
+                    on_file_done(key)
+                raise RuntimeError("download of param-B1 failed")
+
+        def fake_load_dados(engine, storage, files, **kwargs):
+            loaded.append([f["filepath"] for f in files])
+            a_loaded.set()
+
+        script.fetcher = FakeFetcher()
+        with mock.patch("sidra_sql.database.load_dados", fake_load_dados):
+            with self.assertRaisesRegex(RuntimeError, "param-B1"):
+                script._download_and_load(None, plan, {"A": 2, "B": 2})
+
+        # B had a failed download, so only A was loaded.
+        self.assertEqual(loaded, [["param-A0", "param-A1"]])
+
+    def test_download_and_load_throttles_to_the_loaders(self):
+        """A table is not downloaded while every load slot is taken."""
+        script = make_script()
+        script.load_workers = 1
+        script.load_queue_size = 0
+        admitted_while_loading = []
+
+        plan = [
+            ({"tabela_sidra": sid}, f"param-{sid}{i}", "2025-01-01")
+            for sid, n in (("A", 2), ("B", 1))
+            for i in range(n)
+        ]
+
+        class FakeFetcher:
+            def download_periods(self, plan, on_file_done, on_result, admit):
+                self.admit = admit
+                for key, param, mod in plan:
+                    deadline = time.monotonic() + 5
+                    while not admit(key):
+                        assert time.monotonic() < deadline
+                        time.sleep(0.01)
+                    on_result(
+                        {"key": key, "filepath": param, "modificacao": mod}
+                    )
+                    on_file_done(key)
+
+        fetcher = FakeFetcher()
+
+        def fake_load_dados(engine, storage, files, **kwargs):
+            admitted_while_loading.append(fetcher.admit({"tabela_sidra": "B"}))
+
+        script.fetcher = fetcher
+        with mock.patch("sidra_sql.database.load_dados", fake_load_dados):
+            script._download_and_load(None, plan, {"A": 2, "B": 1})
+
+        # B waited for A's load to finish, then went through.
+        self.assertEqual(admitted_while_loading, [False, True])
+
+    def test_pipelined_bulk_load_starts_with_the_first_load(self):
+        """Indexes are dropped once a table is ready, not before downloads."""
+        script = make_script()
+        script.bulk = True
+        events = []
+
+        plan = [
+            ({"tabela_sidra": sid}, f"param-{sid}", "2025-01-01")
+            for sid in ("A", "B")
+        ]
+
+        class FakeFetcher:
+            def download_periods(self, plan, on_file_done, on_result, admit):
+                for key, param, mod in plan:
+                    assert admit(key)
+                    events.append(f"download {param}")
+                    on_result(
+                        {"key": key, "filepath": param, "modificacao": mod}
+                    )
+                    on_file_done(key)
+
+        @contextmanager
+        def fake_bulk_load(engine):
+            events.append("drop")
+            yield {}
+            events.append("rebuild")
+
+        def fake_load_dados(engine, storage, files, **kwargs):
+            events.append(f"load {files[0]['filepath']}")
+
+        script.fetcher = FakeFetcher()
+        with (
+            mock.patch("sidra_sql.database.bulk_load", fake_bulk_load),
+            mock.patch("sidra_sql.database.load_dados", fake_load_dados),
+        ):
+            script._download_and_load(None, plan, {"A": 1, "B": 1})
+
+        self.assertEqual(events[0], "download param-A")
+        self.assertEqual(events.count("drop"), 1)
+        self.assertLess(events.index("drop"), events.index("load param-A"))
+        self.assertEqual(events[-1], "rebuild")
+
+    def test_bulk_load_wraps_only_when_enabled(self):
+        script = make_script()
+        entered = []
+
+        @contextmanager
+        def fake_bulk_load(engine):
+            entered.append(engine)
+            yield {"load": 1.0}
+
+        with mock.patch("sidra_sql.database.bulk_load", fake_bulk_load):
+            with script._bulk_load("engine"):
+                pass
+            script.bulk = True
+            with script._bulk_load("engine"):
+                pass
+
+        self.assertEqual(entered, ["engine"])
+
     def test_load_metadata_reads_from_cache_when_file_exists(self):
         """load_metadata uses the cached file and never calls the API."""
         script = make_script()
@@ -84,6 +228,43 @@ class TestTomlScript(unittest.TestCase):
         script.fetcher.fetch_metadata.assert_not_called()
         save_mock.assert_called_once_with(engine, fake_agregado)
 
+    def test_load_metadata_skips_tables_saved_by_a_shared_fetcher(self):
+        """A fetcher shared by several scripts saves each table once."""
+        first = make_script()
+        second = TomlScript(
+            DummyConfig(), first.toml_path, fetcher=first.fetcher
+        )
+        self.assertIs(second.storage, first.storage)
+
+        fake_agregado = mock.MagicMock()
+        first.storage.read_metadata = mock.MagicMock(
+            return_value=fake_agregado
+        )
+        first.storage.get_metadata_filepath = mock.MagicMock(
+            return_value=mock.MagicMock(exists=lambda: True)
+        )
+        with mock.patch("sidra_sql.database.save_agregado") as save_mock:
+            first.load_metadata("engine", [{"tabela_sidra": "99"}])
+            second.load_metadata(
+                "engine", [{"tabela_sidra": "99"}, {"tabela_sidra": "7"}]
+            )
+
+        self.assertEqual(
+            [c.args[0] for c in first.storage.read_metadata.call_args_list],
+            ["99", "7"],
+        )
+        self.assertEqual(save_mock.call_count, 2)
+        self.assertEqual(set(first.fetcher.agregados), {"99", "7"})
+
+    def test_shared_fetcher_is_not_entered_by_the_script(self):
+        fetcher = mock.MagicMock()
+        script = TomlScript(
+            DummyConfig(), make_script().toml_path, fetcher=fetcher
+        )
+        with script._fetcher_session():
+            pass
+        fetcher.__enter__.assert_not_called()
+
     def test_load_metadata_fetches_from_api_when_not_cached(self):
         """load_metadata calls the API and writes to disk when no cache exists."""
         script = make_script()
@@ -107,6 +288,65 @@ class TestTomlScript(unittest.TestCase):
         script.storage.write_metadata.assert_called_once_with(fake_agregado)
         save_mock.assert_called_once_with(engine, fake_agregado)
 
+    def test_load_metadata_refreshes_periods_in_update_mode(self):
+        """In update mode only the period list is fetched again."""
+        script = make_script()
+        script.update = True
+        engine = mock.MagicMock()
+
+        cached_path = mock.MagicMock()
+        cached_path.exists.return_value = True
+        fake_agregado = mock.MagicMock()
+        script.storage.get_metadata_filepath = mock.MagicMock(
+            return_value=cached_path
+        )
+        script.storage.read_metadata = mock.MagicMock(
+            return_value=fake_agregado
+        )
+        script.storage.write_metadata = mock.MagicMock()
+        script.fetcher.fetch_metadata = mock.MagicMock()
+        script.fetcher.fetch_periodos = mock.MagicMock(
+            return_value=["p1", "p2"]
+        )
+
+        with mock.patch("sidra_sql.database.save_agregado") as save_mock:
+            script.load_metadata(engine, [{"tabela_sidra": "99"}])
+
+        script.fetcher.fetch_metadata.assert_not_called()
+        script.fetcher.fetch_periodos.assert_called_once_with("99")
+        self.assertEqual(fake_agregado.periodos, ["p1", "p2"])
+        script.storage.write_metadata.assert_called_once_with(fake_agregado)
+        save_mock.assert_called_once_with(engine, fake_agregado)
+
+    def test_plan_skips_loaded_files_in_update_mode(self):
+        """Update mode plans only files missing from the carga ledger."""
+        script = make_script()
+        script.update = True
+
+        class FakeFetcher:
+            def plan_periods(self, **kwargs):
+                return [
+                    ("p-2023", "2024-01-10"),  # loaded, any format
+                    ("p-2024", "2025-03-01"),  # revised since last load
+                    ("p-2025", "2025-06-01"),  # new
+                ]
+
+        script.fetcher = FakeFetcher()
+        script.storage.build_data_filename = lambda parameter, modification: (
+            f"{parameter}@{modification}.json"
+        )
+        loaded = {"p-2023@2024-01-10.json.gz", "p-2024@2024-05-02.json"}
+        with mock.patch(
+            "sidra_sql.database.loaded_arquivos", return_value=loaded
+        ) as loaded_mock:
+            plan = script.plan(None, list(script.get_tabelas()))
+
+        loaded_mock.assert_called_once_with(None, "1")
+        self.assertEqual(
+            [(param, mod) for _tabela, param, mod in plan],
+            [("p-2024", "2025-03-01"), ("p-2025", "2025-06-01")],
+        )
+
     def test_load_metadata_deduplicates_repeated_table_ids(self):
         """load_metadata processes each unique tabela_sidra only once."""
         script = make_script()
@@ -167,6 +407,32 @@ class TestTomlScript(unittest.TestCase):
         for entry in result:
             self.assertEqual(entry["classifications"]["99"], ["all"])
 
+    def test_get_tabelas_unnests_from_cached_metadata(self):
+        """Cached metadata is unnested without a request unless forced."""
+        tmp = Path(tempfile.mkdtemp())
+        toml_path = tmp / "test.toml"
+        toml_path.write_bytes(PARTIAL_UNNEST_TOML)
+        script = TomlScript(DummyConfig(), toml_path, update=True)
+        filepath = script.storage.get_metadata_filepath("5938")
+        filepath.parent.mkdir(parents=True)
+        filepath.write_text("{}")
+
+        cls = mock.Mock(id=87, categorias=[mock.Mock(id=10)])
+        meta = mock.Mock(classificacoes=[cls])
+        script.fetcher.sidra_client = mock.MagicMock()
+        script.fetcher.sidra_client.get_agregado_metadados.return_value = meta
+        with mock.patch.object(
+            script.storage, "read_metadata", return_value=meta
+        ) as read:
+            self.assertEqual(len(script.get_tabelas()), 1)
+            read.assert_called_once_with("5938")
+            client = script.fetcher.sidra_client
+            client.get_agregado_metadados.assert_not_called()
+
+            script.force_metadata = True
+            self.assertEqual(len(script.get_tabelas()), 1)
+            client.get_agregado_metadados.assert_called_once_with("5938")
+
 
 if __name__ == "__main__":
     unittest.main()
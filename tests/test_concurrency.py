@@ -0,0 +1,76 @@
+import threading
+import unittest
+
+from sidra_sql.concurrency import AIMDController
+
+
+class TestAIMDController(unittest.TestCase):
+    def test_initial_limit_is_clamped_to_bounds(self):
+        self.assertEqual(AIMDController(initial=50, maximum=8).limit, 8)
+        self.assertEqual(AIMDController(initial=0, minimum=2).limit, 2)
+
+    def test_additive_increase_after_a_full_window_of_successes(self):
+        controller = AIMDController(initial=2, maximum=4)
+        controller.record_success(1.0)
+        self.assertEqual(controller.limit, 2)
+        controller.record_success(1.0)
+        self.assertEqual(controller.limit, 3)
+        self.assertEqual(controller.last_decision, "additive increase → 3")
+
+    def test_increase_stops_at_maximum(self):
+        controller = AIMDController(initial=2, maximum=3)
+        for _ in range(20):
+            controller.record_success(1.0)
+        self.assertEqual(controller.limit, 3)
+
+    def test_error_rate_triggers_multiplicative_decrease(self):
+        controller = AIMDController(initial=8, error_threshold=0.5)
+        controller.record_success(1.0)
+        controller.record_error()
+        self.assertEqual(controller.limit, 4)
+
+    def test_cooldown_absorbs_a_burst_of_errors(self):
+        controller = AIMDController(initial=16, cooldown=60)
+        for _ in range(5):
+            controller.record_error()
+        self.assertEqual(controller.limit, 8)
+
+    def test_decrease_never_goes_below_minimum(self):
+        controller = AIMDController(initial=2, minimum=2, cooldown=0)
+        for _ in range(5):
+            controller.record_error()
+        self.assertEqual(controller.limit, 2)
+
+    def test_latency_spike_triggers_decrease(self):
+        controller = AIMDController(initial=8, latency_factor=2.0)
+        controller.record_success(1.0)
+        for _ in range(10):
+            controller.record_success(30.0)
+        self.assertLess(controller.limit, 8)
+        self.assertIn("latency", controller.last_decision)
+
+    def test_latency_signal_can_be_disabled(self):
+        controller = AIMDController(initial=8, latency_factor=None)
+        controller.record_success(1.0)
+        for _ in range(10):
+            controller.record_success(30.0)
+        self.assertGreaterEqual(controller.limit, 8)
+
+    def test_acquire_honours_limit_and_cancel(self):
+        controller = AIMDController(initial=1)
+        controller.acquire()
+        self.assertEqual(controller.in_flight, 1)
+
+        cancel = threading.Event()
+        cancel.set()
+        with self.assertRaises(InterruptedError):
+            controller.acquire(cancel)
+
+        controller.release()
+        with controller.slot():
+            self.assertEqual(controller.in_flight, 1)
+        self.assertEqual(controller.in_flight, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
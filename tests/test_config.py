@@ -41,6 +41,51 @@ readonly_role = readonly
 
             s = str(cfg)
             self.assertIn("db_user: alice", s)
+
+            # [fetch] is optional: rate limiting is off by default
+            self.assertEqual(cfg.fetch_rate_limit, 0.0)
+            self.assertEqual(cfg.fetch_burst, 1)
+            self.assertEqual(cfg.storage_format, "json")
+            self.assertFalse(cfg.db_partition_dados)
+            self.assertEqual(cfg.db_lookup_cache_size, 1_000_000)
+        finally:
+            os.chdir(cwd)
+
+    def test_config_reads_optional_sections(self):
+        content = """
+[storage]
+data_dir = /tmp/test_data
+format = json-gzip
+
+[database]
+user = alice
+password = secret
+host = db.example
+port = 5432
+dbname = sample_db
+schema = public
+tablespace = pg_default
+readonly_role = readonly
+partition_dados = true
+lookup_cache_size = 5000
+
+[fetch]
+rate_limit = 2.5
+burst = 10
+"""
+
+        cwd = os.getcwd()
+        td = tempfile.mkdtemp()
+        try:
+            os.chdir(td)
+            (Path(td) / "config.ini").write_text(content)
+
+            cfg = Config()
+            self.assertEqual(cfg.fetch_rate_limit, 2.5)
+            self.assertEqual(cfg.fetch_burst, 10)
+            self.assertEqual(cfg.storage_format, "json-gzip")
+            self.assertTrue(cfg.db_partition_dados)
+            self.assertEqual(cfg.db_lookup_cache_size, 5000)
         finally:
             os.chdir(cwd)
 
@@ -1,10 +1,15 @@
+import datetime as dt
+import threading
+import time
 import unittest
+from contextlib import contextmanager
 from types import SimpleNamespace
 from unittest.mock import patch
 
 import sqlalchemy as sa
 
-from sidra_sql import database
+from sidra_sql import database, models
+from sidra_sql.lookup_cache import LookupCache
 
 # ---------------------------------------------------------------------------
 # Internal helpers — no DB connection required
@@ -25,6 +30,31 @@ class TestCoerce(unittest.TestCase):
         self.assertEqual(database._coerce("hello"), "hello")
 
 
+class TestAsDate(unittest.TestCase):
+    def test_iso_date(self):
+        self.assertEqual(database._as_date("2020-03-01"), dt.date(2020, 3, 1))
+
+    def test_iso_datetime_keeps_date(self):
+        self.assertEqual(
+            database._as_date("2020-03-01T00:00:00"), dt.date(2020, 3, 1)
+        )
+
+    def test_date_passes_through(self):
+        day = dt.date(2020, 3, 1)
+        self.assertIs(database._as_date(day), day)
+
+
+class TestParseValor(unittest.TestCase):
+    def test_numbers(self):
+        self.assertEqual(database._parse_valor("12"), (12.0, None))
+        self.assertEqual(database._parse_valor("-0.25"), (-0.25, None))
+        self.assertEqual(database._parse_valor("1.5e3"), (1500.0, None))
+
+    def test_symbols_have_no_valor(self):
+        for symbol in ("..", "X"):
+            self.assertEqual(database._parse_valor(symbol), (None, symbol))
+
+
 class TestCleanStr(unittest.TestCase):
     def test_none_returns_empty_string(self):
         self.assertEqual(database._clean_str(None), "")
@@ -81,6 +111,13 @@ class TestDatabaseHelpers(unittest.TestCase):
         # drivername should contain postgresql
         self.assertIn("postgresql", url.drivername)
 
+    def test_get_engine_pool_capacity(self):
+        cfg = DummyConfig("u", "p", "h", 5432, "db", "t")
+        self.assertEqual(database.pool_capacity(database.get_engine(cfg)), 15)
+        eng = database.get_engine(cfg, pool_size=8, max_overflow=2)
+        self.assertEqual(database.pool_capacity(eng), 10)
+        self.assertIsNone(database.pool_capacity(None))
+
 
 class TestPeriodoByCodigoQuery(unittest.TestCase):
     """Verify the (codigo, frequencias) lookup that disambiguates ambiguous
@@ -140,6 +177,579 @@ class TestPeriodoByCodigoQuery(unittest.TestCase):
         self.assertEqual(set(result.keys()), {"200702"})
         self.assertIn(result["200702"], {1, 2})
 
+    def test_cached_lookup_queries_only_missing_codigos(self):
+        cache = LookupCache()
+        with self.engine.connect() as conn:
+            first = database._cached_periodo_by_codigo(
+                conn, cache, {"200701"}, frequencias={"mensal"}
+            )
+            with patch.object(
+                database,
+                "_periodo_by_codigo_query",
+                wraps=database._periodo_by_codigo_query,
+            ) as query:
+                second = database._cached_periodo_by_codigo(
+                    conn, cache, {"200701", "200702"}, frequencias={"mensal"}
+                )
+        self.assertEqual(first, {"200701": 3})
+        self.assertEqual(second, {"200701": 3, "200702": 1})
+        self.assertEqual(query.call_args.args[1], {"200702"})
+        self.assertEqual((cache.hits, cache.misses), (1, 2))
+
+    def test_cached_lookup_is_keyed_by_frequencias(self):
+        cache = LookupCache()
+        with self.engine.connect() as conn:
+            mensal = database._cached_periodo_by_codigo(
+                conn, cache, {"200702"}, frequencias={"mensal"}
+            )
+            semestral = database._cached_periodo_by_codigo(
+                conn, cache, {"200702"}, frequencias={"semestral"}
+            )
+        self.assertEqual(mensal, {"200702": 1})
+        self.assertEqual(semestral, {"200702": 2})
+
+
+class _FakeCursor:
+    """Records statements and COPY rows; returns canned rowcounts."""
+
+    def __init__(self, rowcounts, fetchone=None):
+        self.statements = []
+        self.copied = []
+        self.rowcount = -1
+        self._rowcounts = rowcounts
+        self._fetchone = fetchone
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, sql, params=None):
+        self.statements.append((sql, params))
+        self.rowcount = self._rowcounts.get(sql, -1)
+
+    def fetchone(self):
+        return self._fetchone
+
+    @contextmanager
+    def copy(self, sql):
+        self.statements.append((sql, None))
+        yield SimpleNamespace(
+            set_types=lambda types: None,
+            write_row=lambda row: self.copied.append(tuple(row)),
+        )
+
+
+class _FakeStorage:
+    def __init__(self, rows):
+        self._rows = rows
+
+    def iter_rows(self, filepath, columns):
+        return iter(self._rows[filepath])
+
+
+class TestDadosPartition(unittest.TestCase):
+    def _conn(self, partitioned):
+        executed = []
+
+        def execute(stmt):
+            executed.append(str(stmt))
+            return SimpleNamespace(scalar_one=lambda: partitioned)
+
+        conn = SimpleNamespace(
+            execute=execute,
+            dialect=sa.dialects.postgresql.dialect(),
+        )
+        return conn, executed
+
+    def test_creates_partition_when_partitioned(self):
+        conn, executed = self._conn(True)
+        database.ensure_dados_partition(conn, "5938")
+        self.assertEqual(
+            executed[-1],
+            "CREATE TABLE IF NOT EXISTS dados_5938"
+            " PARTITION OF dados FOR VALUES IN ('5938')",
+        )
+
+    def test_skips_unpartitioned_dados(self):
+        conn, executed = self._conn(False)
+        database.ensure_dados_partition(conn, "5938")
+        self.assertEqual(len(executed), 1)
+        self.assertIn("pg_partitioned_table", executed[0])
+
+
+class TestUpgradeDados(unittest.TestCase):
+    UQ_COLUMNS = [
+        "tabela_sidra_id",
+        "localidade_id",
+        "dimensao_id",
+        "periodo_id",
+        "modificacao",
+    ]
+
+    def _run(self, uq_columns, indexes, partitions=None):
+        executed = []
+        dialect = sa.dialects.postgresql.dialect()
+        conn = SimpleNamespace(
+            dialect=dialect,
+            execute=lambda stmt: executed.append(
+                str(stmt.compile(dialect=dialect))
+            ),
+        )
+        conn.execution_options = lambda **kw: conn
+
+        @contextmanager
+        def connect():
+            yield conn
+
+        engine = SimpleNamespace(connect=connect, begin=connect)
+        inspector = SimpleNamespace(
+            has_table=lambda t: True,
+            get_unique_constraints=lambda t: [
+                {"name": "uq_dados", "column_names": uq_columns}
+            ],
+            get_indexes=lambda t: [{"name": name} for name in indexes],
+        )
+        with (
+            patch.object(database.sa, "inspect", return_value=inspector),
+            patch.object(
+                database,
+                "_dados_is_partitioned",
+                return_value=partitions is not None,
+            ),
+            patch.object(
+                database, "_dados_partitions", return_value=partitions
+            ),
+        ):
+            built = database.upgrade_dados(engine)
+        return built, executed
+
+    def _outdated(self, partitions=None):
+        indexes = [i.name for i in models.Dados.__table__.indexes]
+        return self._run(
+            self.UQ_COLUMNS[:-1],
+            [name for name in indexes if name != "ix_dados_ativo"],
+            partitions,
+        )
+
+    def test_builds_indexes_concurrently_and_swaps_uq_dados(self):
+        built, executed = self._outdated()
+        self.assertEqual(built, ["uq_dados", "ix_dados_ativo"])
+        self.assertEqual(
+            executed,
+            [
+                "DROP INDEX CONCURRENTLY IF EXISTS dados_uq_dados_new",
+                "CREATE UNIQUE INDEX CONCURRENTLY dados_uq_dados_new"
+                " ON dados (tabela_sidra_id, localidade_id, dimensao_id,"
+                " periodo_id, modificacao)",
+                "DROP INDEX CONCURRENTLY IF EXISTS ix_dados_ativo",
+                "CREATE INDEX CONCURRENTLY ix_dados_ativo"
+                " ON dados (tabela_sidra_id, periodo_id, localidade_id,"
+                " dimensao_id, modificacao) WHERE ativo",
+                "ALTER TABLE dados DROP CONSTRAINT IF EXISTS uq_dados",
+                "ALTER TABLE dados ADD CONSTRAINT uq_dados"
+                " UNIQUE USING INDEX dados_uq_dados_new",
+            ],
+        )
+
+    def test_partitioned_dados_attaches_partition_indexes(self):
+        built, executed = self._outdated(["dados_1", "dados_2"])
+        self.assertEqual(built, ["uq_dados", "ix_dados_ativo"])
+        self.assertIn(
+            "CREATE UNIQUE INDEX CONCURRENTLY dados_2_uq_dados_new ON dados_2"
+            " (tabela_sidra_id, localidade_id, dimensao_id, periodo_id,"
+            " modificacao)",
+            executed,
+        )
+        self.assertIn(
+            "CREATE INDEX CONCURRENTLY dados_1_ix_dados_ativo ON dados_1"
+            " (tabela_sidra_id, periodo_id, localidade_id, dimensao_id,"
+            " modificacao) WHERE ativo",
+            executed,
+        )
+        swap = executed[
+            executed.index(
+                "ALTER TABLE dados DROP CONSTRAINT IF EXISTS uq_dados"
+            ) :
+        ]
+        self.assertEqual(
+            swap[1],
+            "ALTER TABLE dados_1 ADD CONSTRAINT dados_1_uq_dados"
+            " UNIQUE USING INDEX dados_1_uq_dados_new",
+        )
+        self.assertIn("ALTER TABLE dados ADD CONSTRAINT uq_dados", swap[3])
+        self.assertIn("CREATE INDEX IF NOT EXISTS ix_dados_ativo", swap[4])
+        self.assertEqual(len(swap), 5)
+
+    def test_up_to_date_dados_is_left_alone(self):
+        indexes = [i.name for i in models.Dados.__table__.indexes]
+        self.assertEqual(self._run(self.UQ_COLUMNS, indexes), ([], []))
+
+    def test_create_tables_only_warns_about_outdated_dados(self):
+        engine = SimpleNamespace()
+        outdated = ([], list(models.Dados.__table__.indexes))
+        with (
+            patch.object(models.Base.metadata, "create_all"),
+            patch.object(database, "_add_missing_columns"),
+            patch.object(database, "_outdated_dados", return_value=outdated),
+            patch.object(database, "upgrade_dados") as upgrade,
+            self.assertLogs(database.logger, "WARNING") as logs,
+        ):
+            database.create_tables(engine)
+        upgrade.assert_not_called()
+        self.assertIn("sidra-sql db upgrade", logs.output[0])
+
+
+class TestCopyUpsert(unittest.TestCase):
+    def _run(self, *args, **kwargs):
+        cur = _FakeCursor({})
+        executed = []
+
+        def execute(stmt):
+            executed.append(str(stmt))
+            return SimpleNamespace(rowcount=3)
+
+        conn = SimpleNamespace(
+            execute=execute,
+            connection=SimpleNamespace(
+                dbapi_connection=SimpleNamespace(cursor=lambda: cur)
+            ),
+        )
+        n = database._copy_upsert(conn, *args, **kwargs)
+        return cur, executed, n
+
+    def test_copies_rows_and_merges_in_key_order(self):
+        rows = [("N6", "Município", "2", "B"), ("N6", "Município", "1", "A")]
+        cur, executed, n = self._run(
+            database.models.Localidade.__table__,
+            "uq_localidade",
+            database._LOCALIDADE_COLUMNS,
+            iter(rows),
+        )
+        self.assertEqual(n, 3)
+        self.assertEqual(cur.copied, rows)
+        self.assertEqual(
+            executed[-1],
+            "INSERT INTO localidade (nc, nn, d1c, d1n)"
+            " SELECT DISTINCT ON (nc, d1c) nc, nn, d1c, d1n"
+            " FROM _merge_localidade ORDER BY nc, d1c"
+            " ON CONFLICT DO NOTHING",
+        )
+
+    def test_updates_listed_columns_on_conflict(self):
+        _, executed, _ = self._run(
+            database.models.Periodo.__table__,
+            "uq_periodo",
+            database._PERIODO_COLUMNS,
+            [],
+            update=("frequencia", "ano"),
+        )
+        self.assertIn("DISTINCT ON (codigo, literals)", executed[-1])
+        self.assertTrue(
+            executed[-1].endswith(
+                "ON CONFLICT ON CONSTRAINT uq_periodo DO UPDATE SET"
+                " frequencia = EXCLUDED.frequencia, ano = EXCLUDED.ano"
+            )
+        )
+
+
+class TestStreamStaging(unittest.TestCase):
+    def test_copies_typed_rows(self):
+        cur = _FakeCursor({database._STAGING_INSERT: 2})
+        raw_conn = SimpleNamespace(cursor=lambda: cur)
+        rows = {
+            "a.json": [
+                {"NC": "6", "D1C": "1", "D2C": "63", "D3C": "202001",
+                 "V": "0.2"},
+                {"NC": "6", "D1C": "2", "D2C": "63", "D3C": "202001",
+                 "V": "X"},
+                {"NC": "6", "D1C": "3", "D2C": "63", "D3C": "202001",
+                 "V": "1"},
+            ],
+        }  # fmt: skip
+        dim_key = (None, "63", None, None, None, None, None, None)
+        result = database._stream_staging(
+            raw_conn,
+            _FakeStorage(rows),
+            [{"filepath": "a.json", "modificacao": "2020-03-01"}],
+            "1737",
+            loc_lookup={("N6", "1"): 10, ("N6", "2"): 11},
+            dim_lookup={dim_key: 20},
+            periodo_by_codigo={"202001": 30},
+        )
+        day = dt.date(2020, 3, 1)
+        self.assertEqual(
+            cur.copied,
+            [
+                ("1737", 10, 20, 30, day, True, "0.2", 0.2, None),
+                ("1737", 11, 20, 30, day, True, "X", None, "X"),
+            ],
+        )
+        self.assertEqual(result, (2, 2, -1, 1, 0, 0))
+        self.assertIn("FORMAT BINARY", database._STAGING_COPY)
+
+
+class TestStreamSinglePass(unittest.TestCase):
+    ROWS = {
+        "a.json": [
+            {"NC": "6", "NN": "Município", "D1C": "1.0", "D1N": "X",
+             "MC": "1", "MN": "%", "D2C": "63", "D2N": "IPCA",
+             "D3C": "202001", "V": "0.2"},
+            {"NC": "N6", "D1C": "1", "D2C": "63", "D3C": "202002",
+             "V": None},
+        ],
+        "b.json": [
+            {"NC": "N6", "D1C": "1", "D2C": "63", "D3C": "202003",
+             "V": "0.3"},
+        ],
+    }  # fmt: skip
+
+    def _run(self, rowcounts, fetchone=None):
+        cur = _FakeCursor(rowcounts, fetchone)
+        raw_conn = SimpleNamespace(cursor=lambda: cur)
+        files = [
+            {"filepath": "a.json", "modificacao": "2020-03-01"},
+            {"filepath": "b.json", "modificacao": "2020-04-01"},
+        ]
+        done = []
+        result = database._stream_single_pass(
+            raw_conn,
+            _FakeStorage(self.ROWS),
+            files,
+            "1737",
+            {"mensal"},
+            on_file_done=lambda: done.append(1),
+        )
+        return cur, result, done
+
+    def test_copies_natural_keys_once_per_row(self):
+        cur, result, done = self._run(
+            {
+                database._RAW_RESOLVE: 2,
+                database._STAGING_INSERT: 2,
+                database._STAGING_DEACTIVATE: 0,
+            }
+        )
+        self.assertEqual(len(done), 2)
+        self.assertEqual(len(cur.copied), 2)
+        first = cur.copied[0]
+        self.assertEqual(first[:4], ("N6", "Município", "1", "X"))
+        self.assertEqual(first[-3:], ("202001", dt.date(2020, 3, 1), "0.2"))
+        self.assertEqual(result, (2, 2, 2, 0, 0, 0, 0))
+
+        executed = [sql for sql, _ in cur.statements]
+        self.assertLess(
+            executed.index(database._RAW_UPSERT_DIMENSOES),
+            executed.index(database._RAW_RESOLVE),
+        )
+        self.assertNotIn(database._RAW_MISSING, executed)
+        params = dict(cur.statements)[database._RAW_RESOLVE]
+        self.assertEqual(params["frequencias"], ["mensal"])
+
+    def test_counts_unresolved_rows(self):
+        cur, result, _ = self._run(
+            {
+                database._RAW_RESOLVE: 1,
+                database._STAGING_INSERT: 1,
+                database._STAGING_DEACTIVATE: 0,
+            },
+            fetchone=(0, 0, 1),
+        )
+        self.assertEqual(result, (2, 1, 1, 0, 0, 0, 1))
+
+    def test_missing_d2c_resolves_to_the_empty_code(self):
+        rows = {
+            "a.json": [
+                {"NC": "N6", "D1C": "1", "D2C": "", "V": "1"},
+                {"NC": "N6", "D1C": "2", "V": "2"},
+            ]
+        }
+        cur = _FakeCursor({}, fetchone=(0, 0, 0))
+        database._stream_single_pass(
+            SimpleNamespace(cursor=lambda: cur),
+            _FakeStorage(rows),
+            [{"filepath": "a.json", "modificacao": "2020-03-01"}],
+            "1737",
+            None,
+        )
+        self.assertEqual([row[6] for row in cur.copied], ["", None])
+        # dimensao stores a missing D2C as '', which the resolve join must
+        # match whether the staged code is '' or NULL.
+        self.assertIn("COALESCE(d2c, '')", database._RAW_UPSERT_DIMENSOES)
+        self.assertIn("dm.d2c = COALESCE(s.d2c, '')", database._RAW_RESOLVED)
+
+
+class TestUpsertLocalidadesAndDims(unittest.TestCase):
+    LOC = {"nc": "N6", "nn": "Município", "d1c": "1", "d1n": "X"}
+    DIM_KEY = ("2", "63", None, None, None, None, None, None)
+    DIM = dict.fromkeys(database._DIMENSAO_COLUMNS) | {"mc": "2", "d2c": "63"}
+
+    def _upsert(self, cache, commit):
+        def fake_copy_upsert_ids(conn, table, constraint, columns, rows):
+            return {
+                "localidade": {("N6", "1"): 10},
+                "dimensao": {self.DIM_KEY: 20},
+            }[table.name]
+
+        conn = SimpleNamespace(commit=commit)
+        with patch.object(database, "_copy_upsert_ids", fake_copy_upsert_ids):
+            return database._upsert_localidades_and_dims(
+                conn, [self.LOC], {self.DIM_KEY: self.DIM}, cache
+            )
+
+    def test_ids_are_cached_after_commit(self):
+        cache = LookupCache()
+        lookups = self._upsert(cache, commit=lambda: None)
+        self.assertEqual(lookups, ({("N6", "1"): 10}, {self.DIM_KEY: 20}))
+        found, missing = cache.get_many("dimensao", [self.DIM_KEY])
+        self.assertEqual((found, missing), ({self.DIM_KEY: 20}, []))
+
+    def test_failed_commit_leaves_the_cache_untouched(self):
+        def commit():
+            raise sa.exc.OperationalError("COMMIT", None, Exception("gone"))
+
+        cache = LookupCache()
+        with self.assertRaises(sa.exc.OperationalError):
+            self._upsert(cache, commit)
+        self.assertEqual(len(cache), 0)
+
+
+class _HashingStorage:
+    def file_hash(self, filepath):
+        return f"sha-{filepath}"
+
+
+class TestLoadWorkers(unittest.TestCase):
+    FILES = [
+        {"tabela_sidra": sid, "filepath": f"{sid}-{i}.json"}
+        for sid in ("1", "2", "3")
+        for i in range(2)
+    ]
+
+    def _fake_load(self, loaded, fail=None):
+        def _load_table(
+            engine, storage, sid, files, on_file_done=None, lookup_cache=None
+        ):
+            if sid == fail:
+                raise RuntimeError(f"boom {sid}")
+            for _ in files:
+                if on_file_done is not None:
+                    on_file_done()
+            loaded.append(sid)
+
+        return _load_table
+
+    def test_loads_every_table_concurrently(self):
+        loaded, done, tables = [], [], []
+        with patch.object(database, "_load_table", self._fake_load(loaded)):
+            database.load_dados(
+                None,
+                _HashingStorage(),
+                self.FILES,
+                on_file_done=done.append,
+                on_table_done=tables.append,
+                load_workers=3,
+                reload=True,
+            )
+        self.assertEqual(sorted(loaded), ["1", "2", "3"])
+        self.assertEqual(sorted(done), ["1", "1", "2", "2", "3", "3"])
+        self.assertEqual(sorted(tables), ["1", "2", "3"])
+
+    def test_failure_in_one_table_does_not_stop_the_others(self):
+        loaded = []
+        fake = self._fake_load(loaded, fail="2")
+        with patch.object(database, "_load_table", fake):
+            with self.assertRaisesRegex(RuntimeError, "boom 2"):
+                database.load_dados(
+                    None,
+                    _HashingStorage(),
+                    self.FILES,
+                    load_workers=2,
+                    reload=True,
+                )
+        self.assertEqual(sorted(loaded), ["1", "3"])
+
+    def test_tables_share_the_lookup_cache(self):
+        caches = []
+
+        def _load_table(
+            engine, storage, sid, files, on_file_done=None, lookup_cache=None
+        ):
+            caches.append(lookup_cache)
+
+        cache = LookupCache()
+        with patch.object(database, "_load_table", _load_table):
+            database.load_dados(
+                None,
+                _HashingStorage(),
+                self.FILES,
+                load_workers=2,
+                reload=True,
+                lookup_cache=cache,
+            )
+        self.assertEqual(len(caches), 3)
+        self.assertTrue(all(c is cache for c in caches))
+
+    def test_workers_are_limited_to_the_engine_pool(self):
+        threads = set()
+
+        def _load_table(
+            engine, storage, sid, files, on_file_done=None, lookup_cache=None
+        ):
+            threads.add(threading.get_ident())
+            time.sleep(0.05)
+
+        cfg = DummyConfig("u", "p", "h", 5432, "db", "t")
+        engine = database.get_engine(cfg, pool_size=1, max_overflow=1)
+        with (
+            patch.object(database, "_load_table", _load_table),
+            self.assertLogs(database.logger, "WARNING") as logs,
+        ):
+            database.load_dados(
+                engine,
+                _HashingStorage(),
+                self.FILES,
+                load_workers=3,
+                reload=True,
+            )
+        self.assertLessEqual(len(threads), 2)
+        self.assertIn(
+            "3 load workers exceed the 2 connections", logs.output[0]
+        )
+
+    def test_files_in_the_ledger_are_skipped(self):
+        loaded, done, tables = [], [], []
+
+        def _pending(engine, sid, files):
+            self.assertTrue(all(f["hash"].startswith("sha-") for f in files))
+            # Table 1 is fully loaded, table 2 has one new file.
+            return {"1": [], "2": files[1:], "3": files}[sid]
+
+        def _load_table(
+            engine, storage, sid, files, on_file_done=None, lookup_cache=None
+        ):
+            loaded.append((sid, [f["filepath"] for f in files]))
+
+        with (
+            patch.object(database, "_pending_files", _pending),
+            patch.object(database, "_load_table", _load_table),
+        ):
+            database.load_dados(
+                None,
+                _HashingStorage(),
+                self.FILES,
+                on_file_done=done.append,
+                on_table_done=tables.append,
+            )
+        self.assertEqual(
+            sorted(loaded),
+            [("2", ["2-1.json"]), ("3", ["3-0.json", "3-1.json"])],
+        )
+        # Skipped files still advance progress (two passes per file).
+        self.assertEqual(done, ["1", "1", "1", "1", "2", "2"])
+        self.assertEqual(tables, ["1", "2", "3"])
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,68 @@
+import threading
+import unittest
+
+from sidra_sql.lookup_cache import LookupCache
+
+
+class TestLookupCache(unittest.TestCase):
+    def test_get_many_splits_found_and_missing(self):
+        cache = LookupCache()
+        cache.put_many("localidade", [(("N6", "1"), 10), (("N6", "2"), 20)])
+        found, missing = cache.get_many(
+            "localidade", [("N6", "1"), ("N6", "3"), ("N6", "2")]
+        )
+        self.assertEqual(found, {("N6", "1"): 10, ("N6", "2"): 20})
+        self.assertEqual(missing, [("N6", "3")])
+        self.assertEqual((cache.hits, cache.misses), (2, 1))
+
+    def test_kinds_do_not_collide(self):
+        cache = LookupCache()
+        cache.put_many("localidade", [("1", 10)])
+        found, missing = cache.get_many("dimensao", ["1"])
+        self.assertEqual((found, missing), ({}, ["1"]))
+
+    def test_least_recently_used_key_is_evicted(self):
+        cache = LookupCache(maxsize=2)
+        cache.put_many("k", [("a", 1), ("b", 2)])
+        cache.get_many("k", ["a"])  # "b" is now the oldest
+        cache.put_many("k", [("c", 3)])
+        found, missing = cache.get_many("k", ["a", "b", "c"])
+        self.assertEqual(found, {"a": 1, "c": 3})
+        self.assertEqual(missing, ["b"])
+        self.assertEqual(len(cache), 2)
+        self.assertEqual(cache.evictions, 1)
+
+    def test_hit_rate_and_stats(self):
+        cache = LookupCache()
+        self.assertEqual(cache.hit_rate, 0.0)
+        cache.put_many("k", [("a", 1)])
+        cache.get_many("k", ["a", "a", "a", "b"])
+        self.assertEqual(cache.hit_rate, 0.75)
+        self.assertIn("3 hits, 1 misses (75% hit rate)", cache.stats())
+
+    def test_maxsize_must_be_positive(self):
+        with self.assertRaises(ValueError):
+            LookupCache(maxsize=0)
+
+    def test_concurrent_puts_stay_within_maxsize(self):
+        cache = LookupCache(maxsize=100)
+
+        def _fill(offset: int) -> None:
+            for i in range(500):
+                cache.put_many("k", [(offset + i, i)])
+                cache.get_many("k", [offset + i])
+
+        threads = [
+            threading.Thread(target=_fill, args=(n * 1000,)) for n in range(4)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(cache), 100)
+        self.assertEqual(cache.hits, 2000)
+        self.assertEqual(cache.evictions, 1900)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,74 @@
+import tempfile
+import threading
+import unittest
+from pathlib import Path
+from unittest import mock
+
+from sidra_sql import ratelimit
+from sidra_sql.ratelimit import RateLimiter
+
+
+class TestRateLimiter(unittest.TestCase):
+    def setUp(self):
+        self.state_path = Path(tempfile.mkdtemp()) / "sub" / ".ratelimit"
+        self.now = 1_000.0
+        patcher = mock.patch.object(
+            ratelimit.time, "time", side_effect=lambda: self.now
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_burst_is_free_then_reservations_queue_up(self):
+        limiter = RateLimiter(rate=2.0, burst=3, state_path=self.state_path)
+        delays = [limiter.reserve() for _ in range(5)]
+        self.assertEqual(delays[:3], [0.0, 0.0, 0.0])
+        self.assertAlmostEqual(delays[3], 0.5)
+        self.assertAlmostEqual(delays[4], 1.0)
+
+    def test_tokens_refill_over_time_up_to_burst(self):
+        limiter = RateLimiter(rate=1.0, burst=2, state_path=self.state_path)
+        limiter.reserve()
+        limiter.reserve()
+        self.now += 100
+        self.assertEqual(limiter.reserve(), 0.0)
+        self.assertEqual(limiter.reserve(), 0.0)
+        self.assertAlmostEqual(limiter.reserve(), 1.0)
+
+    def test_state_is_shared_between_instances(self):
+        a = RateLimiter(rate=1.0, burst=1, state_path=self.state_path)
+        b = RateLimiter(rate=1.0, burst=1, state_path=self.state_path)
+        self.assertEqual(a.reserve(), 0.0)
+        self.assertAlmostEqual(b.reserve(), 1.0)
+
+    def test_acquire_raises_when_cancelled_while_waiting(self):
+        limiter = RateLimiter(rate=0.001, burst=1, state_path=self.state_path)
+        limiter.reserve()
+        cancel = threading.Event()
+        cancel.set()
+        with self.assertRaises(InterruptedError):
+            limiter.acquire(cancel)
+
+    def test_default_is_disabled_without_rate(self):
+        class _Cfg:
+            data_dir = self.state_path.parent
+            fetch_rate_limit = 0.0
+            fetch_burst = 1
+
+        self.assertIsNone(RateLimiter.default(_Cfg()))
+
+    def test_default_uses_state_file_under_data_dir(self):
+        class _Cfg:
+            data_dir = self.state_path.parent
+            fetch_rate_limit = 4.0
+            fetch_burst = 8
+
+        limiter = RateLimiter.default(_Cfg())
+        self.assertEqual(limiter.rate, 4.0)
+        self.assertEqual(limiter.burst, 8)
+        self.assertEqual(
+            limiter.state_path, self.state_path.parent / ".ratelimit"
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,189 @@
+import tempfile
+import threading
+import unittest
+from pathlib import Path
+from unittest import mock
+
+from sidra_sql import runner
+
+
+class DummyConfig:
+    db_partition_dados = False
+    db_lookup_cache_size = 1000
+
+
+def make_tree(*pipelines: str) -> Path:
+    root = Path(tempfile.mkdtemp())
+    for rel in pipelines:
+        (root / rel).mkdir(parents=True, exist_ok=True)
+        (root / rel / "fetch.toml").write_text("")
+    return root
+
+
+class TestFindPipelines(unittest.TestCase):
+    def test_children_come_before_their_parent(self):
+        root = make_tree("snpc", "snpc/ipca", "snpc/inpc", "pam")
+        (root / "notes").mkdir()
+        found = [
+            p.relative_to(root).as_posix() for p in runner.find_pipelines(root)
+        ]
+        self.assertEqual(found, ["pam", "snpc/inpc", "snpc/ipca", "snpc"])
+
+    def test_nested_pipelines_below_plain_directories_are_found(self):
+        root = make_tree("group/deep")
+        self.assertEqual(runner.find_pipelines(root), [root / "group/deep"])
+
+
+class TestRunSubtree(unittest.TestCase):
+    def setUp(self):
+        self.engine = mock.MagicMock()
+        patches = [
+            mock.patch.object(
+                runner.database, "get_engine", return_value=self.engine
+            ),
+            mock.patch.object(runner.database, "create_tables"),
+        ]
+        for patcher in patches:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def _run(self, root, fake, **kwargs):
+        with mock.patch.object(runner, "_run_pipeline", fake):
+            runner.run_subtree(DummyConfig(), root, **kwargs)
+
+    def test_sequential_run_is_post_order(self):
+        root = make_tree("snpc", "snpc/ipca", "snpc/inpc")
+        order = []
+        self._run(root, lambda config, path, console, **kw: order.append(path))
+        self.assertEqual(
+            order,
+            [root / "snpc/inpc", root / "snpc/ipca", root / "snpc", root],
+        )
+
+    def test_siblings_run_concurrently_before_their_parent(self):
+        root = make_tree("snpc", "snpc/ipca", "snpc/inpc", "pam")
+        # Both snpc children must be running at the same time to pass.
+        barrier = threading.Barrier(2, timeout=5)
+        order = []
+        lock = threading.Lock()
+
+        def _run_pipeline(config, path, console, **kwargs):
+            if path.parent.name == "snpc":
+                barrier.wait()
+            with lock:
+                order.append(path.relative_to(root).as_posix())
+
+        self._run(root, _run_pipeline, max_parallel=3)
+        self.assertLess(order.index("snpc/ipca"), order.index("snpc"))
+        self.assertLess(order.index("snpc/inpc"), order.index("snpc"))
+        self.assertEqual(order[-1], ".")
+        self.assertEqual(len(order), 5)
+
+    def test_failed_child_blocks_its_parent_only(self):
+        root = make_tree("snpc", "snpc/ipca", "snpc/inpc")
+        ran = []
+
+        def _run_pipeline(config, path, console, **kwargs):
+            if path.name == "inpc":
+                raise RuntimeError("boom")
+            ran.append(path.name)
+
+        with self.assertRaisesRegex(RuntimeError, "boom"):
+            self._run(root, _run_pipeline, max_parallel=2)
+        self.assertEqual(ran, ["ipca"])
+
+    def test_concurrent_pipelines_share_the_lookup_cache(self):
+        root = make_tree("a", "b")
+        caches = []
+        self._run(
+            root,
+            lambda config, path, console, **kw: caches.append(
+                kw["lookup_cache"]
+            ),
+            max_parallel=2,
+        )
+        self.assertEqual(len(caches), 3)
+        self.assertTrue(all(c is caches[0] for c in caches))
+
+    def test_concurrent_pipelines_share_one_engine(self):
+        root = make_tree("a", "b")
+        engines = []
+
+        def _run_pipeline(config, path, console, **kwargs):
+            engines.append(kwargs["engine"])
+            if path.name == "b":
+                raise RuntimeError("boom")
+
+        with self.assertRaisesRegex(RuntimeError, "boom"):
+            self._run(root, _run_pipeline, max_parallel=2)
+        self.assertEqual(engines, [self.engine, self.engine])
+        runner.database.create_tables.assert_called_once()
+        self.engine.dispose.assert_called_once()
+
+    def test_shared_engine_pool_serves_every_pipeline(self):
+        root = make_tree("a", "b")
+        self._run(
+            root,
+            lambda config, path, console, **kw: None,
+            max_parallel=3,
+            load_workers=6,
+        )
+        runner.database.get_engine.assert_called_once_with(
+            mock.ANY, pool_size=3 * 7
+        )
+
+    def test_bulk_is_rejected_with_parallel_pipelines(self):
+        root = make_tree("a", "b")
+        fake = mock.Mock()
+        with self.assertRaisesRegex(ValueError, "bulk"):
+            self._run(root, fake, max_parallel=2, bulk=True)
+        fake.assert_not_called()
+
+
+class TestRunAll(unittest.TestCase):
+    def setUp(self):
+        self.engine = mock.MagicMock()
+        self.fetcher = mock.MagicMock()
+        patches = [
+            mock.patch.object(
+                runner.database, "get_engine", return_value=self.engine
+            ),
+            mock.patch.object(runner.database, "create_tables"),
+            mock.patch.object(
+                runner, "make_fetcher", return_value=self.fetcher
+            ),
+            mock.patch.object(runner.Storage, "default"),
+        ]
+        for patcher in patches:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_failures_are_isolated_per_pipeline(self):
+        root = make_tree("a", "b", "c")
+        calls = []
+
+        def _run_pipeline(config, path, console, **kwargs):
+            calls.append((path.name, kwargs))
+            if path.name == "b":
+                raise RuntimeError("boom")
+
+        with mock.patch.object(runner, "_run_pipeline", _run_pipeline):
+            failed = runner.run_all(DummyConfig(), root, reload=True)
+
+        self.assertEqual([name for name, _ in calls], ["a", "b", "c"])
+        self.assertEqual(
+            [(p.name, str(e)) for p, e in failed], [("b", "boom")]
+        )
+        # One engine, fetcher and lookup cache for the whole run.
+        for _, kwargs in calls:
+            self.assertIs(kwargs["engine"], self.engine)
+            self.assertIs(kwargs["fetcher"], self.fetcher)
+            self.assertIs(kwargs["lookup_cache"], calls[0][1]["lookup_cache"])
+            self.assertTrue(kwargs["reload"])
+        runner.database.create_tables.assert_called_once()
+        self.fetcher.__enter__.assert_called_once()
+        self.engine.dispose.assert_called_once()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,15 +1,19 @@
+import asyncio
 import tempfile
 import unittest
 from pathlib import Path
 
 import httpx
 
-from sidra_sql.sidra import Fetcher, unnest_classificacoes
+from sidra_sql.sidra import AsyncFetcher, Fetcher, unnest_classificacoes
 
 
 class _DummyConfig:
     def __init__(self):
         self.data_dir = Path(tempfile.mkdtemp())
+        self.fetch_rate_limit = 0.0
+        self.fetch_burst = 1
+        self.storage_format = "json"
 
 
 class _Cat:
@@ -143,6 +147,76 @@ class TestSidra(unittest.TestCase):
 
         self.assertEqual(len(result), 1)
 
+    def test_get_table_waits_on_rate_limiter(self):
+        fetcher = Fetcher(_DummyConfig())
+        acquired = []
+
+        class FakeLimiter:
+            def acquire(self_inner, cancel=None):
+                acquired.append(cancel)
+
+        class FakeClient:
+            def get(self_inner, url):
+                return [{"col": 1}]
+
+        fetcher.rate_limiter = FakeLimiter()
+        fetcher.sidra_client = FakeClient()
+
+        class P:
+            def url(self):
+                return "http://example"
+
+        fetcher.get_table(P())
+        self.assertEqual(acquired, [fetcher._cancel])
+
+    def test_stream_table_writes_raw_body_without_parsing(self):
+        from sidra_sql.storage import Storage
+
+        class _Fmt:
+            value = "A"
+
+        class Param:
+            agregado = "9"
+            territorios = {"6": ["1"]}
+            periodos = ["2020"]
+            variaveis = None
+            classificacoes = {}
+            formato = _Fmt()
+
+            def url(self):
+                return "http://example"
+
+        class FakeStreamResponse:
+            def __enter__(self):
+                return self
+
+            def __exit__(self, *a):
+                return False
+
+            def raise_for_status(self):
+                pass
+
+            def iter_bytes(self, chunk_size):
+                yield b'[{"V": "Valor"},'
+                yield b'{"V": "42"}]'
+
+        class FakeHttpClient:
+            def stream(self, method, url):
+                return FakeStreamResponse()
+
+        config = _DummyConfig()
+        fetcher = Fetcher(
+            config, storage=Storage(config.data_dir), stream=True
+        )
+        fetcher.sidra_client.client = FakeHttpClient()
+        fetcher.get_table = None  # must not be used in stream mode
+
+        filepath = fetcher._download_period(Param(), "2020-01-01")
+
+        self.assertEqual(
+            filepath.read_bytes(), b'[{"V": "Valor"},{"V": "42"}]'
+        )
+
     def test_context_manager_enter_delegates(self):
         fetcher = Fetcher(_DummyConfig())
 
@@ -179,5 +253,110 @@ class TestSidra(unittest.TestCase):
         self.assertTrue(client.exited)
 
 
+class _FakeResponse:
+    def __init__(self, content: bytes):
+        self.content = content
+
+    def raise_for_status(self):
+        pass
+
+
+class _FakeParam:
+    def __init__(self, name: str):
+        self.name = name
+
+    def url(self):
+        return f"http://example/{self.name}"
+
+
+class _FakeStorage:
+    def __init__(self, cached: set[str] = frozenset()):
+        self.cached = cached
+        self.written: list[str] = []
+
+    def exists(self, parameter, modification):
+        return parameter.name in self.cached
+
+    def find_data_filepath(self, parameter, modification):
+        if not self.exists(parameter, modification):
+            return None
+        return self.get_data_filepath(parameter, modification)
+
+    def get_data_filepath(self, parameter, modification):
+        return Path(f"/tmp/{parameter.name}@{modification}.json")
+
+    def write_data(self, data, parameter, modification):
+        self.written.append(parameter.name)
+        return self.get_data_filepath(parameter, modification)
+
+
+class TestAsyncFetcher(unittest.TestCase):
+    def test_get_table_async_retries_on_timeout(self):
+        import sidra_sql.sidra as sidra_module
+
+        fetcher = AsyncFetcher(_DummyConfig())
+        calls = {"n": 0}
+
+        class FakeClient:
+            async def get(self_inner, url):
+                calls["n"] += 1
+                if calls["n"] == 1:
+                    raise httpx.ReadTimeout("timeout")
+                return _FakeResponse(b'[{"col": 1}, {"col": 2}]')
+
+        sleep_calls = []
+
+        async def fake_sleep(s):
+            sleep_calls.append(s)
+
+        orig_sleep = sidra_module.asyncio.sleep
+        sidra_module.asyncio.sleep = fake_sleep
+        try:
+            result = asyncio.run(
+                fetcher.get_table_async(FakeClient(), _FakeParam("a"))
+            )
+        finally:
+            sidra_module.asyncio.sleep = orig_sleep
+
+        self.assertEqual(result, [{"col": 1}, {"col": 2}])
+        self.assertEqual(sleep_calls, [sidra_module._RETRY_BASE_DELAY])
+
+    def test_download_periods_skips_cache_hits_and_reports_all(self):
+        storage = _FakeStorage(cached={"b"})
+        fetcher = AsyncFetcher(_DummyConfig(), storage=storage, max_workers=2)
+
+        async def fake_get_table(client, parameter):
+            return [{"header": 1}, {"V": parameter.name}]
+
+        fetcher.get_table_async = fake_get_table
+        plan = [(k, _FakeParam(k), "2024-01-01") for k in ("a", "b", "c")]
+        done = []
+
+        results = fetcher.download_periods(plan, on_file_done=done.append)
+
+        self.assertEqual(sorted(r["key"] for r in results), ["a", "b", "c"])
+        self.assertEqual(sorted(done), ["a", "b", "c"])
+        self.assertEqual(sorted(storage.written), ["a", "c"])
+
+    def test_download_periods_raises_first_error_after_all_finish(self):
+        storage = _FakeStorage()
+        fetcher = AsyncFetcher(_DummyConfig(), storage=storage)
+
+        async def fake_get_table(client, parameter):
+            if parameter.name == "bad":
+                raise ValueError("boom")
+            return [{"header": 1}]
+
+        fetcher.get_table_async = fake_get_table
+        plan = [(k, _FakeParam(k), "2024-01-01") for k in ("ok", "bad")]
+        streamed = []
+
+        with self.assertRaises(ValueError):
+            fetcher.download_periods(plan, on_result=streamed.append)
+        # Successful results were still handed out as they completed.
+        self.assertEqual([r["key"] for r in streamed], ["ok"])
+        self.assertEqual(storage.written, ["ok"])
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -1,7 +1,9 @@
 import tempfile
 import unittest
 from pathlib import Path
+from unittest import mock
 
+from sidra_sql import storage as storage_module
 from sidra_sql.storage import Storage
 
 
@@ -86,6 +88,36 @@ class TestStorage(unittest.TestCase):
             self.assertIsNone(cleaned[2]["V"])
             self.assertIsNone(cleaned[2]["Other"])
 
+    def test_atomic_writer_renames_into_place(self):
+        with tempfile.TemporaryDirectory() as td:
+            storage = Storage(td)
+            param = _SimpleParam(
+                "5", {"6": ["1"]}, ["2020"], None, {"": []}, _Fmt("A")
+            )
+            with storage.atomic_writer(param, "2020-01-01") as f:
+                f.write(b'[{"V": "Valor"},')
+                f.write(b' {"V": "7"}]')
+
+            self.assertTrue(storage.exists(param, "2020-01-01"))
+            filepath = storage.get_data_filepath(param, "2020-01-01")
+            self.assertEqual(storage.read_data(filepath), [{"V": "7"}])
+            self.assertEqual(list(filepath.parent.glob("*.part")), [])
+
+    def test_atomic_writer_discards_partial_file_on_error(self):
+        with tempfile.TemporaryDirectory() as td:
+            storage = Storage(td)
+            param = _SimpleParam(
+                "6", {"6": ["1"]}, ["2020"], None, {"": []}, _Fmt("A")
+            )
+            with self.assertRaises(RuntimeError):
+                with storage.atomic_writer(param, "2020-01-01") as f:
+                    f.write(b'[{"V": "Valor"},')
+                    raise RuntimeError("connection dropped")
+
+            self.assertFalse(storage.exists(param, "2020-01-01"))
+            table_dir = Path(td) / "t-6"
+            self.assertEqual(list(table_dir.iterdir()), [])
+
     def test_get_metadata_filepath_returns_correct_path(self):
         with tempfile.TemporaryDirectory() as td:
             storage = Storage(td)
@@ -127,11 +159,126 @@ class TestStorage(unittest.TestCase):
     def test_storage_default_creates_directory_from_config(self):
         class _Cfg:
             data_dir = Path(tempfile.mkdtemp()) / "new_subdir"
+            storage_format = "columnar"
 
         cfg = _Cfg()
         storage = Storage.default(cfg)
         self.assertTrue(cfg.data_dir.exists())
         self.assertEqual(storage.data_dir, cfg.data_dir)
+        self.assertEqual(storage.codec.name, "columnar")
+
+    def test_unknown_format_raises(self):
+        with self.assertRaises(ValueError):
+            Storage(tempfile.mkdtemp(), format="xml")
+
+    def test_formats_round_trip(self):
+        data = [
+            {"NC": "Nível", "V": "Valor"},
+            {"NC": "6", "V": "1"},
+            {"NC": "6", "V": "..."},
+        ]
+        suffixes = {
+            "json": "@2020-01-01.json",
+            "json-compact": "@2020-01-01.json",
+            "json-gzip": "@2020-01-01.json.gz",
+            "columnar": "@2020-01-01.cols.json.gz",
+        }
+        for fmt, suffix in suffixes.items():
+            with self.subTest(fmt=fmt), tempfile.TemporaryDirectory() as td:
+                storage = Storage(td, format=fmt)
+                param = _SimpleParam(
+                    "7", {"6": ["1"]}, ["2020"], None, {"": []}, _Fmt("A")
+                )
+                filepath = storage.write_data(data, param, "2020-01-01")
+                self.assertTrue(filepath.name.endswith(suffix))
+                self.assertEqual(
+                    storage.read_data(filepath),
+                    [{"NC": "6", "V": "1"}, {"NC": "6", "V": None}],
+                )
+
+    def test_stream_writer_compresses_raw_json(self):
+        with tempfile.TemporaryDirectory() as td:
+            storage = Storage(td, format="json-gzip")
+            param = _SimpleParam(
+                "8", {"6": ["1"]}, ["2020"], None, {"": []}, _Fmt("A")
+            )
+            with storage.stream_writer(param, "2020-01-01") as f:
+                f.write(b'[{"V": "Valor"}, {"V": "3"}]')
+
+            filepath = storage.get_data_filepath(param, "2020-01-01")
+            self.assertTrue(filepath.name.endswith(".json.gz"))
+            self.assertEqual(storage.read_data(filepath), [{"V": "3"}])
+
+    def test_files_in_other_formats_are_found_and_read(self):
+        data = [{"V": "Valor"}, {"V": "1"}]
+        with tempfile.TemporaryDirectory() as td:
+            param = _SimpleParam(
+                "9", {"6": ["1"]}, ["2020"], None, {"": []}, _Fmt("A")
+            )
+            Storage(td).write_data(data, param, "2020-01-01")
+            Storage(td, format="json-gzip").write_data(
+                [{"V": "Valor"}, {"V": "2"}], param, "2020-02-01"
+            )
+
+            storage = Storage(td, format="columnar")
+            self.assertTrue(storage.exists(param, "2020-01-01"))
+            found = storage.find_data_filepath(param, "2020-01-01")
+            self.assertEqual(found.suffix, ".json")
+
+            # Only the latest modification is kept, whatever its format.
+            rows = storage.read_data_dir(Path(td) / "t-9")
+            self.assertEqual(rows, [{"V": "2"}])
+
+    def test_iter_rows_projects_columns_without_pyarrow(self):
+        data = [
+            {"NC": "Nível", "D3C": "Período", "V": "Valor"},
+            {"NC": "6", "D3C": "2020", "V": "-"},
+        ]
+        with tempfile.TemporaryDirectory() as td:
+            storage = Storage(td)
+            param = _SimpleParam(
+                "10", {"6": ["1"]}, ["2020"], None, {"": []}, _Fmt("A")
+            )
+            filepath = storage.write_data(data, param, "2020-01-01")
+            with mock.patch.object(storage_module, "pq", None):
+                rows = list(storage.iter_rows(filepath, ["V", "D9C", "NC"]))
+            self.assertEqual(rows, [{"V": None, "NC": "6"}])
+            self.assertFalse(storage.get_cache_filepath(filepath).exists())
+
+    @unittest.skipIf(storage_module.pq is None, "pyarrow not installed")
+    def test_iter_rows_writes_and_reuses_parquet_cache(self):
+        data = [
+            {"NC": "Nível", "D3C": "Período", "V": "Valor"},
+            {"NC": "6", "D3C": "2020", "V": "1.5"},
+            {"NC": "6", "D3C": "2021", "V": "..."},
+        ]
+        with tempfile.TemporaryDirectory() as td:
+            storage = Storage(td, format="json-gzip")
+            param = _SimpleParam(
+                "11", {"6": ["1"]}, ["2020"], None, {"": []}, _Fmt("A")
+            )
+            filepath = storage.write_data(data, param, "2020-01-01")
+            expected = [
+                {"D3C": "2020", "V": "1.5"},
+                {"D3C": "2021", "V": None},
+            ]
+            self.assertEqual(
+                list(storage.iter_rows(filepath, ["D3C", "V"])), expected
+            )
+            cache_path = storage.get_cache_filepath(filepath)
+            self.assertEqual(cache_path.parent.name, "_cache")
+            self.assertTrue(cache_path.name.endswith("@2020-01-01.parquet"))
+
+            # Second read comes from the cache, not the data file.
+            with mock.patch.object(storage, "read_data") as read_data:
+                rows = list(storage.iter_rows(filepath, ["D3C", "V"]))
+            read_data.assert_not_called()
+            self.assertEqual(rows, expected)
+
+            # The cache directory is never mistaken for data.
+            self.assertEqual(
+                storage.list_data_files(filepath.parent), [filepath]
+            )
 
 
 if __name__ == "__main__":
@@ -1,9 +1,18 @@
+import hashlib
 import tempfile
+import threading
 import unittest
 from pathlib import Path
 from unittest import mock
 
-from sidra_sql.transform_runner import TransformRunner
+import sqlalchemy as sa
+
+from sidra_sql.transform_runner import (
+    TransformRunner,
+    _State,
+    referenced_relations,
+    referenced_tabelas,
+)
 
 
 class DummyConfig:
@@ -20,16 +29,44 @@ class FakeConn:
     def __exit__(self, *a):
         return False
 
-    def exec_driver_sql(self, sql: str):
+    def exec_driver_sql(self, sql: str, params=None):
         self.log.append(sql)
+        if params:
+            self.params.append(params)
+        if self.on_sql:
+            self.on_sql(sql)
 
 
 class FakeEngine:
-    def __init__(self):
+    def __init__(self, on_sql=None):
         self.log: list[str] = []
+        self.params: list[dict] = []
+        self.on_sql = on_sql
 
     def begin(self):
-        return FakeConn(self.log)
+        conn = FakeConn(self.log)
+        conn.on_sql = self.on_sql
+        conn.params = self.params
+        return conn
+
+
+def _patch_state(test: unittest.TestCase) -> mock.Mock:
+    """Stub the transformacao bookkeeping; return the fingerprint saver."""
+    prefix = "sidra_sql.transform_runner."
+    test.marks = {None: (0, 0)}
+    test.stored = {}
+    patchers = [
+        mock.patch(prefix + "_create_state_table"),
+        mock.patch(prefix + "_carga_marks", side_effect=lambda c: test.marks),
+        mock.patch(
+            prefix + "_stored_fingerprints", side_effect=lambda c: test.stored
+        ),
+        mock.patch(prefix + "_save_fingerprint"),
+    ]
+    mocks = [p.start() for p in patchers]
+    for p in patchers:
+        test.addCleanup(p.stop)
+    return mocks[-1]
 
 
 def _write_pipeline(tmp: Path, toml: str, sql_files: dict[str, str]) -> Path:
@@ -43,16 +80,24 @@ def _write_pipeline(tmp: Path, toml: str, sql_files: dict[str, str]) -> Path:
 class TestTransformRunner(unittest.TestCase):
     def setUp(self):
         self.tmp = Path(tempfile.mkdtemp())
+        self.save_fingerprint = _patch_state(self)
 
-    def _run(self, toml_path: Path) -> FakeEngine:
-        engine = FakeEngine()
+    def _run(self, toml_path: Path, engine=None, **kwargs) -> FakeEngine:
+        engine = engine or FakeEngine()
         with mock.patch(
             "sidra_sql.transform_runner.database.get_engine",
             return_value=engine,
         ):
-            TransformRunner(DummyConfig(), toml_path).run()
+            TransformRunner(DummyConfig(), toml_path, **kwargs).run()
         return engine
 
+    def _created_order(self, engine: FakeEngine) -> list[str]:
+        return [
+            s.split('"')[3]
+            for s in engine.log
+            if s.startswith(("CREATE TABLE", "CREATE OR REPLACE VIEW"))
+        ]
+
     def test_single_table_replace(self):
         toml = """
 [[table]]
@@ -85,16 +130,20 @@ sql = "resumo.sql"
         toml_path = _write_pipeline(
             self.tmp,
             toml,
-            {"ipca.sql": "SELECT 1", "resumo.sql": "SELECT 2"},
+            {
+                "ipca.sql": "SELECT 1",
+                "resumo.sql": "SELECT * FROM analytics.ipca",
+            },
         )
         engine = self._run(toml_path)
         joined = "\n".join(engine.log)
         self.assertIn('CREATE TABLE "analytics"."ipca" AS\nSELECT 1', joined)
         self.assertIn(
-            'CREATE OR REPLACE VIEW "analytics"."ipca_resumo" AS\nSELECT 2',
+            'CREATE OR REPLACE VIEW "analytics"."ipca_resumo" AS\n'
+            "SELECT * FROM analytics.ipca",
             joined,
         )
-        # Order: ipca materialized before resumo
+        # Order: ipca materialized before the view that reads it
         ipca_idx = next(
             i
             for i, s in enumerate(engine.log)
@@ -163,6 +212,503 @@ indexes = [
         self.assertIn('CREATE  INDEX "ix_t_a" ON "s"."t" ("a")', joined)
         self.assertIn('CREATE UNIQUE INDEX "ix_t_b" ON "s"."t" ("b")', joined)
 
+    def test_swap_builds_shadow_then_renames(self):
+        toml = """
+[[table]]
+name = "t"
+schema = "s"
+strategy = "swap"
+sql = "t.sql"
+primary_key = ["a"]
+indexes = [{ name = "ix_t_b", columns = ["b"] }]
+"""
+        toml_path = _write_pipeline(self.tmp, toml, {"t.sql": "SELECT 1"})
+        engine = self._run(toml_path)
+        log = [s for s in engine.log if not s.startswith("CREATE SCHEMA")]
+        self.assertEqual(
+            log,
+            [
+                'DROP TABLE IF EXISTS "s"."t__swap"',
+                'CREATE TABLE "s"."t__swap" AS\nSELECT 1',
+                'ALTER TABLE "s"."t__swap" ADD CONSTRAINT "t__swap_pkey" '
+                'PRIMARY KEY ("a")',
+                'CREATE  INDEX "ix_t_b__swap" ON "s"."t__swap" ("b")',
+                "SET LOCAL lock_timeout = '2s'",
+                'DROP TABLE IF EXISTS "s"."t"',
+                'ALTER TABLE "s"."t__swap" RENAME TO "t"',
+                'ALTER INDEX "s"."t__swap_pkey" RENAME TO "t_pkey"',
+                'ALTER INDEX "s"."ix_t_b__swap" RENAME TO "ix_t_b"',
+            ],
+        )
+
+    def test_swap_retries_on_lock_timeout(self):
+        toml = """
+[[table]]
+name = "t"
+schema = "s"
+strategy = "swap"
+sql = "t.sql"
+"""
+        toml_path = _write_pipeline(self.tmp, toml, {"t.sql": "SELECT 1"})
+        timeouts = [1]
+
+        class LockNotAvailable(Exception):
+            sqlstate = "55P03"
+
+        def on_sql(sql):
+            if sql == 'DROP TABLE IF EXISTS "s"."t"' and timeouts:
+                timeouts.pop()
+                raise sa.exc.OperationalError(sql, {}, LockNotAvailable())
+
+        with mock.patch("sidra_sql.transform_runner.time.sleep"):
+            engine = self._run(toml_path, FakeEngine(on_sql))
+        self.assertEqual(engine.log.count('DROP TABLE IF EXISTS "s"."t"'), 2)
+        self.assertEqual(
+            engine.log[-1], 'ALTER TABLE "s"."t__swap" RENAME TO "t"'
+        )
+
+    def test_swap_failure_drops_shadow(self):
+        toml = """
+[[table]]
+name = "t"
+schema = "s"
+strategy = "swap"
+sql = "t.sql"
+"""
+        toml_path = _write_pipeline(self.tmp, toml, {"t.sql": "SELECT 1"})
+
+        def on_sql(sql):
+            if sql.startswith('ALTER TABLE "s"."t__swap" RENAME'):
+                raise RuntimeError("boom")
+
+        engine = FakeEngine(on_sql)
+        with self.assertRaises(RuntimeError):
+            self._run(toml_path, engine)
+        self.assertEqual(engine.log[-1], 'DROP TABLE IF EXISTS "s"."t__swap"')
+
+    def test_depends_on_orders_entries(self):
+        toml = """
+[[table]]
+name = "resumo"
+schema = "s"
+strategy = "view"
+sql = "resumo.sql"
+depends_on = ["s.base"]
+
+[[table]]
+name = "base"
+schema = "s"
+strategy = "replace"
+sql = "base.sql"
+"""
+        toml_path = _write_pipeline(
+            self.tmp, toml, {"resumo.sql": "SELECT 2", "base.sql": "SELECT 1"}
+        )
+        engine = self._run(toml_path)
+        self.assertEqual(self._created_order(engine), ["base", "resumo"])
+
+    def test_independent_entries_run_concurrently(self):
+        toml = "".join(
+            f"""
+[[table]]
+name = "t{i}"
+schema = "s"
+strategy = "replace"
+sql = "t{i}.sql"
+"""
+            for i in range(3)
+        )
+        toml_path = _write_pipeline(
+            self.tmp, toml, {f"t{i}.sql": "SELECT 1" for i in range(3)}
+        )
+        barrier = threading.Barrier(3, timeout=5)
+
+        def on_sql(sql):
+            if sql.startswith("CREATE TABLE"):
+                barrier.wait()
+
+        # Would raise BrokenBarrierError if the entries ran one at a time.
+        engine = self._run(toml_path, FakeEngine(on_sql), max_workers=3)
+        self.assertEqual(
+            sorted(self._created_order(engine)), ["t0", "t1", "t2"]
+        )
+
+    def test_failed_entry_blocks_dependents(self):
+        toml = """
+[[table]]
+name = "base"
+schema = "s"
+strategy = "replace"
+sql = "base.sql"
+
+[[table]]
+name = "resumo"
+schema = "s"
+strategy = "view"
+sql = "resumo.sql"
+"""
+        toml_path = _write_pipeline(
+            self.tmp,
+            toml,
+            {"base.sql": "SELECT 1", "resumo.sql": "SELECT * FROM s.base"},
+        )
+
+        def on_sql(sql):
+            if sql.startswith('CREATE TABLE "s"."base"'):
+                raise RuntimeError("boom")
+
+        engine = FakeEngine(on_sql)
+        with self.assertRaises(RuntimeError):
+            self._run(toml_path, engine)
+        self.assertNotIn("resumo", "\n".join(engine.log))
+
+    def test_unknown_depends_on_raises(self):
+        toml = """
+[[table]]
+name = "x"
+schema = "s"
+strategy = "view"
+sql = "x.sql"
+depends_on = ["nope"]
+"""
+        toml_path = _write_pipeline(self.tmp, toml, {"x.sql": "SELECT 1"})
+        with self.assertRaises(ValueError) as ctx:
+            self._run(toml_path)
+        self.assertIn("nope", str(ctx.exception))
+
+    def test_cycle_raises(self):
+        toml = """
+[[table]]
+name = "a"
+schema = "s"
+strategy = "view"
+sql = "a.sql"
+
+[[table]]
+name = "b"
+schema = "s"
+strategy = "view"
+sql = "b.sql"
+"""
+        toml_path = _write_pipeline(
+            self.tmp,
+            toml,
+            {"a.sql": "SELECT * FROM s.b", "b.sql": "SELECT * FROM a"},
+        )
+        engine = FakeEngine()
+        with self.assertRaises(ValueError) as ctx:
+            self._run(toml_path, engine)
+        self.assertIn("circular", str(ctx.exception))
+        self.assertEqual(engine.log, [])
+
+
+class TestIncremental(unittest.TestCase):
+    TOML = """
+[[table]]
+name = "t"
+schema = "s"
+strategy = "incremental"
+sql = "t.sql"
+period_key = "periodo_id"
+"""
+
+    def setUp(self):
+        self.tmp = Path(tempfile.mkdtemp())
+        _patch_state(self)
+        self.toml_path = _write_pipeline(
+            self.tmp, self.TOML, {"t.sql": "SELECT 1 AS periodo_id"}
+        )
+        self.sql_hash = hashlib.sha256(b"SELECT 1 AS periodo_id").hexdigest()
+
+    def _run(self, state, touched=None) -> tuple[FakeEngine, mock.Mock]:
+        engine = FakeEngine()
+        prefix = "sidra_sql.transform_runner."
+        with (
+            mock.patch(prefix + "_load_state", return_value=state),
+            mock.patch(prefix + "_save_state") as save_state,
+            mock.patch(prefix + "database.carga_high_water", return_value=42),
+            mock.patch(
+                prefix + "database.touched_periodo_ids",
+                return_value=touched,
+            ),
+        ):
+            TransformRunner(DummyConfig(), self.toml_path, engine=engine).run()
+        return engine, save_state
+
+    def _state(self, sql_hash=None, exists=True):
+        return _State(sql_hash or self.sql_hash, 7, exists)
+
+    def test_first_run_builds_in_full(self):
+        engine, save_state = self._run(None)
+        self.assertIn(
+            'CREATE TABLE "s"."t" AS\nSELECT 1 AS periodo_id', engine.log
+        )
+        save_state.assert_called_once_with(
+            mock.ANY, "s", "t", self.sql_hash, 42
+        )
+
+    def test_refreshes_touched_periodos(self):
+        engine, save_state = self._run(self._state(), touched=[3, 5])
+        self.assertEqual(
+            engine.log[1:],
+            [
+                'DELETE FROM "s"."t" WHERE "periodo_id" = '
+                "ANY(%(periodo_ids)s)",
+                'INSERT INTO "s"."t" SELECT * FROM ('
+                "\nSELECT 1 AS periodo_id\n)"
+                ' AS q WHERE q."periodo_id" = ANY(%(periodo_ids)s)',
+            ],
+        )
+        self.assertEqual(engine.params, [{"periodo_ids": [3, 5]}] * 2)
+        save_state.assert_called_once()
+
+    def test_no_new_cargas_only_moves_high_water(self):
+        engine, save_state = self._run(self._state(), touched=[])
+        self.assertEqual(engine.log, ['CREATE SCHEMA IF NOT EXISTS "s"'])
+        save_state.assert_called_once()
+
+    def test_rebuilds_when_sql_changed_or_table_missing(self):
+        for state in (self._state(sql_hash="old"), self._state(exists=False)):
+            engine, _ = self._run(state, touched=[3])
+            self.assertIn('DROP TABLE IF EXISTS "s"."t"', engine.log)
+            self.assertFalse(any(s.startswith("DELETE") for s in engine.log))
+
+    def test_rebuilds_when_touched_periodos_unknown(self):
+        engine, _ = self._run(self._state(), touched=None)
+        self.assertIn('DROP TABLE IF EXISTS "s"."t"', engine.log)
+
+    def test_missing_period_key_raises(self):
+        toml = self.TOML.replace('period_key = "periodo_id"', "")
+        toml_path = _write_pipeline(self.tmp, toml, {})
+        with self.assertRaises(ValueError) as ctx:
+            TransformRunner(DummyConfig(), toml_path).run()
+        self.assertIn("period_key", str(ctx.exception))
+
+
+class TestMaterializedView(unittest.TestCase):
+    TOML = """
+[[table]]
+name = "mv"
+schema = "s"
+strategy = "materialized_view"
+sql = "mv.sql"
+primary_key = ["k"]
+indexes = [{ name = "ix_mv_v", columns = ["v"] }]
+"""
+
+    def setUp(self):
+        self.tmp = Path(tempfile.mkdtemp())
+        _patch_state(self)
+        self.toml_path = _write_pipeline(
+            self.tmp, self.TOML, {"mv.sql": "SELECT 1"}
+        )
+        self.sql_hash = hashlib.sha256(b"SELECT 1").hexdigest()
+
+    def _run(self, state) -> tuple[FakeEngine, mock.Mock]:
+        engine = FakeEngine()
+        prefix = "sidra_sql.transform_runner."
+        with (
+            mock.patch(prefix + "_load_state", return_value=state),
+            mock.patch(prefix + "_save_state") as save_state,
+        ):
+            TransformRunner(DummyConfig(), self.toml_path, engine=engine).run()
+        return engine, save_state
+
+    def test_first_run_creates_view_and_indexes(self):
+        engine, save_state = self._run(None)
+        self.assertEqual(
+            engine.log[1:],
+            [
+                'DROP MATERIALIZED VIEW IF EXISTS "s"."mv"',
+                'CREATE MATERIALIZED VIEW "s"."mv" AS\nSELECT 1',
+                'CREATE UNIQUE INDEX "mv_pkey" ON "s"."mv" ("k")',
+                'CREATE  INDEX "ix_mv_v" ON "s"."mv" ("v")',
+            ],
+        )
+        save_state.assert_called_once_with(
+            mock.ANY, "s", "mv", self.sql_hash, None
+        )
+
+    def test_unchanged_sql_refreshes_concurrently(self):
+        engine, save_state = self._run(_State(self.sql_hash, None, True))
+        self.assertEqual(
+            engine.log[1:],
+            ['REFRESH MATERIALIZED VIEW CONCURRENTLY "s"."mv"'],
+        )
+        save_state.assert_not_called()
+
+    def test_changed_sql_or_missing_view_recreates(self):
+        for state in (
+            _State("old", None, True),
+            _State(self.sql_hash, None, False),
+        ):
+            engine, save_state = self._run(state)
+            self.assertIn(
+                'CREATE MATERIALIZED VIEW "s"."mv" AS\nSELECT 1', engine.log
+            )
+            save_state.assert_called_once()
+
+    def test_missing_unique_index_raises(self):
+        toml = self.TOML.replace('primary_key = ["k"]', "")
+        toml_path = _write_pipeline(self.tmp, toml, {})
+        with self.assertRaises(ValueError) as ctx:
+            TransformRunner(DummyConfig(), toml_path).run()
+        self.assertIn("CONCURRENTLY", str(ctx.exception))
+
+
+class TestReferencedRelations(unittest.TestCase):
+    def test_from_and_join(self):
+        sql = """
+            SELECT * FROM dados d
+            JOIN "Analytics"."IPCA" i ON true
+            LEFT JOIN analytics . resumo r ON true
+        """
+        self.assertEqual(
+            referenced_relations(sql),
+            {"dados", "Analytics.IPCA", "analytics.resumo"},
+        )
+
+    def test_ignores_comments_and_strings(self):
+        sql = "-- FROM a\n/* JOIN b */ SELECT 'from c' FROM d"
+        self.assertEqual(referenced_relations(sql), {"d"})
+
+
+class TestFingerprint(unittest.TestCase):
+    TOML = """
+[[table]]
+name = "base"
+schema = "analytics"
+strategy = "replace"
+sql = "base.sql"
+
+[[table]]
+name = "resumo"
+schema = "analytics"
+strategy = "view"
+sql = "resumo.sql"
+"""
+
+    def setUp(self):
+        self.tmp = Path(tempfile.mkdtemp())
+        self.save_fingerprint = _patch_state(self)
+        self.marks = {None: (10, 10), "1737": (7, 3), "7060": (10, 7)}
+        self.toml_path = _write_pipeline(
+            self.tmp,
+            self.TOML,
+            {
+                "base.sql": "SELECT * FROM dados "
+                "WHERE tabela_sidra_id = '1737'",
+                "resumo.sql": "SELECT * FROM analytics.base",
+            },
+        )
+
+    def _run(self, **kwargs) -> FakeEngine:
+        engine = FakeEngine()
+        self.save_fingerprint.reset_mock()
+        TransformRunner(
+            DummyConfig(), self.toml_path, engine=engine, **kwargs
+        ).run()
+        return engine
+
+    def _store_fingerprints(self):
+        self._run()
+        self.stored = {
+            f"{entry['schema']}.{entry['name']}": entry["fingerprint"]
+            for (_, entry), _ in self.save_fingerprint.call_args_list
+        }
+
+    def _materialized(self) -> list[str]:
+        return sorted(
+            entry["name"]
+            for (_, entry), _ in self.save_fingerprint.call_args_list
+        )
+
+    def test_unchanged_entries_are_skipped(self):
+        self._store_fingerprints()
+        engine = self._run()
+        self.assertEqual(self._materialized(), [])
+        self.assertFalse(
+            any(
+                s.startswith(("CREATE TABLE", "CREATE OR")) for s in engine.log
+            )
+        )
+
+    def test_force_reruns_unchanged_entries(self):
+        self._store_fingerprints()
+        self._run(force=True)
+        self.assertEqual(self._materialized(), ["base", "resumo"])
+
+    def test_new_carga_of_filtered_tabela_reruns_dependents(self):
+        self._store_fingerprints()
+        self.marks = {None: (11, 11), "1737": (11, 4), "7060": (10, 7)}
+        self._run()
+        self.assertEqual(self._materialized(), ["base", "resumo"])
+
+    def test_carga_of_other_tabela_is_ignored(self):
+        self._store_fingerprints()
+        self.marks = {None: (11, 11), "1737": (7, 3), "7060": (11, 8)}
+        self._run()
+        self.assertEqual(self._materialized(), [])
+
+    def test_changed_sql_reruns_entry(self):
+        self._store_fingerprints()
+        (self.tmp / "resumo.sql").write_text(
+            "SELECT count(*) FROM analytics.base"
+        )
+        self._run()
+        self.assertEqual(self._materialized(), ["resumo"])
+
+    def test_missing_output_is_rebuilt(self):
+        self._store_fingerprints()
+        del self.stored["analytics.base"]
+        self._run()
+        self.assertEqual(self._materialized(), ["base"])
+
+
+class TestReferencedTabelas(unittest.TestCase):
+    def test_equality_and_in(self):
+        sql = """
+            SELECT * FROM dados WHERE tabela_sidra_id = '1737'
+            UNION ALL
+            SELECT * FROM dados WHERE TABELA_SIDRA_ID IN ('7060', '1419')
+        """
+        self.assertEqual(referenced_tabelas(sql), {"1737", "7060", "1419"})
+
+    def test_no_literal_filter(self):
+        sql = "SELECT * FROM dados -- tabela_sidra_id = '1737'"
+        self.assertIsNone(referenced_tabelas(sql))
+
+    def test_numeric_literals_and_reversed_equality(self):
+        sql = """
+            SELECT tabela_sidra_id, count(*) FROM dados d
+            WHERE d.tabela_sidra_id IN (7060, '1419')
+               OR 1737 = d.tabela_sidra_id
+            GROUP BY tabela_sidra_id
+        """
+        self.assertEqual(referenced_tabelas(sql), {"1737", "7060", "1419"})
+
+    def test_join_on_a_column_is_not_a_literal_filter(self):
+        sql = """
+            SELECT * FROM dados d
+            JOIN tabela_sidra t ON d.tabela_sidra_id = t.id
+            WHERE d.tabela_sidra_id = '1737'
+        """
+        self.assertIsNone(referenced_tabelas(sql))
+
+    def test_any_non_literal_comparison_makes_the_tables_unknown(self):
+        for condition in (
+            "t.id = d.tabela_sidra_id",
+            "tabela_sidra_id IN (SELECT id FROM tabela_sidra)",
+            "tabela_sidra_id <> '1737'",
+            "tabela_sidra_id NOT IN ('1737')",
+        ):
+            with self.subTest(condition=condition):
+                sql = (
+                    "SELECT * FROM dados d, tabela_sidra t"
+                    f" WHERE d.tabela_sidra_id = '1419' AND {condition}"
+                )
+                self.assertIsNone(referenced_tabelas(sql))
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -132,6 +132,33 @@ sql = "t.sql"
             any("strategy" in e and "merge" in e for e in errs), errs
         )
 
+    def test_incremental_without_period_key_errors(self):
+        toml = """
+[[table]]
+name = "t"
+schema = "s"
+strategy = "incremental"
+sql = "t.sql"
+"""
+        plugin = _setup_plugin(self.tmp, toml, {"t.sql": "SELECT 1"})
+        report = PluginValidator(plugin).validate()
+        errs = _errors(_section(report, "p1"))
+        self.assertTrue(any("period_key" in e for e in errs), errs)
+
+    def test_materialized_view_without_unique_index_errors(self):
+        toml = """
+[[table]]
+name = "t"
+schema = "s"
+strategy = "materialized_view"
+sql = "t.sql"
+indexes = [{ name = "ix_t", columns = ["a"] }]
+"""
+        plugin = _setup_plugin(self.tmp, toml, {"t.sql": "SELECT 1"})
+        report = PluginValidator(plugin).validate()
+        errs = _errors(_section(report, "p1"))
+        self.assertTrue(any("REFRESH CONCURRENTLY" in e for e in errs), errs)
+
     def test_duplicate_output_errors(self):
         toml = """
 [[table]]
@@ -151,6 +178,27 @@ sql = "t.sql"
         errs = _errors(_section(report, "p1"))
         self.assertTrue(any("duplicada" in e for e in errs), errs)
 
+    def test_unknown_depends_on_errors(self):
+        toml = """
+[[table]]
+name = "t"
+schema = "s"
+strategy = "replace"
+sql = "t.sql"
+
+[[table]]
+name = "v"
+schema = "s"
+strategy = "view"
+sql = "t.sql"
+depends_on = ["s.t", "outra"]
+"""
+        plugin = _setup_plugin(self.tmp, toml, {"t.sql": "SELECT 1"})
+        report = PluginValidator(plugin).validate()
+        errs = _errors(_section(report, "p1"))
+        self.assertEqual(len(errs), 1, errs)
+        self.assertIn("'outra'", errs[0])
+
     def test_empty_table_array_errors(self):
         toml = "# nothing\n"
         plugin = _setup_plugin(self.tmp, toml, {})